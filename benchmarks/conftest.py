@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import pytest
+
+from benchmarks.corpus import CorpusSpec, session_lines, write_corpus
+
+
+@pytest.fixture(scope="session")
+def corpus_spec() -> CorpusSpec:
+    return CorpusSpec(projects=2, sessions_per_project=4, lines_per_session=500)
+
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory: pytest.TempPathFactory, corpus_spec: CorpusSpec) -> list[Path]:
+    return write_corpus(tmp_path_factory.mktemp("corpus"), corpus_spec)
+
+
+@pytest.fixture(scope="session")
+def sample_lines(corpus_spec: CorpusSpec) -> list[str]:
+    return session_lines(corpus_spec, random.Random(corpus_spec.seed), corpus_spec.start_ms)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_MODEL_MIX = {
+    "claude-sonnet-4-6": 0.7,
+    "claude-opus-4-6": 0.2,
+    "claude-haiku-4-5": 0.1,
+}
+
+
+@dataclass
+class CorpusSpec:
+    projects: int = 4
+    sessions_per_project: int = 5
+    lines_per_session: int = 1_000
+    model_mix: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_MODEL_MIX))
+    # Share of user lines that carry a large tool_result payload.
+    tool_result_fraction: float = 0.2
+    tool_result_bytes: int = 16 * 1024
+    # Share of assistant lines written twice with the same uuid.
+    duplicate_fraction: float = 0.02
+    # Share of sessions whose last line is cut off mid-record.
+    torn_fraction: float = 0.1
+    start_ms: int = 1_767_225_600_000  # 2026-01-01T00:00:00Z
+    spacing_ms: int = 1_500
+    seed: int = 0
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _iso(ts_ms: int) -> str:
+    dt = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{ts_ms % 1000:03d}Z"
+
+
+def _assistant_record(rng: random.Random, session_id: str, parent: str, ts_ms: int, model: str) -> dict:
+    return {
+        "parentUuid": parent,
+        "isSidechain": False,
+        "userType": "external",
+        "cwd": "/home/dev/project",
+        "sessionId": session_id,
+        "version": "1.0.0",
+        "type": "assistant",
+        "message": {
+            "id": f"msg_{rng.getrandbits(64):016x}",
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [{"type": "text", "text": "ok " * rng.randint(1, 60)}],
+            "stop_reason": "end_turn",
+            "usage": {
+                "input_tokens": rng.randint(1, 400),
+                "cache_creation_input_tokens": rng.choice([0, 0, rng.randint(100, 8_000)]),
+                "cache_read_input_tokens": rng.choice([0, rng.randint(1_000, 150_000)]),
+                "output_tokens": int(rng.lognormvariate(5, 1.2)) + 1,
+                "service_tier": "standard",
+            },
+        },
+        "requestId": f"req_{rng.getrandbits(64):016x}",
+        "uuid": _uuid(rng),
+        "timestamp": _iso(ts_ms),
+    }
+
+
+def _user_record(rng: random.Random, spec: CorpusSpec, session_id: str, parent: str, ts_ms: int) -> dict:
+    if rng.random() < spec.tool_result_fraction:
+        content = [{"type": "tool_result", "tool_use_id": _uuid(rng), "content": "x" * spec.tool_result_bytes}]
+    else:
+        content = "please continue"
+    return {
+        "parentUuid": parent,
+        "sessionId": session_id,
+        "type": "user",
+        "message": {"role": "user", "content": content},
+        "uuid": _uuid(rng),
+        "timestamp": _iso(ts_ms),
+    }
+
+
+def session_lines(spec: CorpusSpec, rng: random.Random, start_ms: int) -> list[str]:
+    models = list(spec.model_mix)
+    weights = [spec.model_mix[m] for m in models]
+    session_id = _uuid(rng)
+    parent = ""
+    lines: list[str] = []
+    ts = start_ms
+    for i in range(spec.lines_per_session):
+        ts += rng.randint(1, spec.spacing_ms * 2)
+        if i % 2 == 0:
+            rec = _user_record(rng, spec, session_id, parent, ts)
+        else:
+            rec = _assistant_record(rng, session_id, parent, ts, rng.choices(models, weights)[0])
+        parent = rec["uuid"]
+        line = json.dumps(rec, separators=(",", ":"))
+        lines.append(line)
+        if rec["type"] == "assistant" and rng.random() < spec.duplicate_fraction:
+            lines.append(line)
+    return lines
+
+
+def write_corpus(root: Path, spec: CorpusSpec) -> list[Path]:
+    """Write a deterministic ``projects/*/*.jsonl`` tree under ``root``."""
+    rng = random.Random(spec.seed)
+    paths: list[Path] = []
+    for p in range(spec.projects):
+        project_dir = root / "projects" / f"-home-dev-project-{p}"
+        project_dir.mkdir(parents=True, exist_ok=True)
+        for _ in range(spec.sessions_per_project):
+            path = project_dir / f"{_uuid(rng)}.jsonl"
+            lines = session_lines(spec, rng, spec.start_ms + rng.randint(0, 3_600_000))
+            body = "\n".join(lines) + "\n"
+            if rng.random() < spec.torn_fraction:
+                body = body[: len(body) - 1 - len(lines[-1]) // 2]
+            path.write_text(body, encoding="utf-8")
+            paths.append(path)
+    return sorted(paths)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Claude Code session corpus")
+    parser.add_argument("out", type=Path)
+    parser.add_argument("--projects", type=int, default=CorpusSpec.projects)
+    parser.add_argument("--sessions", type=int, default=CorpusSpec.sessions_per_project)
+    parser.add_argument("--lines", type=int, default=CorpusSpec.lines_per_session)
+    parser.add_argument("--tool-result-kb", type=int, default=CorpusSpec.tool_result_bytes // 1024)
+    parser.add_argument("--seed", type=int, default=CorpusSpec.seed)
+    args = parser.parse_args(argv)
+    spec = CorpusSpec(
+        projects=args.projects,
+        sessions_per_project=args.sessions,
+        lines_per_session=args.lines,
+        tool_result_bytes=args.tool_result_kb * 1024,
+        seed=args.seed,
+    )
+    paths = write_corpus(args.out, spec)
+    total = sum(p.stat().st_size for p in paths)
+    print(f"wrote {len(paths)} files, {total / 1_048_576:.1f} MB under {args.out}")
+
+
+if __name__ == "__main__":
+    main()
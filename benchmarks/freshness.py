@@ -0,0 +1,208 @@
+"""End-to-end freshness: how long from a usage line being appended to it being on screen.
+
+A load generator appends Claude Code-shaped records to N session files at a
+fixed total rate while the real TUI runs headless on top of them (watcher,
+read scheduler, refresh timer, render). For every usage record the harness
+records three latencies:
+
+* write → state: append until the tick that published it
+* state → screen: publish until the next screen refresh after it
+* write → screen: the sum, i.e. what a user perceives
+
+    python -m benchmarks.freshness --files 8 --rates 50,500,5000 --duration 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from benchmarks.corpus import CorpusSpec, _assistant_record, _iso, _user_record
+from cctv.config import parse_args
+from cctv.domain.models import RequestUsage, StateSnapshot
+from cctv.pricing import load_pricing
+from cctv.util.sketch import QuantileSketch
+
+
+@dataclass
+class LoadSpec:
+    files: int = 8
+    # Total usage records per second across all files.
+    rate: float = 100.0
+    duration_s: float = 5.0
+    # Non-usage (user / tool result) records written per usage record.
+    filler_per_usage: int = 1
+    seed: int = 0
+
+
+class LoadGenerator(threading.Thread):
+    """Appends records to ``spec.files`` session files at ``spec.rate`` usage lines/s.
+
+    ``written`` maps each usage record's event id to the perf_counter_ns at
+    which its append started.
+    """
+
+    def __init__(self, root: Path, spec: LoadSpec) -> None:
+        super().__init__(name="cctv-load", daemon=True)
+        self.spec = spec
+        self.written: dict[str, int] = {}
+        self._stop_event = threading.Event()
+        self._rng = random.Random(spec.seed)
+        self._corpus_spec = CorpusSpec(tool_result_bytes=2 * 1024)
+        project = root / "projects" / "-home-dev-freshness"
+        project.mkdir(parents=True, exist_ok=True)
+        self.paths = [project / f"session-{i}.jsonl" for i in range(spec.files)]
+        for path in self.paths:
+            path.touch()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def _lines(self, seq: int) -> tuple[str, list[str]]:
+        ts = int(time.time() * 1000)
+        session = f"fresh-{seq % self.spec.files}"
+        lines = [
+            json.dumps(_user_record(self._rng, self._corpus_spec, session, "", ts), separators=(",", ":"))
+            for _ in range(self.spec.filler_per_usage)
+        ]
+        rec = _assistant_record(self._rng, session, "", ts, "claude-sonnet-4-6")
+        rec["uuid"] = event_id = f"fresh-{seq}"
+        rec["timestamp"] = _iso(ts)
+        lines.append(json.dumps(rec, separators=(",", ":")))
+        return event_id, lines
+
+    def run(self) -> None:
+        handles = [path.open("a", encoding="utf-8") for path in self.paths]
+        try:
+            started = time.perf_counter()
+            seq = 0
+            while not self._stop_event.is_set():
+                due = int((time.perf_counter() - started) * self.spec.rate)
+                while seq < due:
+                    event_id, lines = self._lines(seq)
+                    f = handles[seq % len(handles)]
+                    self.written[event_id] = time.perf_counter_ns()
+                    f.write("\n".join(lines) + "\n")
+                    f.flush()
+                    seq += 1
+                time.sleep(0.001)
+        finally:
+            for f in handles:
+                f.close()
+
+
+@dataclass
+class FreshnessResult:
+    rate: float
+    duration_s: float
+    written: int = 0
+    ingested: int = 0
+    write_to_state: QuantileSketch = field(default_factory=QuantileSketch)
+    state_to_screen: QuantileSketch = field(default_factory=QuantileSketch)
+    write_to_screen: QuantileSketch = field(default_factory=QuantileSketch)
+
+    @property
+    def throughput(self) -> float:
+        return self.ingested / self.duration_s if self.duration_s else 0.0
+
+    def row(self) -> str:
+        def pq(sketch: QuantileSketch) -> str:
+            p50, p99 = sketch.quantiles((0.5, 0.99))
+            if p50 is None:
+                return f"{'-':>17}"
+            return f"{p50:8.1f} {p99:8.1f}"
+
+        return (
+            f"{self.rate:9.0f} {self.throughput:10.0f} {self.ingested:>7}/{self.written:<7} "
+            f"{pq(self.write_to_state)} {pq(self.state_to_screen)} {pq(self.write_to_screen)}"
+        )
+
+
+HEADER = (
+    f"{'offered/s':>9} {'ingested/s':>10} {'seen/written':>15} "
+    f"{'write→state p50/p99':>17} {'state→screen p50/p99':>17} {'write→screen p50/p99':>17}  (ms)"
+)
+
+
+async def measure(spec: LoadSpec, cctv_args: list[str] | None = None, drain_s: float = 5.0) -> FreshnessResult:
+    """Run the TUI headless over a live load and collect freshness latencies."""
+    from cctv.tui.app import CctvApp
+
+    result = FreshnessResult(rate=spec.rate, duration_s=spec.duration_s)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generator = LoadGenerator(root, spec)
+        config = parse_args(["--no-time-index", "--no-attach", *(cctv_args or [])])
+        app = CctvApp(config=config, pricing=load_pricing(None), roots=[root])
+
+        def on_screen(published_ns: int, writes: list[int]) -> None:
+            now = time.perf_counter_ns()
+            result.state_to_screen.add((now - published_ns) / 1e6)
+            for written_ns in writes:
+                result.write_to_screen.add((now - written_ns) / 1e6)
+
+        def on_applied(usages: list[RequestUsage], _: StateSnapshot) -> None:
+            now = time.perf_counter_ns()
+            writes = []
+            for usage in usages:
+                written_ns = generator.written.get(usage.event_id)
+                if written_ns is None:
+                    continue
+                writes.append(written_ns)
+                result.write_to_state.add((now - written_ns) / 1e6)
+            result.ingested += len(writes)
+            app.call_after_refresh(on_screen, now, writes)
+
+        app.pipeline.add_listener(on_applied)
+        async with app.run_test(size=(160, 50)) as pilot:
+            await app.workers.wait_for_complete()
+            await pilot.pause()
+            generator.start()
+            await asyncio.sleep(spec.duration_s)
+            generator.stop()
+            result.written = len(generator.written)
+            deadline = time.monotonic() + drain_s
+            while result.ingested < result.written and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            await pilot.pause()
+    return result
+
+
+def sweep(spec: LoadSpec, rates: list[float], cctv_args: list[str] | None = None) -> list[FreshnessResult]:
+    results = []
+    for rate in rates:
+        spec.rate = rate
+        results.append(asyncio.run(measure(spec, cctv_args)))
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure write-to-screen latency of the cctv TUI")
+    parser.add_argument("--files", type=int, default=LoadSpec.files)
+    parser.add_argument("--rates", default="50,500,5000", help="Comma-separated usage lines/s to offer")
+    parser.add_argument("--duration", type=float, default=LoadSpec.duration_s, help="Seconds of load per rate")
+    parser.add_argument("--filler", type=int, default=LoadSpec.filler_per_usage)
+    args, cctv_args = parser.parse_known_args(argv)
+    spec = LoadSpec(files=args.files, duration_s=args.duration, filler_per_usage=args.filler)
+    rates = [float(r) for r in args.rates.split(",") if r]
+
+    print(f"cctv options: {' '.join(cctv_args) or '(defaults)'}")
+    print(HEADER)
+    results = []
+    for result in sweep(spec, rates, cctv_args):
+        print(result.row(), flush=True)
+        results.append(result)
+    sustained = [r.rate for r in results if r.ingested >= 0.95 * r.written and r.throughput >= 0.95 * r.rate]
+    print(f"highest sustained rate: {max(sustained):.0f}/s" if sustained else "no rate sustained")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Soak test: does cctv's memory stay flat under hours' worth of session churn?
+
+A headless UsagePipeline ticks over a log root where sessions keep being
+created, appended to, and deleted, each usage line with a fresh event id.
+That is the growth pattern of a long-running cctv: dedupe history, tailer
+offsets and per-file bookkeeping for every session ever seen. RSS is sampled
+every tick; the result compares the second half of the run to the first.
+
+    python -m benchmarks.soak --duration 60 --max-memory 96MB
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import logging
+import random
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from benchmarks.corpus import _assistant_record, _iso
+from cctv.config import parse_args
+from cctv.ingest.pipeline import UsagePipeline
+from cctv.pricing import load_pricing
+from cctv.util.memory import rss_bytes
+
+
+@dataclass
+class SoakSpec:
+    duration_s: float = 30.0
+    # Usage lines written per tick, spread over the live sessions.
+    lines_per_tick: int = 2_000
+    live_sessions: int = 20
+    # Each tick, this many sessions end (their file is deleted) and new ones start.
+    churn_per_tick: int = 5
+    tick_s: float = 0.05
+    seed: int = 0
+
+
+@dataclass
+class SoakResult:
+    ticks: int = 0
+    lines: int = 0
+    sessions: int = 0
+    rss_mb: list[float] = field(default_factory=list)
+
+    @property
+    def growth_mb(self) -> float:
+        """Mean RSS of the second half minus the first half."""
+        half = len(self.rss_mb) // 2
+        if half == 0:
+            return 0.0
+        first, second = self.rss_mb[:half], self.rss_mb[half:]
+        return sum(second) / len(second) - sum(first) / len(first)
+
+
+def soak(spec: SoakSpec, cctv_args: list[str] | None = None) -> SoakResult:
+    rng = random.Random(spec.seed)
+    # Synthetic output sizes trip the per-session alert; its state still counts.
+    logging.getLogger("cctv.alerts").setLevel(logging.ERROR)
+    config = parse_args(["--no-time-index", "--max-watched-roots", "0", *(cctv_args or [])])
+    result = SoakResult()
+    with tempfile.TemporaryDirectory(prefix="cctv-soak-") as tmp:
+        root = Path(tmp)
+        project = root / "projects" / "-home-dev-soak"
+        project.mkdir(parents=True)
+        pipeline = UsagePipeline(config, load_pricing(None), [root])
+        pipeline.start()
+        sessions: list[Path] = []
+        seq = 0
+        deadline = time.monotonic() + spec.duration_s
+        try:
+            while time.monotonic() < deadline:
+                for _ in range(spec.churn_per_tick if len(sessions) >= spec.live_sessions else spec.live_sessions):
+                    if len(sessions) >= spec.live_sessions:
+                        sessions.pop(0).unlink(missing_ok=True)
+                    sessions.append(project / f"session-{result.sessions}.jsonl")
+                    result.sessions += 1
+                ts = int(time.time() * 1000)
+                per_file = max(1, spec.lines_per_tick // len(sessions))
+                for path in sessions:
+                    lines = []
+                    for _ in range(per_file):
+                        rec = _assistant_record(rng, path.stem, "", ts, "claude-sonnet-4-6")
+                        rec["uuid"] = f"soak-{seq}"
+                        rec["timestamp"] = _iso(ts)
+                        lines.append(json.dumps(rec, separators=(",", ":")))
+                        seq += 1
+                    with path.open("a", encoding="utf-8") as f:
+                        f.write("\n".join(lines) + "\n")
+                    pipeline.on_file_changed(path)
+                pipeline.tick()
+                result.ticks += 1
+                result.lines = seq
+                gc.collect()
+                rss = rss_bytes()
+                if rss is not None:
+                    result.rss_mb.append(rss / 1_048_576)
+                time.sleep(spec.tick_s)
+        finally:
+            pipeline.stop()
+        for line in pipeline.memory.debug_lines():
+            print(line)
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Check that cctv's RSS stays flat under session churn")
+    parser.add_argument("--duration", type=float, default=SoakSpec.duration_s)
+    parser.add_argument("--lines", type=int, default=SoakSpec.lines_per_tick, help="Usage lines per tick")
+    args, cctv_args = parser.parse_known_args(argv)
+    result = soak(SoakSpec(duration_s=args.duration, lines_per_tick=args.lines), cctv_args)
+    print(
+        f"{result.ticks} ticks | {result.lines} usage lines | {result.sessions} sessions | "
+        f"rss {result.rss_mb[0]:.1f} → {result.rss_mb[-1]:.1f} MB (peak {max(result.rss_mb):.1f}) | "
+        f"second half vs first: {result.growth_mb:+.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import asyncio
+
+from benchmarks.freshness import LoadSpec, measure
+
+
+def test_write_to_screen_latency(benchmark) -> None:
+    spec = LoadSpec(files=4, rate=500, duration_s=2.0)
+
+    result = benchmark.pedantic(lambda: asyncio.run(measure(spec, ["--refresh", "0.25"])), rounds=1, iterations=1)
+
+    for name in ("write_to_state", "state_to_screen", "write_to_screen"):
+        p50, p99 = getattr(result, name).quantiles((0.5, 0.99))
+        benchmark.extra_info[f"{name}_p50_ms"] = p50
+        benchmark.extra_info[f"{name}_p99_ms"] = p99
+    benchmark.extra_info["throughput_per_s"] = result.throughput
+    assert result.ingested == result.written > 0
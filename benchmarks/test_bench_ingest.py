@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+from collections import deque
+from pathlib import Path
+
+from cctv.aggregate.bucketer import add_usage_to_buckets
+from cctv.domain.models import BucketPoint
+from cctv.ingest.parser import parse_usage_line
+from cctv.ingest.schema import SchemaParser
+from cctv.ingest.tailer import JsonlTailer
+
+
+def test_parse_usage_line(benchmark, sample_lines) -> None:
+    def run() -> int:
+        parsed = 0
+        for line in sample_lines:
+            if parse_usage_line(line) is not None:
+                parsed += 1
+        return parsed
+
+    assert benchmark(run) > 0
+
+
+def test_schema_parser(benchmark, sample_lines) -> None:
+    parser = SchemaParser()
+    path = Path("session.jsonl")
+    parser.parse_lines(path, sample_lines[:50])
+
+    result = benchmark(parser.parse_lines, path, sample_lines)
+
+    assert result == [u for u in map(parse_usage_line, sample_lines) if u is not None]
+
+
+def test_tailer_full_read(benchmark, corpus) -> None:
+    def run() -> int:
+        tailer = JsonlTailer()
+        return sum(len(tailer.read_new_lines(path)) for path in corpus)
+
+    assert benchmark(run) > 0
+
+
+def test_tailer_idle_poll(benchmark, corpus) -> None:
+    tailer = JsonlTailer()
+    for path in corpus:
+        while tailer.read_new_lines(path):
+            pass
+
+    def run() -> int:
+        return sum(len(tailer.read_new_lines(path)) for path in corpus)
+
+    assert benchmark(run) == 0
+
+
+def test_add_usage_to_buckets(benchmark, sample_lines, corpus_spec) -> None:
+    usages = [u for u in map(parse_usage_line, sample_lines) if u is not None]
+
+    def run() -> int:
+        buckets = deque([BucketPoint(start_ms=corpus_spec.start_ms)], maxlen=120)
+        for usage in usages:
+            add_usage_to_buckets(buckets, usage, bucket_seconds=10)
+        return len(buckets)
+
+    assert benchmark(run) > 0
+
+
+def test_parse_line_without_id(benchmark) -> None:
+    # ID-less record with a large tool payload: the ID comes from the usage fields, not the line.
+    line = json.dumps({
+        "type": "assistant",
+        "sessionId": "s1",
+        "timestamp": "2026-02-21T06:49:42.972Z",
+        "toolUseResult": {"stdout": "x" * 200_000},
+        "message": {"model": "claude-sonnet-4-6", "usage": {"input_tokens": 12, "output_tokens": 3}},
+    })
+
+    usage = benchmark(parse_usage_line, line)
+
+    assert usage is not None and usage.event_id.startswith("h")
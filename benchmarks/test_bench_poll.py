@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import itertools
+from pathlib import Path
+
+from watchdog.utils.dirsnapshot import DirectorySnapshot
+
+from cctv.monitor.poller import ScandirPoller
+
+
+def _root(corpus: list[Path]) -> Path:
+    return corpus[0].parents[2]
+
+
+def test_watchdog_polling_pass(benchmark, corpus) -> None:
+    # What PollingObserver does every interval: walk and stat the whole tree.
+    snapshot = benchmark(lambda: DirectorySnapshot(str(_root(corpus)), recursive=True))
+
+    assert len(snapshot.paths) > len(corpus)
+
+
+def test_scandir_poller_pass(benchmark, corpus) -> None:
+    poller = ScandirPoller([_root(corpus)], lambda path: None)
+    poller._add_tree(str(_root(corpus)), 0.0, notify=False)
+    clock = itertools.count(1_000, 1_000)
+
+    # Every directory due: the worst case, before any backoff.
+    assert benchmark(lambda: poller.poll_once(float(next(clock)))) == 0
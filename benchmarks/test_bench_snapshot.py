@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from cctv.pricing import load_pricing
+from cctv.snapshot import build_snapshot, merge_snapshots
+
+
+def test_merge_snapshots(benchmark, corpus, tmp_path: Path) -> None:
+    pricing = load_pricing(None)
+    # One snapshot per session file, plus every one again from a second "machine".
+    inputs = []
+    for i, path in enumerate(corpus):
+        out = tmp_path / f"{i}.snap"
+        build_snapshot([(path, None)], out, pricing, source=f"dev{i}")
+        inputs.append(out)
+    inputs += inputs
+
+    result = benchmark(merge_snapshots, inputs, tmp_path / "merged.snap")
+
+    assert result.duplicates == result.snapshot.events
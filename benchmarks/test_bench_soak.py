@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from benchmarks.soak import SoakSpec, soak
+
+
+def test_rss_flat_under_session_churn(benchmark) -> None:
+    spec = SoakSpec(duration_s=20.0)
+
+    result = benchmark.pedantic(lambda: soak(spec, ["--max-memory", "32MB"]), rounds=1, iterations=1)
+
+    benchmark.extra_info["rss_start_mb"] = result.rss_mb[0]
+    benchmark.extra_info["rss_peak_mb"] = max(result.rss_mb)
+    benchmark.extra_info["growth_mb"] = result.growth_mb
+    assert result.lines > 0
+    assert result.growth_mb < 2.0
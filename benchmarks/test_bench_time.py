@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+
+from cctv.ingest.parser import _parse_timestamp_ms
+from cctv.util.time import parse_iso8601_ms
+
+
+def _legacy_parse_timestamp_ms(s: str) -> int:
+    # The pre-fast-path string branch of _parse_timestamp_ms, kept as the baseline.
+    s = s.strip()
+    if s.isdigit():
+        return int(s)
+    return int(datetime.fromisoformat(s.replace("Z", "+00:00")).timestamp() * 1000)
+
+
+@pytest.fixture(scope="module")
+def timestamps(sample_lines) -> list[str]:
+    out = []
+    for line in sample_lines:
+        start = line.rfind('"timestamp":"')
+        if start != -1:
+            out.append(line[start + 13 : line.index('"', start + 13)])
+    return out
+
+
+def test_timestamp_legacy(benchmark, timestamps) -> None:
+    benchmark(lambda: [_legacy_parse_timestamp_ms(s) for s in timestamps])
+
+
+def test_timestamp_fast_path(benchmark, timestamps) -> None:
+    result = benchmark(lambda: [parse_iso8601_ms(s) for s in timestamps])
+    assert result == [_legacy_parse_timestamp_ms(s) for s in timestamps]
+
+
+def test_timestamp_parser_entry_point(benchmark, timestamps) -> None:
+    benchmark(lambda: [_parse_timestamp_ms(s) for s in timestamps])
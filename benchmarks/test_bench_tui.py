@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+
+from cctv.config import parse_args
+from cctv.domain.models import BucketPoint
+from cctv.ingest.dedupe import DedupeCache
+from cctv.ingest.tailer import JsonlTailer
+from cctv.pricing import load_pricing
+from cctv.tui.render import render_histogram_grid
+
+
+def test_render_histogram_grid(benchmark) -> None:
+    buckets = deque(
+        (BucketPoint(start_ms=i * 1000, input_tokens=(i * 7919) % 50_000) for i in range(120)),
+        maxlen=120,
+    )
+
+    body = benchmark(render_histogram_grid, buckets, 50_000, "input", 200, 30)
+
+    assert body.count("\n") == 29
+
+
+def test_headless_tick(benchmark, corpus) -> None:
+    from cctv.tui.app import CctvApp
+
+    roots = sorted({path.parents[2] for path in corpus})
+    # Unbounded read budget: the benchmark measures one full backfill tick.
+    config = parse_args(["--read-budget-mb", "1024", "--read-budget-ms", "60000", "--no-time-index"])
+    app = CctvApp(config=config, pricing=load_pricing(None), roots=roots)
+
+    def reset() -> None:
+        app.pipeline.tailer = JsonlTailer()
+        app.pipeline.dedupe = DedupeCache()
+        for path in corpus:
+            app.pipeline.reads.enqueue(path)
+
+    async def run() -> None:
+        async with app.run_test(size=(160, 50)) as pilot:
+            # Let the startup scan finish first; it runs on a worker thread.
+            await app.workers.wait_for_complete()
+            await pilot.pause()
+            benchmark.pedantic(app._tick, setup=reset, rounds=5)
+
+    asyncio.run(run())
+
+    assert app.store.state.totals_by_model
+
+
+def test_filter_change(benchmark, corpus, corpus_spec) -> None:
+    from cctv.ingest.pipeline import UsagePipeline
+
+    roots = sorted({path.parents[2] for path in corpus})
+    config = parse_args(["--read-budget-mb", "1024", "--read-budget-ms", "60000", "--no-time-index"])
+    pipeline = UsagePipeline(config, load_pricing(None), roots)
+    for path in corpus:
+        pipeline.reads.enqueue(path)
+    # Tick on the corpus clock so the history index keeps it all.
+    now = corpus_spec.start_ms + 3_600_000
+    pipeline.tick(now)
+    store = pipeline.store
+    model, project = store.history.models()[0], store.history.projects()[0]
+
+    # What the TUI does when a filter changes: one index read, no event re-scan.
+    buckets = benchmark(store.filtered_buckets, model, project, 6 * 3_600_000, now)
+
+    assert sum(b.count for b in buckets) > 0
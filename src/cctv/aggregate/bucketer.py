@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from collections import deque
-from typing import Deque
+from typing import Deque, Iterable
 
 from cctv.domain.models import BucketPoint, RequestUsage
+from cctv.util.sketch import QuantileSketch
 from cctv.util.time import floor_to_bucket_ms
 
 
@@ -33,6 +34,22 @@ def add_usage_to_buckets(buckets: Deque[BucketPoint], usage: RequestUsage, bucke
     target.input_tokens += usage.input_tokens
     target.output_tokens += usage.output_tokens
     target.count += 1
+    if target.input_sketch is None:
+        target.input_sketch = QuantileSketch()
+        target.output_sketch = QuantileSketch()
+    target.input_sketch.add(usage.input_tokens)
+    target.output_sketch.add(usage.output_tokens)
+
+
+def window_sketches(buckets: Iterable[BucketPoint]) -> tuple[QuantileSketch, QuantileSketch]:
+    input_sketch = QuantileSketch()
+    output_sketch = QuantileSketch()
+    for point in buckets:
+        if point.input_sketch is not None:
+            input_sketch.merge(point.input_sketch)
+        if point.output_sketch is not None:
+            output_sketch.merge(point.output_sketch)
+    return input_sketch, output_sketch
 
 
 def empty_buckets(window_size: int, now_bucket_ms: int, bucket_seconds: int) -> Deque[BucketPoint]:
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+from cctv.domain.models import BucketPoint, RequestUsage
+from cctv.util.memory import SERIES_ENTRY_BYTES
+
+# Key of a series: (model, project), None meaning "any". A runtime alias,
+# so it is spelled with typing generics for Python 3.9.
+SeriesKey = Tuple[Optional[str], Optional[str]]
+
+
+class SeriesIndex:
+    """Token series per model, per project and per (model, project) pair.
+
+    Every usage lands in up to four series at ``resolution_ms``: the overall
+    one, its model's, its project's and the pair's. A filtered view is then
+    one series resampled to the requested buckets, at most
+    ``retention_ms / resolution_ms`` additions, however many events built it.
+    Each series maps a bucket start to ``[input, output, count]``.
+    """
+
+    def __init__(self, resolution_ms: int, retention_ms: int) -> None:
+        self.resolution_ms = resolution_ms
+        self.retention_ms = retention_ms
+        self._series: dict[SeriesKey, dict[int, list[int]]] = {}
+        # Oldest bucket start still kept; moved forward by prune and shed.
+        self._floor_ms: int | None = None
+        self._pruned_ms = 0
+
+    def add(self, usage: RequestUsage, project: str | None) -> None:
+        start = usage.timestamp_ms - usage.timestamp_ms % self.resolution_ms
+        if self._floor_ms is not None and start < self._floor_ms:
+            return
+        for key in _keys(usage.model, project):
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {}
+            cell = series.get(start)
+            if cell is None:
+                series[start] = [usage.input_tokens, usage.output_tokens, 1]
+            else:
+                cell[0] += usage.input_tokens
+                cell[1] += usage.output_tokens
+                cell[2] += 1
+
+    def prune(self, now_ms: int) -> None:
+        """Drop buckets older than the retention; does the work about four times per retention."""
+        if now_ms - self._pruned_ms < self.retention_ms // 4:
+            return
+        self._pruned_ms = now_ms
+        self._drop_before(now_ms - self.retention_ms)
+
+    def _drop_before(self, floor_ms: int) -> int:
+        floor_ms -= floor_ms % self.resolution_ms
+        if self._floor_ms is None or floor_ms > self._floor_ms:
+            self._floor_ms = floor_ms
+        dropped = 0
+        for key in list(self._series):
+            series = self._series[key]
+            stale = [start for start in series if start < floor_ms]
+            for start in stale:
+                del series[start]
+            dropped += len(stale)
+            if not series:
+                del self._series[key]
+        return dropped
+
+    def models(self) -> list[str]:
+        return sorted(model for model, project in self._series if model is not None and project is None)
+
+    def projects(self) -> list[str]:
+        return sorted(project for model, project in self._series if model is None and project is not None)
+
+    def buckets(
+        self,
+        model: str | None,
+        project: str | None,
+        start_ms: int,
+        bucket_ms: int,
+        count: int,
+    ) -> list[BucketPoint]:
+        """``count`` buckets of ``bucket_ms`` from ``start_ms`` for one filter.
+
+        ``bucket_ms`` should be a multiple of the resolution; a coarser index
+        bucket is counted whole in the output bucket it starts in.
+        """
+        points = [BucketPoint(start_ms=start_ms + i * bucket_ms) for i in range(count)]
+        end_ms = start_ms + count * bucket_ms
+        for start, (input_tokens, output_tokens, requests) in self._series.get((model, project), {}).items():
+            if start_ms <= start < end_ms:
+                point = points[(start - start_ms) // bucket_ms]
+                point.input_tokens += input_tokens
+                point.output_tokens += output_tokens
+                point.count += requests
+        return points
+
+    def clear(self) -> None:
+        self._series.clear()
+        self._floor_ms = None
+
+    def memory_usage(self) -> tuple[int, int]:
+        entries = sum(len(series) for series in self._series.values())
+        return entries, entries * SERIES_ENTRY_BYTES
+
+    def shed(self, fraction: float) -> int:
+        """Drop the oldest ``fraction`` of the retained time span."""
+        starts = [start for series in self._series.values() for start in series]
+        if not starts:
+            return 0
+        oldest, newest = min(starts), max(starts)
+        floor_ms = oldest + int((newest - oldest + self.resolution_ms) * fraction)
+        return self._drop_before(floor_ms) * SERIES_ENTRY_BYTES
+
+
+def _keys(model: str, project: str | None) -> tuple[SeriesKey, ...]:
+    if project is None:
+        return ((None, None), (model, None))
+    return ((None, None), (model, None), (None, project), (model, project))
@@ -17,6 +17,8 @@ def apply_usage_to_totals(
     total.uncached_input_tokens_total += usage.input_tokens
     total.cache_read_input_tokens_total += usage.cache_read_input_tokens
     total.last_request_cache_hit_rate = usage.request_cache_hit_rate
+    total.input_sketch.add(usage.input_tokens)
+    total.output_sketch.add(usage.output_tokens)
 
     in_rate, out_rate = model_price(pricing, usage.model)
     total.cost_usd += (usage.input_tokens / 1_000_000) * in_rate
@@ -26,3 +28,44 @@ def apply_usage_to_totals(
         total.cache_total_count += 1
         if usage.cache_hit:
             total.cache_hit_count += 1
+
+
+def merge_model_totals(dst: dict[str, ModelTotal], src: dict[str, ModelTotal]) -> None:
+    for model, other in src.items():
+        total = dst.get(model)
+        if total is None:
+            total = ModelTotal(model=model)
+            dst[model] = total
+        total.input_tokens += other.input_tokens
+        total.output_tokens += other.output_tokens
+        total.cost_usd += other.cost_usd
+        total.cache_hit_count += other.cache_hit_count
+        total.cache_total_count += other.cache_total_count
+        total.cache_read_input_tokens_total += other.cache_read_input_tokens_total
+        total.uncached_input_tokens_total += other.uncached_input_tokens_total
+        if other.last_request_cache_hit_rate is not None:
+            total.last_request_cache_hit_rate = other.last_request_cache_hit_rate
+        total.input_sketch.merge(other.input_sketch)
+        total.output_sketch.merge(other.output_sketch)
+
+
+def remove_usage_from_totals(totals_by_model: dict[str, ModelTotal], usage: RequestUsage, cost_usd: float) -> None:
+    """Undo ``apply_usage_to_totals`` for one usage counted twice, e.g. found while merging.
+
+    ``cost_usd`` is what the usage was charged when applied. Sketch bounds and
+    ``last_request_cache_hit_rate`` are not rolled back.
+    """
+    total = totals_by_model.get(usage.model)
+    if total is None:
+        return
+    total.input_tokens -= usage.input_tokens
+    total.output_tokens -= usage.output_tokens
+    total.uncached_input_tokens_total -= usage.input_tokens
+    total.cache_read_input_tokens_total -= usage.cache_read_input_tokens
+    total.input_sketch.remove(usage.input_tokens)
+    total.output_sketch.remove(usage.output_tokens)
+    total.cost_usd -= cost_usd
+    if usage.cache_hit is not None:
+        total.cache_total_count -= 1
+        if usage.cache_hit:
+            total.cache_hit_count -= 1
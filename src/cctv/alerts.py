@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import shutil
+import subprocess
+import sys
+from collections import deque
+from dataclasses import asdict, dataclass
+
+from cctv.aggregate.series import SeriesIndex
+from cctv.config import AppConfig
+from cctv.domain.models import RequestUsage
+from cctv.pricing import model_price
+from cctv.util.memory import PATH_ENTRY_BYTES
+
+log = logging.getLogger(__name__)
+
+# Detectors work on whole minutes of usage time, whatever the UI bucket width.
+_MINUTE_MS = 60_000
+# Only usage this recent can raise an alert.
+_RECENT_MS = 5 * _MINUTE_MS
+
+
+@dataclass(frozen=True)
+class Alert:
+    kind: str
+    subject: str
+    message: str
+    timestamp_ms: int
+
+
+class TokenSpikeDetector:
+    """EWMA z-score of tokens per minute across all models.
+
+    Closed minutes update an exponentially weighted mean and variance; the
+    minute being filled is checked against them on every event, so a spike
+    is caught while it happens. Empty minutes count as zero.
+    """
+
+    # Closed minutes needed before the baseline is trusted.
+    WARMUP = 10
+    # Gaps longer than this are as good as a fresh start.
+    _MAX_GAP = 240
+
+    def __init__(self, z_threshold: float, alpha: float = 0.1, min_tokens: int = 10_000) -> None:
+        self.z_threshold = z_threshold
+        self.alpha = alpha
+        self.min_tokens = min_tokens
+        self.mean = 0.0
+        self.var = 0.0
+        self.minutes = 0
+        self._minute: int | None = None
+        self.tokens = 0
+
+    def _close(self, value: float) -> None:
+        diff = value - self.mean
+        incr = self.alpha * diff
+        self.mean += incr
+        self.var = (1 - self.alpha) * (self.var + diff * incr)
+        self.minutes += 1
+
+    def observe(self, usage: RequestUsage) -> float | None:
+        """Add ``usage``; returns the current minute's z-score once it crosses the threshold."""
+        minute = usage.timestamp_ms // _MINUTE_MS
+        if self._minute is None:
+            self._minute = minute
+        elif minute > self._minute:
+            self._close(self.tokens)
+            for _ in range(min(minute - self._minute - 1, self._MAX_GAP)):
+                self._close(0)
+            self._minute = minute
+            self.tokens = 0
+        elif minute < self._minute:
+            return None  # late arrival for a closed minute
+        self.tokens += usage.input_tokens + usage.output_tokens
+        if self.minutes < self.WARMUP or self.tokens < self.min_tokens:
+            return None
+        z = (self.tokens - self.mean) / math.sqrt(max(self.var, 1.0))
+        return z if z >= self.z_threshold else None
+
+    def train(self, first_minute: int, totals: list[int]) -> None:
+        """Rebuild the baseline from tokens per minute, oldest first, starting at ``first_minute``.
+
+        Minutes from the one being filled onwards are left to ``observe``;
+        with none yet, the last minute of ``totals`` becomes the one being filled.
+        """
+        if not totals:
+            return
+        if self._minute is None:
+            stop = len(totals) - 1
+            self._minute = first_minute + stop
+            self.tokens = totals[stop]
+        else:
+            stop = max(0, min(len(totals), self._minute - first_minute))
+        self.mean = 0.0
+        self.var = 0.0
+        self.minutes = 0
+        gap: int | None = None  # zeros since the last busy minute; None before the first
+        for value in totals[:stop]:
+            if not value:
+                if gap is not None:
+                    gap += 1
+                continue
+            for _ in range(min(gap or 0, self._MAX_GAP)):
+                self._close(0)
+            self._close(value)
+            gap = 0
+        for _ in range(min(gap or 0, self._MAX_GAP)):
+            self._close(0)
+
+
+class MinuteCounter:
+    """Running total per key for the current minute; one slot per key."""
+
+    def __init__(self) -> None:
+        self._slots: dict[str, list[float]] = {}
+
+    def add(self, key: str, timestamp_ms: int, amount: float) -> float:
+        minute = timestamp_ms // _MINUTE_MS
+        slot = self._slots.get(key)
+        if slot is None or slot[0] < minute:
+            slot = self._slots[key] = [minute, 0.0]
+        elif slot[0] > minute:
+            return 0.0  # late arrival for a closed minute
+        slot[1] += amount
+        return slot[1]
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def compact(self) -> int:
+        """Drop keys with nothing in the latest minute seen; returns how many."""
+        if not self._slots:
+            return 0
+        latest = max(slot[0] for slot in self._slots.values())
+        stale = [key for key, slot in self._slots.items() if slot[0] < latest]
+        for key in stale:
+            del self._slots[key]
+        return len(stale)
+
+
+class AlertMonitor:
+    """Streaming checks on applied usage, O(1) per event.
+
+    * ``spike``: tokens this minute have a z-score over ``alert_z`` against
+      the EWMA baseline.
+    * ``cost``: one model's spend this minute exceeds ``alert_cost_per_min``.
+    * ``session``: one session file wrote more than ``alert_session_output``
+      output tokens this minute.
+
+    A check that fires again for the same subject within
+    ``alert_cooldown_seconds`` is suppressed, so a burst is one alert.
+    While ``backfilling``, usage too old to alert is skipped, since it
+    arrives newest file first; ``finish_backfill`` then trains the spike
+    baseline from the per-minute history in time order.
+    Alerts are logged, kept for the status line, and passed to the optional
+    desktop notification and command hooks.
+    """
+
+    def __init__(self, config: AppConfig, pricing: dict[str, dict[str, float]]) -> None:
+        self.config = config
+        self.pricing = pricing
+        self.spikes = TokenSpikeDetector(config.alert_z) if config.alert_z > 0 else None
+        self._cost = MinuteCounter()
+        self._session_output = MinuteCounter()
+        self._cooldown_ms = int(config.alert_cooldown_seconds * 1000)
+        self._last_fired: dict[tuple[str, str], int] = {}
+        self.recent: deque[Alert] = deque(maxlen=20)
+        self.fired = 0
+        self.suppressed = 0
+        self.backfilling = False
+
+    def observe(self, usage: RequestUsage, session: str | None, now: int) -> None:
+        recent = usage.timestamp_ms >= now - _RECENT_MS
+        if self.backfilling and not recent:
+            return
+        if self.spikes is not None:
+            z = self.spikes.observe(usage)
+            if z is not None and recent:
+                self._fire(
+                    "spike", "all", usage.timestamp_ms,
+                    f"token spike: {self.spikes.tokens} tokens this minute (z={z:.1f}, "
+                    f"baseline {self.spikes.mean:.0f}/min)",
+                )
+        if self.config.alert_cost_per_min > 0:
+            in_rate, out_rate = model_price(self.pricing, usage.model)
+            cost = usage.input_tokens / 1_000_000 * in_rate + usage.output_tokens / 1_000_000 * out_rate
+            spent = self._cost.add(usage.model, usage.timestamp_ms, cost)
+            if spent > self.config.alert_cost_per_min and recent:
+                self._fire(
+                    "cost", usage.model, usage.timestamp_ms,
+                    f"{usage.model} spent ${spent:.2f} this minute (limit ${self.config.alert_cost_per_min:g}/min)",
+                )
+        if session is not None and self.config.alert_session_output > 0:
+            written = self._session_output.add(session, usage.timestamp_ms, usage.output_tokens)
+            if written > self.config.alert_session_output and recent:
+                self._fire(
+                    "session", session, usage.timestamp_ms,
+                    f"session {session} wrote {int(written)} output tokens this minute "
+                    f"(limit {self.config.alert_session_output}/min)",
+                )
+
+    def finish_backfill(self, history: SeriesIndex, now: int) -> None:
+        """Train the spike baseline on ``history``'s retained minutes up to ``now``."""
+        self.backfilling = False
+        if self.spikes is None:
+            return
+        first = (now - history.retention_ms) // _MINUTE_MS
+        count = now // _MINUTE_MS - first + 1
+        points = history.buckets(None, None, first * _MINUTE_MS, _MINUTE_MS, count)
+        self.spikes.train(first, [p.input_tokens + p.output_tokens for p in points])
+
+    def memory_usage(self) -> tuple[int, int]:
+        entries = len(self._cost) + len(self._session_output) + len(self._last_fired)
+        return entries, entries * PATH_ENTRY_BYTES
+
+    def shed(self, fraction: float) -> int:
+        # Only drops state that can no longer affect an alert.
+        dropped = self._cost.compact() + self._session_output.compact()
+        if self._last_fired:
+            newest = max(self._last_fired.values())
+            for key in [k for k, t in self._last_fired.items() if newest - t >= self._cooldown_ms]:
+                del self._last_fired[key]
+                dropped += 1
+        return dropped * PATH_ENTRY_BYTES
+
+    @property
+    def latest(self) -> Alert | None:
+        return self.recent[-1] if self.recent else None
+
+    def _fire(self, kind: str, subject: str, timestamp_ms: int, message: str) -> None:
+        key = (kind, subject)
+        last = self._last_fired.get(key)
+        if last is not None and timestamp_ms - last < self._cooldown_ms:
+            self.suppressed += 1
+            return
+        self._last_fired[key] = timestamp_ms
+        alert = Alert(kind, subject, message, timestamp_ms)
+        self.recent.append(alert)
+        self.fired += 1
+        log.warning("Alert: %s", message)
+        if self.config.alert_notify:
+            _notify_desktop(alert)
+        if self.config.alert_command:
+            _run_command(self.config.alert_command, alert)
+
+
+def _spawn(args: list[str] | str, stdin: bytes | None = None, env: dict[str, str] | None = None) -> None:
+    # Fire and forget: a slow hook must never stall ingest.
+    try:
+        proc = subprocess.Popen(
+            args,
+            shell=isinstance(args, str),
+            stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env,
+        )
+        if stdin is not None:
+            proc.stdin.write(stdin)
+            proc.stdin.close()
+    except OSError as exc:
+        log.warning("Alert hook failed: %s", exc)
+
+
+def _notify_desktop(alert: Alert) -> None:
+    title = f"cctv: {alert.kind} alert"
+    if sys.platform == "darwin":
+        script = f"display notification {json.dumps(alert.message)} with title {json.dumps(title)}"
+        _spawn(["osascript", "-e", script])
+    elif shutil.which("notify-send"):
+        _spawn(["notify-send", title, alert.message])
+    else:
+        log.debug("No desktop notifier found for alert %s", alert.kind)
+
+
+def _run_command(command: str, alert: Alert) -> None:
+    """Run ``command`` through the shell with the alert as JSON on stdin and in ``CCTV_ALERT_*``."""
+    env = dict(os.environ)
+    env.update({
+        "CCTV_ALERT_KIND": alert.kind,
+        "CCTV_ALERT_SUBJECT": alert.subject,
+        "CCTV_ALERT_MESSAGE": alert.message,
+    })
+    _spawn(command, stdin=json.dumps(asdict(alert)).encode("utf-8"), env=env)
@@ -1,19 +1,66 @@
 from __future__ import annotations
 
+from pathlib import Path
+
 from cctv.config import parse_args
-from cctv.paths import default_usage_roots
+from cctv.paths import all_user_roots, default_socket_path, default_usage_roots
 from cctv.pricing import load_pricing
 from cctv.util.logging import configure_logging
+from cctv.util.profiling import PhaseTimer, run_profiled
 
 
 def main(argv: list[str] | None = None) -> None:
     config = parse_args(argv)
     configure_logging(config.log_level)
     pricing = load_pricing(config.pricing_path)
-    roots = default_usage_roots()
+    roots = all_user_roots(config.users_glob) if config.all_users else default_usage_roots()
+    if config.command == "serve-metrics":
+        from cctv.server.metrics import serve_metrics
+        serve_metrics(config, pricing, roots)
+        return
+    if config.command == "web":
+        from cctv.server.web import serve_web
+        serve_web(config, pricing, roots)
+        return
+    if config.command == "summary":
+        from cctv.summary import run_summary
+        run_summary(config, pricing, roots)
+        return
+    if config.command == "export":
+        from cctv.export import run_export
+        run_export(config, roots)
+        return
+    if config.command == "snapshot":
+        from cctv.snapshot import run_snapshot
+        run_snapshot(config, pricing, roots)
+        return
+    if config.command == "merge":
+        from cctv.snapshot import run_merge
+        run_merge(config)
+        return
+    if config.command == "query":
+        from cctv.database import run_query
+        run_query(config, pricing)
+        return
+    socket_path = Path(config.socket_path).expanduser() if config.socket_path else default_socket_path()
+    if config.command == "daemon":
+        from cctv.server.daemon import serve_daemon
+        serve_daemon(config, pricing, roots, socket_path)
+        return
+    from cctv.server.daemon import DaemonClient, daemon_available
     from cctv.tui.app import CctvApp
-    app = CctvApp(config=config, pricing=pricing, roots=roots)
-    app.run()
+    pipeline = None
+    perf = PhaseTimer(enabled=bool(config.profile_path))
+    if config.command == "replay":
+        from cctv.replay import build_replay
+        pipeline = build_replay(config, pricing, roots, perf=perf)
+    elif config.attach and daemon_available(socket_path):
+        pipeline = DaemonClient(socket_path, config.window_size, perf=perf)
+    app = CctvApp(config=config, pricing=pricing, roots=roots, pipeline=pipeline)
+    if config.profile_path:
+        run_profiled(app.run, config.profile_path)
+    else:
+        app.run()
 
 
 if __name__ == "__main__":
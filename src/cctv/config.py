@@ -4,6 +4,10 @@ import argparse
 import os
 from dataclasses import dataclass
 
+from cctv.util.memory import parse_size
+
+COMMANDS = ("tui", "serve-metrics", "daemon", "summary", "replay", "query", "export", "web", "snapshot", "merge")
+
 
 @dataclass
 class AppConfig:
@@ -15,6 +19,42 @@ class AppConfig:
     show_totals: bool
     show_cache_hit: bool
     log_level: str
+    show_percentiles: bool = True
+    profile_path: str | None = None
+    command: str = "tui"
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9464
+    web_host: str = "127.0.0.1"
+    web_port: int = 8765
+    read_budget_bytes: int = 8 * 1024 * 1024
+    read_budget_ms: int = 50
+    socket_path: str | None = None
+    attach: bool = True
+    all_users: bool = False
+    users_glob: str = "/home/*/.claude"
+    scan_workers: int = 8
+    max_watched_roots: int = 32
+    poll: bool = False
+    time_index: bool = True
+    index_dir: str | None = None
+    since: str | None = None
+    until: str | None = None
+    replay_from: str | None = None
+    replay_to: str | None = None
+    replay_speed: str = "60x"
+    db_path: str | None = None
+    query_by: str = "model"
+    max_memory_bytes: int | None = None
+    alert_z: float = 4.0
+    alert_cost_per_min: float = 2.0
+    alert_session_output: int = 50_000
+    alert_cooldown_seconds: float = 300.0
+    alert_notify: bool = False
+    alert_command: str | None = None
+    export_format: str = "parquet"
+    export_path: str | None = None
+    export_batch_rows: int = 65_536
+    inputs: tuple[str, ...] = ()
 
 
 def _env_bool(name: str, default: bool) -> bool:
@@ -35,6 +75,8 @@ def _parse_bucket(raw: str) -> int:
 
 def parse_args(argv: list[str] | None = None) -> AppConfig:
     parser = argparse.ArgumentParser(description="Claude Code token visualizer")
+    parser.add_argument("command", nargs="?", default="tui", choices=COMMANDS)
+    parser.add_argument("inputs", nargs="*", metavar="SNAPSHOT", help="merge: snapshot files to combine")
     parser.add_argument("--bucket", default=os.getenv("CCTV_BUCKET_SECONDS", "10"))
     parser.add_argument("--window", type=int, default=int(os.getenv("CCTV_WINDOW_SIZE", "120")))
     parser.add_argument("--refresh", type=float, default=float(os.getenv("CCTV_REFRESH_SECONDS", "1")))
@@ -44,8 +86,113 @@ def parse_args(argv: list[str] | None = None) -> AppConfig:
     parser.add_argument("--hide-totals", action="store_false", dest="show_totals")
     parser.add_argument("--show-cache-hit", action="store_true", default=_env_bool("CCTV_SHOW_CACHE_HIT", True))
     parser.add_argument("--hide-cache-hit", action="store_false", dest="show_cache_hit")
+    parser.add_argument(
+        "--show-percentiles", action="store_true", default=_env_bool("CCTV_SHOW_PERCENTILES", True)
+    )
+    parser.add_argument("--hide-percentiles", action="store_false", dest="show_percentiles")
     parser.add_argument("--log-level", default=os.getenv("CCTV_LOG_LEVEL", "INFO"))
+    parser.add_argument(
+        "--profile",
+        default=os.getenv("CCTV_PROFILE"),
+        help="Write profiling data on exit (*.folded: sampled stacks, otherwise cProfile stats)",
+    )
+    parser.add_argument(
+        "--read-budget-mb", type=float, default=float(os.getenv("CCTV_READ_BUDGET_MB", "8")),
+        help="Max MB read from session files per refresh; the rest carries over",
+    )
+    parser.add_argument("--read-budget-ms", type=int, default=int(os.getenv("CCTV_READ_BUDGET_MS", "50")))
+    parser.add_argument("--metrics-host", default=os.getenv("CCTV_METRICS_HOST", "127.0.0.1"))
+    parser.add_argument("--metrics-port", type=int, default=int(os.getenv("CCTV_METRICS_PORT", "9464")))
+    parser.add_argument("--web-host", default=os.getenv("CCTV_WEB_HOST", "127.0.0.1"))
+    parser.add_argument("--web-port", type=int, default=int(os.getenv("CCTV_WEB_PORT", "8765")))
+    parser.add_argument(
+        "--socket", default=None,
+        help="Daemon socket path (default: $CCTV_SOCKET or the per-user runtime dir)",
+    )
+    parser.add_argument(
+        "--no-attach", action="store_false", dest="attach", default=_env_bool("CCTV_ATTACH", True),
+        help="Ingest locally even if a cctv daemon is running",
+    )
+    parser.add_argument(
+        "--all-users", action="store_true", default=_env_bool("CCTV_ALL_USERS", False),
+        help="Watch every user's logs matching --users-glob, with per-user totals",
+    )
+    parser.add_argument("--users-glob", default=os.getenv("CCTV_USERS_GLOB", "/home/*/.claude"))
+    parser.add_argument("--scan-workers", type=int, default=int(os.getenv("CCTV_SCAN_WORKERS", "8")))
+    parser.add_argument(
+        "--max-watched-roots", type=int, default=int(os.getenv("CCTV_MAX_WATCHED_ROOTS", "32")),
+        help="Above this many log roots, poll file sizes instead of starting a watcher per root",
+    )
+    parser.add_argument(
+        "--poll", action="store_true", default=_env_bool("CCTV_POLL", False),
+        help="Poll for log changes instead of using inotify/FSEvents (NFS, some containers and WSL mounts)",
+    )
+    parser.add_argument(
+        "--no-time-index", action="store_false", dest="time_index", default=_env_bool("CCTV_TIME_INDEX", True),
+        help="Do not read or write per-file time index sidecars",
+    )
+    parser.add_argument("--index-dir", default=os.getenv("CCTV_INDEX_DIR"))
+    parser.add_argument(
+        "--max-memory", default=os.getenv("CCTV_MAX_MEMORY"), metavar="SIZE",
+        help="Memory budget, e.g. 128MB; caches are shed when RSS exceeds it",
+    )
+    parser.add_argument(
+        "--alert-z", type=float, default=float(os.getenv("CCTV_ALERT_Z", "4")),
+        help="Alert when tokens per minute reach this z-score over the EWMA baseline (0: off)",
+    )
+    parser.add_argument(
+        "--alert-cost-per-min", type=float, default=float(os.getenv("CCTV_ALERT_COST_PER_MIN", "2")),
+        help="Alert when one model spends more than this many USD in a minute (0: off)",
+    )
+    parser.add_argument(
+        "--alert-session-output", type=int, default=int(os.getenv("CCTV_ALERT_SESSION_OUTPUT", "50000")),
+        help="Alert when one session writes more output tokens than this in a minute (0: off)",
+    )
+    parser.add_argument(
+        "--alert-cooldown", dest="alert_cooldown_seconds", type=float,
+        default=float(os.getenv("CCTV_ALERT_COOLDOWN", "300")),
+        help="Seconds before the same alert can fire again",
+    )
+    parser.add_argument(
+        "--alert-notify", action="store_true", default=_env_bool("CCTV_ALERT_NOTIFY", False),
+        help="Also show alerts as desktop notifications",
+    )
+    parser.add_argument(
+        "--alert-command", default=os.getenv("CCTV_ALERT_COMMAND"),
+        help="Shell command run per alert, with the alert as JSON on stdin (e.g. a webhook curl)",
+    )
+    parser.add_argument(
+        "--db", dest="db_path", nargs="?", const="", default=os.getenv("CCTV_DB"), metavar="PATH",
+        help="Also store usage in a SQLite database (bare --db: the per-user data dir); read by cctv query",
+    )
+    parser.add_argument(
+        "--by", dest="query_by", default="model",
+        help="query: group by model, project, day, hour or minute (comma-separated)",
+    )
+    parser.add_argument("--since", help="summary/query/export/snapshot: start of range (24h, 7d, 2026-01-31, 2026-01-31T09:00)")
+    parser.add_argument("--until", help="summary/query/export/snapshot: end of range, exclusive (default: now)")
+    parser.add_argument(
+        "--format", dest="export_format", choices=("parquet", "arrow"), default="parquet",
+        help="export: output format",
+    )
+    parser.add_argument(
+        "-o", "--output", dest="export_path",
+        help="export/snapshot/merge: output file (default: cctv-usage.<format>, cctv.snap, none)",
+    )
+    parser.add_argument(
+        "--batch-rows", dest="export_batch_rows", type=int, default=65_536,
+        help="export: max rows per record batch / row group",
+    )
+    parser.add_argument("--from", dest="replay_from", help="replay: start time (same formats as --since)")
+    parser.add_argument("--to", dest="replay_to", help="replay: end time (default: now)")
+    parser.add_argument("--speed", dest="replay_speed", default="60x", help="replay: clock speed, e.g. 60x")
     args = parser.parse_args(argv)
+    if args.inputs and args.command != "merge":
+        parser.error(f"unexpected arguments for {args.command}: {' '.join(args.inputs)}")
+    try:
+        max_memory_bytes = parse_size(args.max_memory) if args.max_memory else None
+    except ValueError as exc:
+        parser.error(str(exc))
 
     return AppConfig(
         bucket_seconds=_parse_bucket(str(args.bucket)),
@@ -56,4 +203,40 @@ def parse_args(argv: list[str] | None = None) -> AppConfig:
         show_totals=args.show_totals,
         show_cache_hit=args.show_cache_hit,
         log_level=args.log_level,
+        show_percentiles=args.show_percentiles,
+        profile_path=args.profile,
+        command=args.command,
+        metrics_host=args.metrics_host,
+        metrics_port=args.metrics_port,
+        web_host=args.web_host,
+        web_port=args.web_port,
+        read_budget_bytes=int(args.read_budget_mb * 1024 * 1024),
+        read_budget_ms=args.read_budget_ms,
+        socket_path=args.socket,
+        attach=args.attach,
+        all_users=args.all_users,
+        users_glob=args.users_glob,
+        scan_workers=max(1, args.scan_workers),
+        max_watched_roots=args.max_watched_roots,
+        poll=args.poll,
+        time_index=args.time_index,
+        index_dir=args.index_dir,
+        since=args.since,
+        until=args.until,
+        replay_from=args.replay_from,
+        replay_to=args.replay_to,
+        replay_speed=args.replay_speed,
+        db_path=args.db_path,
+        query_by=args.query_by,
+        max_memory_bytes=max_memory_bytes,
+        alert_z=args.alert_z,
+        alert_cost_per_min=args.alert_cost_per_min,
+        alert_session_output=args.alert_session_output,
+        alert_cooldown_seconds=args.alert_cooldown_seconds,
+        alert_notify=args.alert_notify,
+        alert_command=args.alert_command,
+        export_format=args.export_format,
+        export_path=args.export_path,
+        export_batch_rows=args.export_batch_rows,
+        inputs=tuple(args.inputs),
     )
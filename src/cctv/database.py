@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+
+from cctv.config import AppConfig
+from cctv.domain.models import RequestUsage
+from cctv.paths import default_database_path
+from cctv.pricing import model_price
+from cctv.summary import parse_time_bound
+from cctv.util.time import now_ms
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    event_id TEXT NOT NULL,
+    ts_ms INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    project TEXT NOT NULL,
+    user TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cache_read_input_tokens INTEGER NOT NULL,
+    cache_creation_input_tokens INTEGER NOT NULL,
+    cache_hit INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS events_event_id ON events (event_id);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts_ms);
+
+CREATE TABLE IF NOT EXISTS rollup_minute (
+    minute_ms INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    project TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cache_read_input_tokens INTEGER NOT NULL,
+    cache_creation_input_tokens INTEGER NOT NULL,
+    PRIMARY KEY (minute_ms, model, project)
+) WITHOUT ROWID;
+
+-- INSERT OR IGNORE skips the trigger for duplicates, so every event is
+-- counted in its rollup row exactly once.
+CREATE TRIGGER IF NOT EXISTS events_rollup_minute AFTER INSERT ON events BEGIN
+    INSERT INTO rollup_minute VALUES (
+        NEW.ts_ms - NEW.ts_ms % 60000, NEW.model, NEW.project, 1,
+        NEW.input_tokens, NEW.output_tokens, NEW.cache_read_input_tokens, NEW.cache_creation_input_tokens
+    )
+    ON CONFLICT (minute_ms, model, project) DO UPDATE SET
+        requests = requests + 1,
+        input_tokens = input_tokens + excluded.input_tokens,
+        output_tokens = output_tokens + excluded.output_tokens,
+        cache_read_input_tokens = cache_read_input_tokens + excluded.cache_read_input_tokens,
+        cache_creation_input_tokens = cache_creation_input_tokens + excluded.cache_creation_input_tokens;
+END;
+"""
+
+_INSERT = "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+# SQL for each `cctv query --by` dimension, over rollup_minute.
+GROUPINGS = {
+    "model": "model",
+    "project": "project",
+    "day": "date(minute_ms / 1000, 'unixepoch', 'localtime')",
+    "hour": "strftime('%Y-%m-%d %H:00', minute_ms / 1000, 'unixepoch', 'localtime')",
+    "minute": "strftime('%Y-%m-%d %H:%M', minute_ms / 1000, 'unixepoch', 'localtime')",
+}
+
+
+def database_path(config: AppConfig) -> Path | None:
+    """The database ingest writes to: ``--db PATH``, bare ``--db`` for the default, else none."""
+    if config.db_path is None:
+        return None
+    return Path(config.db_path).expanduser() if config.db_path else default_database_path()
+
+
+def _connect(path: Path, read_only: bool = False) -> sqlite3.Connection:
+    if read_only:
+        return sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # One writer thread at a time; the pipeline may be built on another thread than it ticks on.
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+class UsageDatabase:
+    """Persistent usage events with trigger-maintained per-minute rollups.
+
+    Usage is buffered by ``add`` and written by ``flush`` in one transaction.
+    The unique ``event_id`` index makes inserts idempotent, so re-reading a
+    log after a restart adds nothing and the rollups never double count.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.conn = _connect(path)
+        self.inserted = 0
+        self._pending: list[tuple] = []
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(self, usages: list[RequestUsage], project: str | None) -> None:
+        project = project or ""
+        self._pending.extend(
+            (
+                u.event_id,
+                u.timestamp_ms,
+                u.model,
+                project,
+                u.user or "",
+                u.input_tokens,
+                u.output_tokens,
+                u.cache_read_input_tokens,
+                u.cache_creation_input_tokens,
+                u.cache_hit,
+            )
+            for u in usages
+        )
+
+    def flush(self) -> int:
+        """Write buffered usage; returns how many events were new."""
+        if not self._pending:
+            return 0
+        rows = self._pending
+        try:
+            with self.conn:
+                # Counts inserted events only, not the rollup rows the trigger touches.
+                new = self.conn.executemany(_INSERT, rows).rowcount
+        except sqlite3.Error as exc:
+            # Rolled back; the rows stay buffered for the next flush (e.g. another writer held the lock).
+            log.warning("Cannot write %d events to %s, will retry: %s", len(rows), self.path, exc)
+            return 0
+        self._pending = []
+        self.inserted += new
+        return new
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+
+@dataclass
+class QueryRow:
+    key: tuple[str, ...]
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+
+
+def query_rollups(
+    conn: sqlite3.Connection,
+    by: list[str],
+    pricing: dict[str, dict[str, float]],
+    since_ms: int | None = None,
+    until_ms: int | None = None,
+) -> list[QueryRow]:
+    """Usage in ``[since_ms, until_ms)`` grouped by ``by``, from the rollups alone.
+
+    Ranges are resolved to whole minutes. Cost is priced per model at query
+    time, so a changed pricing file applies to past usage as well.
+    """
+    for dim in by:
+        if dim not in GROUPINGS:
+            raise ValueError(f"Cannot group by {dim!r}; use {', '.join(GROUPINGS)}")
+    columns = [GROUPINGS[dim] for dim in by]
+    where, params = [], []
+    if since_ms is not None:
+        where.append("minute_ms >= ?")
+        params.append(since_ms - since_ms % 60_000)
+    if until_ms is not None:
+        where.append("minute_ms < ?")
+        params.append(until_ms)
+    sql = (
+        f"SELECT {', '.join([*columns, 'model'])}, sum(requests), sum(input_tokens), sum(output_tokens) "
+        f"FROM rollup_minute {'WHERE ' + ' AND '.join(where) if where else ''} "
+        f"GROUP BY {', '.join([*columns, 'model'])}"
+    )
+    rows: dict[tuple[str, ...], QueryRow] = {}
+    for *key, model, requests, input_tokens, output_tokens in conn.execute(sql, params):
+        group = tuple(str(k) for k in key)
+        row = rows.get(group)
+        if row is None:
+            row = rows[group] = QueryRow(key=group)
+        in_rate, out_rate = model_price(pricing, model)
+        row.requests += requests
+        row.input_tokens += input_tokens
+        row.output_tokens += output_tokens
+        row.cost_usd += input_tokens / 1_000_000 * in_rate + output_tokens / 1_000_000 * out_rate
+    return sorted(rows.values(), key=lambda r: r.key)
+
+
+def format_query(by: list[str], rows: list[QueryRow]) -> str:
+    if not rows:
+        return "No usage in range"
+    header = [*by, "requests", "input", "output", "cost"]
+    table = [
+        [*row.key, str(row.requests), str(row.input_tokens), str(row.output_tokens), f"${row.cost_usd:.4f}"]
+        for row in rows
+    ]
+    widths = [max(len(r[i]) for r in [header, *table]) for i in range(len(header))]
+    lines = []
+    for r in [header, *table]:
+        cells = [c.ljust(w) if i < len(by) else c.rjust(w) for i, (c, w) in enumerate(zip(r, widths))]
+        lines.append("  ".join(cells))
+    return "\n".join(lines)
+
+
+def run_query(config: AppConfig, pricing: dict[str, dict[str, float]]) -> None:
+    path = database_path(config) or default_database_path()
+    if not path.exists():
+        raise SystemExit(f"No usage database at {path}; run cctv or cctv daemon with --db to build one")
+    by = [dim.strip() for dim in config.query_by.split(",") if dim.strip()]
+    now = now_ms()
+    try:
+        since_ms = parse_time_bound(config.since, now) if config.since else None
+        until_ms = parse_time_bound(config.until, now) if config.until else None
+        conn = _connect(path, read_only=True)
+        try:
+            rows = query_rollups(conn, by, pricing, since_ms, until_ms)
+        finally:
+            conn.close()
+    except (ValueError, sqlite3.Error) as exc:
+        raise SystemExit(str(exc)) from None
+    print(format_query(by, rows))
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any
+
+from cctv.domain.models import BucketPoint, ModelTotal, StateSnapshot
+from cctv.domain.state import StateStore
+from cctv.util.sketch import QuantileSketch
+
+# JSON-ready encoding of published snapshots and of the difference between
+# two of them. Snapshots reuse unchanged bucket/total objects, so a delta is
+# found by identity and only carries what ingest touched.
+
+
+def bucket_row(point: BucketPoint) -> list[Any]:
+    return [
+        point.start_ms,
+        point.input_tokens,
+        point.output_tokens,
+        point.count,
+        point.input_sketch.to_dict() if point.input_sketch is not None else None,
+        point.output_sketch.to_dict() if point.output_sketch is not None else None,
+    ]
+
+
+def bucket_from_row(row: list[Any]) -> BucketPoint:
+    start_ms, input_tokens, output_tokens, count, input_sketch, output_sketch = row
+    return BucketPoint(
+        start_ms=start_ms,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        count=count,
+        input_sketch=QuantileSketch.from_dict(input_sketch) if input_sketch is not None else None,
+        output_sketch=QuantileSketch.from_dict(output_sketch) if output_sketch is not None else None,
+    )
+
+
+def total_row(total: ModelTotal) -> dict[str, Any]:
+    return {
+        "model": total.model,
+        "input_tokens": total.input_tokens,
+        "output_tokens": total.output_tokens,
+        "cost_usd": total.cost_usd,
+        "cache_hit_count": total.cache_hit_count,
+        "cache_total_count": total.cache_total_count,
+        "cache_read_input_tokens_total": total.cache_read_input_tokens_total,
+        "uncached_input_tokens_total": total.uncached_input_tokens_total,
+        "last_request_cache_hit_rate": total.last_request_cache_hit_rate,
+        "input_sketch": total.input_sketch.to_dict(),
+        "output_sketch": total.output_sketch.to_dict(),
+    }
+
+
+def total_from_row(row: dict[str, Any]) -> ModelTotal:
+    fields = dict(row)
+    fields["input_sketch"] = QuantileSketch.from_dict(row["input_sketch"])
+    fields["output_sketch"] = QuantileSketch.from_dict(row["output_sketch"])
+    return ModelTotal(**fields)
+
+
+def snapshot_message(snap: StateSnapshot, bucket_seconds: int) -> dict[str, Any]:
+    return {
+        "type": "snapshot",
+        "version": snap.version,
+        "bucket_seconds": bucket_seconds,
+        "buckets": [bucket_row(b) for b in snap.buckets],
+        "totals": [total_row(t) for t in snap.totals_by_model.values()],
+        "scale": [snap.scale_input_max, snap.scale_output_max],
+        "user_totals": [
+            {"user": user, **total_row(t)} for user, totals in snap.totals_by_user.items() for t in totals.values()
+        ],
+    }
+
+
+def delta_message(old: StateSnapshot, new: StateSnapshot) -> dict[str, Any]:
+    old_buckets = {b.start_ms: b for b in old.buckets}
+    return {
+        "type": "delta",
+        "version": new.version,
+        "first_start_ms": new.buckets[0].start_ms if new.buckets else None,
+        "buckets": [bucket_row(b) for b in new.buckets if old_buckets.get(b.start_ms) is not b],
+        "totals": [
+            total_row(t) for model, t in new.totals_by_model.items() if old.totals_by_model.get(model) is not t
+        ],
+        "scale": [new.scale_input_max, new.scale_output_max],
+        "user_totals": [
+            {"user": user, **total_row(t)}
+            for user, totals in new.totals_by_user.items()
+            for model, t in totals.items()
+            if old.totals_by_user.get(user, {}).get(model) is not t
+        ],
+    }
+
+
+def apply_message(store: StateStore, msg: dict[str, Any]) -> None:
+    """Apply a snapshot or delta message to ``store`` and publish it."""
+    state = store.state
+    if msg["type"] == "snapshot":
+        points = [bucket_from_row(row) for row in msg["buckets"]]
+        state.totals_by_model = {}
+        state.totals_by_user = {}
+    else:
+        by_start = {b.start_ms: b for b in state.buckets}
+        for row in msg["buckets"]:
+            by_start[row[0]] = bucket_from_row(row)
+        first = msg["first_start_ms"]
+        points = sorted(
+            (b for b in by_start.values() if first is None or b.start_ms >= first),
+            key=lambda b: b.start_ms,
+        )
+    store.replace_buckets(deque(points, maxlen=state.buckets.maxlen))
+    for row in msg["totals"]:
+        state.totals_by_model[row["model"]] = total_from_row(row)
+    for row in msg.get("user_totals", ()):
+        fields = dict(row)
+        user = fields.pop("user")
+        state.totals_by_user.setdefault(user, {})[row["model"]] = total_from_row(fields)
+    state.scale_input_max, state.scale_output_max = msg["scale"]
+    store.publish()
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Deque, Dict
+from typing import Deque, Dict, Mapping
+
+from cctv.util.sketch import QuantileSketch
 
 
 @dataclass(frozen=True)
@@ -14,6 +16,8 @@ class RequestUsage:
     cache_hit: bool | None = None
     cache_read_input_tokens: int = 0
     cache_creation_input_tokens: int = 0
+    # Owner of the log file; only set when several users' logs are watched.
+    user: str | None = None
 
     @property
     def request_cache_hit_rate(self) -> float | None:
@@ -29,6 +33,9 @@ class BucketPoint:
     input_tokens: int = 0
     output_tokens: int = 0
     count: int = 0
+    # Per-request size sketches, created on the first usage in the bucket.
+    input_sketch: QuantileSketch | None = field(default=None, repr=False, compare=False)
+    output_sketch: QuantileSketch | None = field(default=None, repr=False, compare=False)
 
 
 @dataclass
@@ -42,6 +49,8 @@ class ModelTotal:
     cache_read_input_tokens_total: int = 0
     uncached_input_tokens_total: int = 0
     last_request_cache_hit_rate: float | None = None
+    input_sketch: QuantileSketch = field(default_factory=QuantileSketch, repr=False, compare=False)
+    output_sketch: QuantileSketch = field(default_factory=QuantileSketch, repr=False, compare=False)
 
     @property
     def token_total(self) -> int:
@@ -68,11 +77,29 @@ class UiConfig:
     refresh_seconds: float = 1.0
     show_totals: bool = True
     show_cache_hit: bool = True
+    show_percentiles: bool = True
 
 
 @dataclass
 class AppState:
     buckets: Deque[BucketPoint]
     totals_by_model: Dict[str, ModelTotal] = field(default_factory=dict)
+    # Per-user partitions of totals_by_model, which stays the fleet-wide view.
+    totals_by_user: Dict[str, Dict[str, ModelTotal]] = field(default_factory=dict)
     scale_input_max: int = 100
     scale_output_max: int = 100
+
+
+@dataclass(frozen=True)
+class StateSnapshot:
+    """Immutable view of ``AppState`` published by ``StateStore``.
+
+    Buckets and totals are private copies; readers must not mutate them.
+    """
+
+    version: int
+    buckets: tuple[BucketPoint, ...]
+    totals_by_model: Mapping[str, ModelTotal]
+    scale_input_max: int
+    scale_output_max: int
+    totals_by_user: Mapping[str, Mapping[str, ModelTotal]] = field(default_factory=dict)
@@ -1,30 +1,84 @@
 from __future__ import annotations
 
 from collections import deque
+from dataclasses import replace
 import math
+from types import MappingProxyType
+from typing import Deque
 
 from cctv.aggregate.bucketer import add_usage_to_buckets, advance_buckets_to_time
+from cctv.aggregate.series import SeriesIndex
 from cctv.aggregate.totals import apply_usage_to_totals
-from cctv.domain.models import AppState, BucketPoint, RequestUsage
+from cctv.domain.models import AppState, BucketPoint, ModelTotal, RequestUsage, StateSnapshot
 from cctv.util.math import nice_step
 
 
+# Filtered views reach back this far at one-minute resolution.
+HISTORY_RESOLUTION_MS = 60_000
+HISTORY_RETENTION_MS = 24 * 3_600_000
+
+
+def next_scale(peak: int) -> int:
+    """A round y-axis maximum at least 5% above ``peak``."""
+    target = max(100, int(math.ceil(peak * 1.05)))
+    step = nice_step(target / 10)
+    return int(math.ceil(target / step) * step)
+
+
 class StateStore:
     def __init__(self, window_size: int, scale_max: int = 100) -> None:
+        self.window_size = window_size
         self.state = AppState(
             buckets=deque(maxlen=window_size),
             scale_input_max=scale_max,
             scale_output_max=scale_max,
         )
+        # Bumped on every state change so readers can skip unchanged state.
+        self.version = 0
+        # Copies reused across snapshots while the live object is unchanged,
+        # keyed by bucket start / model name and tagged with the live object
+        # and its request count: ingest mutates in place, while a snapshot or
+        # delta message replaces the objects wholesale.
+        self._bucket_copies: dict[int, tuple[BucketPoint, int, BucketPoint]] = {}
+        self._total_copies: dict[str, tuple[ModelTotal, int, ModelTotal]] = {}
+        self._user_total_copies: dict[str, dict[str, tuple[ModelTotal, int, ModelTotal]]] = {}
+        # Secondary indexes behind the TUI filters: ``recent`` matches the live
+        # buckets, ``history`` covers longer time ranges. They are live state,
+        # not part of the snapshot; read them on the thread that ingests.
+        self.recent = SeriesIndex(1_000, window_size * 1_000)
+        self.history = SeriesIndex(HISTORY_RESOLUTION_MS, HISTORY_RETENTION_MS)
+        self.snapshot = self._build_snapshot()
+
+    def replace_buckets(self, buckets: Deque[BucketPoint]) -> None:
+        self.state.buckets = buckets
+        self.version += 1
 
-    def apply_usage(self, usage: RequestUsage, bucket_seconds: int, price_per_million: dict[str, float]) -> None:
+    def apply_usage(
+        self,
+        usage: RequestUsage,
+        bucket_seconds: int,
+        price_per_million: dict[str, float],
+        project: str | None = None,
+    ) -> None:
+        self.version += 1
         add_usage_to_buckets(self.state.buckets, usage, bucket_seconds)
+        self._match_recent(bucket_seconds)
+        self.recent.add(usage, project)
+        self.history.add(usage, project)
         apply_usage_to_totals(self.state.totals_by_model, usage, price_per_million)
+        if usage.user is not None:
+            partition = self.state.totals_by_user.setdefault(usage.user, {})
+            apply_usage_to_totals(partition, usage, price_per_million)
         if usage.input_tokens > self.state.scale_input_max:
             self.state.scale_input_max = self._next_scale(usage.input_tokens)
         if usage.output_tokens > self.state.scale_output_max:
             self.state.scale_output_max = self._next_scale(usage.output_tokens)
 
+    def _match_recent(self, bucket_seconds: int) -> None:
+        # A new bucket width starts the recent index over, as it does the live buckets.
+        if self.recent.resolution_ms != bucket_seconds * 1000:
+            self.recent = SeriesIndex(bucket_seconds * 1000, self.window_size * bucket_seconds * 1000)
+
     def max_bucket_values(self) -> tuple[int, int]:
         if not self.state.buckets:
             return 0, 0
@@ -36,13 +90,107 @@ class StateStore:
         peak_input, peak_output = self.max_bucket_values()
         if peak_input > self.state.scale_input_max:
             self.state.scale_input_max = self._next_scale(peak_input)
+            self.version += 1
         if peak_output > self.state.scale_output_max:
             self.state.scale_output_max = self._next_scale(peak_output)
+            self.version += 1
 
     def advance_time(self, now_ms: int, bucket_seconds: int) -> None:
+        last_start = self.state.buckets[-1].start_ms if self.state.buckets else None
         advance_buckets_to_time(self.state.buckets, now_ms, bucket_seconds)
+        self._match_recent(bucket_seconds)
+        self.recent.prune(now_ms)
+        self.history.prune(now_ms)
+        if self.state.buckets and self.state.buckets[-1].start_ms != last_start:
+            self.version += 1
+
+    def filtered_buckets(
+        self,
+        model: str | None,
+        project: str | None,
+        range_ms: int | None,
+        now_ms: int,
+    ) -> list[BucketPoint]:
+        """Buckets for one model and/or project, read from the secondary indexes.
+
+        With ``range_ms`` None the buckets line up with the live window;
+        otherwise they cover the last ``range_ms`` in at most ``window_size``
+        buckets of whole minutes. Must be called from the ingesting thread.
+        """
+        if range_ms is None:
+            if not self.state.buckets:
+                return []
+            start = self.state.buckets[0].start_ms
+            return self.recent.buckets(model, project, start, self.recent.resolution_ms, len(self.state.buckets))
+        resolution = self.history.resolution_ms
+        bucket_ms = max(resolution, -(-range_ms // self.window_size // resolution) * resolution)
+        count = -(-range_ms // bucket_ms)
+        end = now_ms - now_ms % bucket_ms + bucket_ms
+        return self.history.buckets(model, project, end - count * bucket_ms, bucket_ms, count)
+
+    def publish(self) -> StateSnapshot:
+        """Swap in a new snapshot if the state changed since the last publish.
+
+        Must be called from the thread that mutates the state. Readers on
+        other threads take ``self.snapshot`` without locking.
+        """
+        if self.snapshot.version != self.version:
+            self.snapshot = self._build_snapshot()
+        return self.snapshot
+
+    def _build_snapshot(self) -> StateSnapshot:
+        bucket_copies: dict[int, tuple[BucketPoint, int, BucketPoint]] = {}
+        buckets: list[BucketPoint] = []
+        for point in self.state.buckets:
+            cached = self._bucket_copies.get(point.start_ms)
+            if cached is None or cached[0] is not point or cached[1] != point.count:
+                cached = (point, point.count, _copy_bucket(point))
+            bucket_copies[point.start_ms] = cached
+            buckets.append(cached[2])
+        self._bucket_copies = bucket_copies
+
+        self._user_total_copies = {
+            user: self._user_total_copies.get(user, {}) for user in self.state.totals_by_user
+        }
+        totals_by_user = {
+            user: _copy_totals(totals, self._user_total_copies[user])
+            for user, totals in self.state.totals_by_user.items()
+        }
+        return StateSnapshot(
+            version=self.version,
+            buckets=tuple(buckets),
+            totals_by_model=_copy_totals(self.state.totals_by_model, self._total_copies),
+            scale_input_max=self.state.scale_input_max,
+            scale_output_max=self.state.scale_output_max,
+            totals_by_user=MappingProxyType(totals_by_user),
+        )
 
     def _next_scale(self, peak: int) -> int:
-        target = max(100, int(math.ceil(peak * 1.05)))
-        step = nice_step(target / 10)
-        return int(math.ceil(target / step) * step)
+        return next_scale(peak)
+
+
+def _copy_bucket(point: BucketPoint) -> BucketPoint:
+    return replace(
+        point,
+        input_sketch=point.input_sketch.copy() if point.input_sketch is not None else None,
+        output_sketch=point.output_sketch.copy() if point.output_sketch is not None else None,
+    )
+
+
+def _copy_total(total: ModelTotal) -> ModelTotal:
+    return replace(total, input_sketch=total.input_sketch.copy(), output_sketch=total.output_sketch.copy())
+
+
+def _copy_totals(
+    live: dict[str, ModelTotal], copies: dict[str, tuple[ModelTotal, int, ModelTotal]]
+) -> MappingProxyType[str, ModelTotal]:
+    totals: dict[str, ModelTotal] = {}
+    for model, total in live.items():
+        cached = copies.get(model)
+        if cached is None or cached[0] is not total or cached[1] != total.input_sketch.count:
+            cached = (total, total.input_sketch.count, _copy_total(total))
+            copies[model] = cached
+        totals[model] = cached[2]
+    for model in copies.keys() - live.keys():
+        del copies[model]
+    return MappingProxyType(totals)
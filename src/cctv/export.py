@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from cctv.config import AppConfig
+from cctv.ingest.archive import ArchiveReader, is_archive
+from cctv.ingest.locator import scan_usage_files
+from cctv.ingest.schema import SchemaParser
+from cctv.paths import default_archive_cache_dir, project_of, root_user
+from cctv.summary import parse_time_bound, read_line_chunks
+from cctv.util.time import now_ms
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+
+FORMATS = ("parquet", "arrow")
+
+# (event_id, timestamp_ms, model, project, user, input, output, cache_read, cache_creation, cache_hit)
+Row = tuple
+
+_DICT_COLUMNS = ("model", "project", "user")
+
+
+def _schema() -> "pa.Schema":
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("event_id", pa.string()),
+        ("timestamp", pa.timestamp("ms", tz="UTC")),
+        ("model", dictionary),
+        ("project", dictionary),
+        ("user", dictionary),
+        ("input_tokens", pa.int64()),
+        ("output_tokens", pa.int64()),
+        ("cache_read_input_tokens", pa.int64()),
+        ("cache_creation_input_tokens", pa.int64()),
+        ("cache_hit", pa.bool_()),
+    ])
+
+
+def parse_file_rows(
+    path: Path,
+    user: str | None,
+    since_ms: int | None,
+    until_ms: int | None,
+    archive_cache_dir: Path | None = None,
+) -> list[Row]:
+    """Export rows for one usage file, timestamped in ``[since_ms, until_ms)``.
+
+    Runs in a worker process, so it takes and returns only plain values.
+    Archives are read through the disk cache in ``archive_cache_dir``, if given.
+    """
+    if is_archive(path):
+        usages = ArchiveReader(archive_cache_dir).usages(path)
+    else:
+        parser = SchemaParser()
+        usages = []
+        try:
+            for _, _, lines in read_line_chunks(path, 0, path.stat().st_size):
+                usages.extend(parser.parse_lines(path, lines))
+        except OSError:
+            pass
+    project = project_of(path)
+    return [
+        (
+            u.event_id,
+            u.timestamp_ms,
+            u.model,
+            project,
+            user,
+            u.input_tokens,
+            u.output_tokens,
+            u.cache_read_input_tokens,
+            u.cache_creation_input_tokens,
+            u.cache_hit,
+        )
+        for u in usages
+        if (since_ms is None or u.timestamp_ms >= since_ms) and (until_ms is None or u.timestamp_ms < until_ms)
+    ]
+
+
+def _ordered(executor: Executor, jobs: list[tuple], window: int) -> Iterator[list[Row]]:
+    # Keeps at most ``window`` files parsed ahead of the writer, in job order.
+    pending: deque = deque()
+    it = iter(jobs)
+    for job in it:
+        pending.append(executor.submit(parse_file_rows, *job))
+        if len(pending) >= window:
+            break
+    while pending:
+        yield pending.popleft().result()
+        job = next(it, None)
+        if job is not None:
+            pending.append(executor.submit(parse_file_rows, *job))
+
+
+class _BatchBuilder:
+    """Accumulates rows into record batches of at most ``batch_rows`` rows.
+
+    Model, project and user share one dictionary each for the whole export;
+    a batch's dictionary only ever extends the previous one, so writers can
+    emit it as a delta. Arrow IPC files treat an empty dictionary that later
+    grows as a replacement, so values known up front are passed as ``seed``.
+    """
+
+    def __init__(self, batch_rows: int, seed: dict[str, list[str]] | None = None) -> None:
+        self.schema = _schema()
+        self.batch_rows = batch_rows
+        self._rows: list[Row] = []
+        self._codes: dict[str, dict[str, int]] = {name: {} for name in _DICT_COLUMNS}
+        for name, values in (seed or {}).items():
+            for value in values:
+                self._codes[name].setdefault(value, len(self._codes[name]))
+
+    def add(self, rows: list[Row]) -> Iterator["pa.RecordBatch"]:
+        for row in rows:
+            self._rows.append(row)
+            if len(self._rows) >= self.batch_rows:
+                yield self.take()
+
+    def take(self) -> "pa.RecordBatch":
+        rows, self._rows = self._rows, []
+        columns = list(zip(*rows)) if rows else [()] * len(self.schema)
+        arrays = []
+        for i, field in enumerate(self.schema):
+            if field.name in self._codes:
+                arrays.append(self._encode(field.name, columns[i]))
+            else:
+                arrays.append(pa.array(columns[i], type=field.type))
+        return pa.record_batch(arrays, schema=self.schema)
+
+    def _encode(self, name: str, values: tuple) -> "pa.DictionaryArray":
+        codes = self._codes[name]
+        indices = [None if v is None else codes.setdefault(v, len(codes)) for v in values]
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int32()), pa.array(list(codes), type=pa.string())
+        )
+
+
+@dataclass
+class ExportResult:
+    files: int = 0
+    rows: int = 0
+    batches: int = 0
+
+
+def export_usage(
+    files: list[tuple[Path, str | None]],
+    output: Path,
+    fmt: str = "parquet",
+    since_ms: int | None = None,
+    until_ms: int | None = None,
+    batch_rows: int = 65_536,
+    executor: Executor | None = None,
+    window: int = 16,
+    archive_cache_dir: Path | None = None,
+) -> ExportResult:
+    """Write deduplicated usage from ``files`` to ``output`` as Parquet or Arrow IPC.
+
+    Files are parsed in ``executor`` (inline without one) and written in
+    order, a record batch at a time, so rows in memory are bounded by
+    ``window`` parsed files plus one batch regardless of how much history
+    there is. Deduplication covers the whole export, so it keeps one hash
+    per exported event.
+    """
+    if pa is None:
+        raise RuntimeError("Export needs pyarrow; install the 'arrow' extra")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; use {' or '.join(FORMATS)}")
+    result = ExportResult(files=len(files))
+    seed = {
+        "project": sorted({p for p in (project_of(path) for path, _ in files) if p is not None}),
+        "user": sorted({user for _, user in files if user is not None}),
+    }
+    builder = _BatchBuilder(max(1, batch_rows), seed)
+    seen: set[int] = set()
+    jobs = [(path, user, since_ms, until_ms, archive_cache_dir) for path, user in files]
+    if executor is None:
+        parsed: Iterator[list[Row]] = (parse_file_rows(*job) for job in jobs)
+    else:
+        parsed = _ordered(executor, jobs, window)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(output, builder.schema, compression="zstd")
+    else:
+        writer = pa_ipc.new_file(
+            output, builder.schema, options=pa_ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        )
+    with writer:
+        for rows in parsed:
+            fresh = []
+            for row in rows:
+                key = hash(row[0])
+                if key not in seen:
+                    seen.add(key)
+                    fresh.append(row)
+            rows = fresh
+            result.rows += len(rows)
+            for batch in builder.add(rows):
+                writer.write_batch(batch)
+                result.batches += 1
+        tail = builder.take()
+        if tail.num_rows or not result.batches:
+            writer.write_batch(tail)
+            result.batches += 1
+    return result
+
+
+def run_export(config: AppConfig, roots: list[Path]) -> None:
+    now = now_ms()
+    try:
+        since_ms = parse_time_bound(config.since, now) if config.since else None
+        until_ms = parse_time_bound(config.until, now) if config.until else None
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from None
+    if pa is None:
+        raise SystemExit("cctv export needs pyarrow; install the 'arrow' extra")
+    files: list[tuple[Path, str | None]] = []
+    for root in roots:
+        user = root_user(root) if config.all_users else None
+        files.extend((path, user) for path in sorted(scan_usage_files([root])))
+    output = Path(config.export_path or f"cctv-usage.{config.export_format}").expanduser()
+    with ProcessPoolExecutor(max_workers=config.scan_workers) as executor:
+        result = export_usage(
+            files, output, config.export_format, since_ms, until_ms, config.export_batch_rows, executor,
+            window=2 * config.scan_workers, archive_cache_dir=default_archive_cache_dir(),
+        )
+    print(f"wrote {result.rows} events from {result.files} files to {output} ({result.batches} batches)")
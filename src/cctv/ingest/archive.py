@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import BinaryIO
+
+from cctv.domain.models import RequestUsage
+from cctv.ingest.schema import SchemaParser
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+log = logging.getLogger(__name__)
+
+_READ_ERRORS: tuple[type[BaseException], ...] = (OSError, EOFError, ValueError)
+if zstandard is not None:
+    _READ_ERRORS += (zstandard.ZstdError,)
+
+ARCHIVE_SUFFIXES = (".jsonl.gz", ".jsonl.zst")
+USAGE_SUFFIXES = (".jsonl", *ARCHIVE_SUFFIXES)
+
+# Decompressed bytes parsed per block.
+_BLOCK_BYTES = 4 * 1024 * 1024
+# Decompressed bytes read per step when only the first records are wanted.
+_PEEK_BYTES = 64 * 1024
+# 2: records without an ID get content-derived IDs (see parser.content_event_id).
+_FORMAT = 2
+
+
+def is_usage_file(path: Path) -> bool:
+    return path.name.endswith(USAGE_SUFFIXES)
+
+
+def is_archive(path: Path) -> bool:
+    return path.name.endswith(ARCHIVE_SUFFIXES)
+
+
+def content_hash(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with path.open("rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _open_decompressed(path: Path) -> BinaryIO | None:
+    if path.name.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if zstandard is None:
+        return None
+    return zstandard.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True)
+
+
+def first_usage_ms(path: Path) -> int | None:
+    """Earliest timestamp among the archive's first usage records, decompressing as little as possible."""
+    stream = _open_decompressed(path)
+    if stream is None:
+        return None
+    parser = SchemaParser()
+    tail = b""
+    try:
+        with stream:
+            while block := stream.read(_PEEK_BYTES):
+                data = tail + block
+                cut = data.rfind(b"\n") + 1
+                tail = data[cut:]
+                usages = parser.parse_lines(path, _lines(data[:cut]))
+                if usages:
+                    return min(u.timestamp_ms for u in usages)
+    except _READ_ERRORS:
+        return None
+    usages = parser.parse_lines(path, _lines(tail))
+    return min((u.timestamp_ms for u in usages), default=None)
+
+
+def _usage_row(usage: RequestUsage) -> list:
+    return [
+        usage.event_id,
+        usage.timestamp_ms,
+        usage.model,
+        usage.input_tokens,
+        usage.output_tokens,
+        usage.cache_hit,
+        usage.cache_read_input_tokens,
+        usage.cache_creation_input_tokens,
+    ]
+
+
+class ArchiveReader:
+    """Read path for compressed, immutable session logs.
+
+    An archive is decompressed as a stream and parsed block by block, once.
+    With ``cache_dir``, its usage records are cached on disk under the hash
+    of its compressed bytes, so a known archive is never decompressed again
+    even if it is renamed or moved. Nothing is kept in memory: callers
+    consume each archive's rows once.
+    """
+
+    def __init__(self, cache_dir: Path | None = None) -> None:
+        self.cache_dir = cache_dir
+        self._warned_zstd = False
+        self.decompressed_bytes = 0
+
+    def usages(self, path: Path) -> list[RequestUsage]:
+        """Every usage record in the archive at ``path`` (empty if unreadable)."""
+        try:
+            key = content_hash(path)
+        except OSError:
+            return []
+        cached = self._load(key)
+        if cached is not None:
+            return cached
+        parsed = self._parse(path)
+        if parsed is None:
+            return []
+        usages, complete = parsed
+        if complete:
+            self._store(key, usages)
+        return usages
+
+    def _parse(self, path: Path) -> tuple[list[RequestUsage], bool] | None:
+        stream = _open_decompressed(path)
+        if stream is None:
+            if not self._warned_zstd:
+                log.warning("Skipping .jsonl.zst archives; install the 'zstd' extra (zstandard) to read them")
+                self._warned_zstd = True
+            return None
+        parser = SchemaParser()
+        out: list[RequestUsage] = []
+        tail = b""
+        try:
+            with stream:
+                while block := stream.read(_BLOCK_BYTES):
+                    self.decompressed_bytes += len(block)
+                    data = tail + block
+                    cut = data.rfind(b"\n") + 1
+                    tail = data[cut:]
+                    out.extend(parser.parse_lines(path, _lines(data[:cut])))
+            out.extend(parser.parse_lines(path, _lines(tail)))
+        except _READ_ERRORS as exc:
+            # Truncated or corrupt archive: keep what was readable, but do not cache it.
+            log.warning("Cannot fully read archive %s: %s", path, exc)
+            out.extend(parser.parse_lines(path, _lines(tail)))
+            return out, False
+        return out, True
+
+    def _cache_path(self, key: str) -> Path | None:
+        return self.cache_dir / f"{key}.json" if self.cache_dir is not None else None
+
+    def _load(self, key: str) -> list[RequestUsage] | None:
+        cache_path = self._cache_path(key)
+        if cache_path is None:
+            return None
+        try:
+            data = json.loads(cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        # A cache file of the wrong shape is treated as missing and rebuilt.
+        try:
+            if data.get("format") != _FORMAT:
+                return None
+            return [RequestUsage(*row) for row in data["usages"]]
+        except (AttributeError, KeyError, TypeError):
+            return None
+
+    def _store(self, key: str, usages: list[RequestUsage]) -> None:
+        cache_path = self._cache_path(key)
+        if cache_path is None:
+            return
+        tmp = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(
+                json.dumps({"format": _FORMAT, "usages": [_usage_row(u) for u in usages]}, separators=(",", ":")),
+                encoding="utf-8",
+            )
+            os.replace(tmp, cache_path)
+        except OSError as exc:
+            log.debug("Cannot cache archive results in %s: %s", cache_path, exc)
+
+
+def _lines(data: bytes) -> list[str]:
+    return [line for line in data.decode("utf-8", errors="replace").splitlines() if line.strip()]
@@ -2,19 +2,47 @@ from __future__ import annotations
 
 from collections import deque
 
+from cctv.util.memory import ID_ENTRY_BYTES
+
 
 class DedupeCache:
+    """Recently seen event IDs, kept as their built-in 64-bit hashes.
+
+    An int costs about a third of a UUID string; two distinct IDs among the
+    50,000 kept share a hash with odds around 1 in 10^10.
+    """
+
+    # Shedding never takes the cache below this many recent IDs.
+    MIN_SIZE = 5_000
+
     def __init__(self, max_size: int = 50_000) -> None:
-        self._seen: set[str] = set()
-        self._queue: deque[str] = deque()
+        self._seen: set[int] = set()
+        self._queue: deque[int] = deque()
         self._max_size = max_size
 
+    def __len__(self) -> int:
+        return len(self._queue)
+
     def add_if_new(self, event_id: str) -> bool:
-        if event_id in self._seen:
+        key = hash(event_id)
+        if key in self._seen:
             return False
-        self._seen.add(event_id)
-        self._queue.append(event_id)
+        self._seen.add(key)
+        self._queue.append(key)
         if len(self._queue) > self._max_size:
             old = self._queue.popleft()
             self._seen.discard(old)
         return True
+
+    def memory_usage(self) -> tuple[int, int]:
+        return len(self._queue), len(self._queue) * ID_ENTRY_BYTES
+
+    def shed(self, fraction: float) -> int:
+        """Forget the oldest ``fraction`` of IDs and keep the cache that much smaller."""
+        keep = max(self.MIN_SIZE, int(len(self._queue) * (1 - fraction)))
+        self._max_size = min(self._max_size, keep)
+        dropped = 0
+        while len(self._queue) > self._max_size:
+            self._seen.discard(self._queue.popleft())
+            dropped += 1
+        return dropped * ID_ENTRY_BYTES
@@ -1,15 +1,52 @@
 from __future__ import annotations
 
+from concurrent.futures import Executor
 from pathlib import Path
 
+from cctv.ingest.archive import is_usage_file
+
 
 def find_usage_files(roots: list[Path]) -> list[Path]:
     files: list[Path] = []
     for root in roots:
         if not root.exists():
             continue
-        for path in root.rglob("*.jsonl"):
+        for path in root.rglob("*.jsonl*"):
             # Claude session logs are often UUID-named jsonl files under projects/.
             # Keep history for fallback and let parser filter non-usage records.
-            files.append(path)
+            # Compressed archives (.jsonl.gz / .jsonl.zst) are included too.
+            if is_usage_file(path):
+                files.append(path)
     return sorted(set(files))
+
+
+def _scan_root(root: Path) -> dict[Path, tuple[int, int]]:
+    stats: dict[Path, tuple[int, int]] = {}
+    if not root.exists():
+        return stats
+    for path in root.rglob("*.jsonl*"):
+        if not is_usage_file(path):
+            continue
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        stats[path] = (st.st_size, st.st_mtime_ns)
+    return stats
+
+
+def scan_usage_file_stats(roots: list[Path], executor: Executor | None = None) -> dict[Path, tuple[int, int]]:
+    """Map every usage file under ``roots`` to its current ``(size, mtime_ns)``.
+
+    With an ``executor``, each root is scanned as its own shard.
+    """
+    stats: dict[Path, tuple[int, int]] = {}
+    shards = executor.map(_scan_root, roots) if executor is not None else map(_scan_root, roots)
+    for shard in shards:
+        stats.update(shard)
+    return stats
+
+
+def scan_usage_files(roots: list[Path], executor: Executor | None = None) -> dict[Path, int]:
+    """Map every usage file under ``roots`` to its current size."""
+    return {path: size for path, (size, _) in scan_usage_file_stats(roots, executor).items()}
@@ -1,12 +1,12 @@
 from __future__ import annotations
 
-import hashlib
 import json
 from datetime import datetime
 from typing import Any
 
 from cctv.domain.models import RequestUsage
-from cctv.util.time import now_ms
+from cctv.util.hashing import digest64
+from cctv.util.time import now_ms, parse_iso8601_ms
 
 
 INPUT_KEYS = ["input_tokens", "input", "prompt_tokens", "inputTokenCount"]
@@ -15,6 +15,8 @@ TS_KEYS = ["timestamp_ms", "timestamp", "created_at_ms", "created_at"]
 MODEL_KEYS = ["model", "model_name", "modelId"]
 CACHE_KEYS = ["cache_hit", "prompt_cache_hit", "cacheHit"]
 ID_KEYS = ["event_id", "request_id", "id"]
+FALLBACK_ID_KEYS = ["uuid", "requestId", "messageId"]
+SESSION_KEYS = ["sessionId", "session_id"]
 
 
 def _nested_get(rec: dict[str, Any], path: tuple[str, ...]) -> Any | None:
@@ -43,6 +45,13 @@ def _pick_str(rec: dict[str, Any], keys: list[str], default: str = "unknown") ->
     return default
 
 
+def _pick_raw(rec: dict[str, Any], keys: list[str]) -> Any | None:
+    for k in keys:
+        if k in rec and rec[k] is not None:
+            return rec[k]
+    return None
+
+
 def _pick_bool(rec: dict[str, Any], keys: list[str]) -> bool | None:
     for k in keys:
         if k in rec:
@@ -57,6 +66,10 @@ def _pick_bool(rec: dict[str, Any], keys: list[str]) -> bool | None:
 
 
 def _parse_timestamp_ms(val: Any) -> int:
+    if isinstance(val, str):
+        fast = parse_iso8601_ms(val)
+        if fast is not None:
+            return fast
     if val is None:
         return now_ms()
     if isinstance(val, (int, float)):
@@ -77,14 +90,71 @@ def _parse_timestamp_ms(val: Any) -> int:
     return now_ms()
 
 
-def parse_usage_line(line: str) -> RequestUsage | None:
+def load_record(line: str) -> dict[str, Any] | None:
     try:
         rec = json.loads(line)
     except json.JSONDecodeError:
         return None
     if not isinstance(rec, dict):
         return None
+    return rec
+
+
+def parse_usage_line(line: str) -> RequestUsage | None:
+    rec = load_record(line)
+    if rec is None:
+        return None
+    return parse_usage_record(rec, line)
+
 
+def pick_event_id(rec: dict[str, Any]) -> str:
+    """The record's own ID, or "" when it has none."""
+    event_id = _pick_str(rec, ID_KEYS, default="")
+    if not event_id:
+        event_id = _pick_str(rec, FALLBACK_ID_KEYS, default="")
+    return event_id
+
+
+def content_event_id(
+    rec: dict[str, Any],
+    line: str,
+    raw_ts: Any,
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    cache_read_input_tokens: int,
+    cache_creation_input_tokens: int,
+) -> str:
+    """Event ID for a record without one, from the fields that identify the request.
+
+    The timestamp as written, model, token counts and session ID are hashed,
+    not the line, so large tool payloads cost nothing and the ID does not
+    depend on which file (live or archived) the line is read from. Two
+    records that agree on all of them are counted once. Without a timestamp
+    the record is not identifiable; its parsed time is "now", so the ID
+    would change on every read, and the whole line is hashed instead.
+    """
+    if raw_ts is None:
+        key = line
+    else:
+        session = _pick_raw(rec, SESSION_KEYS)
+        # Fields are NUL-separated so no two different tuples share a key.
+        key = "\0".join(map(str, (
+            raw_ts, model, input_tokens, output_tokens, cache_read_input_tokens, cache_creation_input_tokens, session,
+        )))
+    return f"h{digest64(key.encode('utf-8')):016x}"
+
+
+def pick_cache_fields(rec: dict[str, Any], usage_rec: dict[str, Any]) -> tuple[bool, int, int]:
+    cache_hit = _pick_bool(rec, CACHE_KEYS)
+    cache_read_input_tokens = _pick_int(usage_rec, ["cache_read_input_tokens"], default=0)
+    cache_creation_input_tokens = _pick_int(usage_rec, ["cache_creation_input_tokens"], default=0)
+    if cache_hit is None:
+        cache_hit = cache_read_input_tokens > 0
+    return cache_hit, cache_read_input_tokens, cache_creation_input_tokens
+
+
+def parse_usage_record(rec: dict[str, Any], line: str) -> RequestUsage | None:
     usage_obj = _nested_get(rec, ("message", "usage"))
     usage_rec = usage_obj if isinstance(usage_obj, dict) else rec
 
@@ -93,14 +163,8 @@ def parse_usage_line(line: str) -> RequestUsage | None:
     if input_tokens == 0 and output_tokens == 0:
         return None
 
-    ts_ms = _parse_timestamp_ms(_pick_str(rec, TS_KEYS, default=str(now_ms())))
-
-    event_id = _pick_str(rec, ID_KEYS, default="")
-    if not event_id:
-        event_id = _pick_str(rec, ["uuid", "requestId", "messageId"], default="")
-    if not event_id:
-        digest = hashlib.sha1(line.encode("utf-8")).hexdigest()
-        event_id = digest
+    raw_ts = _pick_raw(rec, TS_KEYS)
+    ts_ms = _parse_timestamp_ms(raw_ts)
 
     model = _pick_str(rec, MODEL_KEYS, default="")
     if not model:
@@ -109,11 +173,10 @@ def parse_usage_line(line: str) -> RequestUsage | None:
         nested_model = _nested_get(rec, ("message", "model"))
         model = str(nested_model) if nested_model else "unknown"
 
-    cache_hit = _pick_bool(rec, CACHE_KEYS)
-    cache_read_input_tokens = _pick_int(usage_rec, ["cache_read_input_tokens"], default=0)
-    cache_creation_input_tokens = _pick_int(usage_rec, ["cache_creation_input_tokens"], default=0)
-    if cache_hit is None:
-        cache_hit = cache_read_input_tokens > 0
+    cache_hit, cache_read_input_tokens, cache_creation_input_tokens = pick_cache_fields(rec, usage_rec)
+    event_id = pick_event_id(rec) or content_event_id(
+        rec, line, raw_ts, model, input_tokens, output_tokens, cache_read_input_tokens, cache_creation_input_tokens
+    )
 
     return RequestUsage(
         event_id=event_id,
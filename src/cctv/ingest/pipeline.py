@@ -0,0 +1,485 @@
+from __future__ import annotations
+
+import logging
+import queue
+import sqlite3
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Callable, Iterator
+
+from cctv.aggregate.bucketer import empty_buckets
+from cctv.alerts import AlertMonitor
+from cctv.config import AppConfig
+from cctv.database import UsageDatabase, database_path
+from cctv.domain.models import RequestUsage, StateSnapshot
+from cctv.domain.state import StateStore
+from cctv.ingest.archive import ArchiveReader, is_archive
+from cctv.ingest.dedupe import DedupeCache
+from cctv.ingest.locator import scan_usage_file_stats, scan_usage_files
+from cctv.ingest.read_scheduler import ReadScheduler
+from cctv.ingest.schema import SchemaParser
+from cctv.ingest.tailer import JsonlTailer
+from cctv.ingest.time_index import TimeIndexStore
+from cctv.monitor.scheduler import DebouncedRunner
+from cctv.monitor.watcher import UsageWatcher
+from cctv.paths import default_archive_cache_dir, default_index_dir, project_of, root_user
+from cctv.util.memory import PATH_ENTRY_BYTES, USAGE_ENTRY_BYTES, MemoryGovernor
+from cctv.util.profiling import PhaseTimer
+from cctv.util.time import floor_to_bucket_ms, now_ms
+
+log = logging.getLogger(__name__)
+
+# Archives modified more recently than this are assumed to be mid-write.
+_ARCHIVE_SETTLE_MS = 2_000
+# Parsed archive rows are applied in slices this long, between budget checks.
+_ARCHIVE_SLICE_ROWS = 4_096
+
+
+@dataclass
+class _ArchiveRows:
+    """A parsed archive whose rows are being applied, ``applied`` at a time."""
+
+    path: Path
+    project: str | None
+    usages: list[RequestUsage]
+    applied: int = 0
+
+
+@dataclass
+class BackfillProgress:
+    """How much of the history found at startup has been read.
+
+    ``pending`` maps each file still being read to its bytes left; files
+    found later are live traffic and are not counted.
+    """
+
+    files_total: int = 0
+    bytes_total: int = 0
+    files_done: int = 0
+    bytes_done: int = 0
+    pending: dict[Path, int] = field(default_factory=dict)
+
+    @classmethod
+    def of(cls, sizes: dict[Path, int]) -> BackfillProgress:
+        return cls(files_total=len(sizes), bytes_total=sum(sizes.values()), pending=dict(sizes))
+
+    @property
+    def active(self) -> bool:
+        return bool(self.pending)
+
+    def advance(self, path: Path, consumed: int, finished: bool) -> None:
+        left = self.pending.get(path)
+        if left is None:
+            return
+        # A file can grow while it is backfilled; count at most its size at startup.
+        consumed = left if finished else min(max(consumed, 0), left)
+        self.bytes_done += consumed
+        if finished:
+            del self.pending[path]
+            self.files_done += 1
+        else:
+            self.pending[path] = left - consumed
+
+    def describe(self) -> str:
+        return (
+            f"indexed {self.files_done} of {self.files_total} files / "
+            f"{self.bytes_done / 1_048_576:.1f} of {self.bytes_total / 1_048_576:.1f} MB"
+        )
+
+
+class UsagePipeline:
+    """watcher → tailer → parser → dedupe → StateStore, without any UI.
+
+    ``config`` is shared with the caller, so changes to ``bucket_seconds``
+    take effect on the next tick.
+
+    With ``config.all_users`` each root is one user's log directory and
+    usage is attributed to that user. Root scans run as shards on a thread
+    pool; past ``config.max_watched_roots`` roots, no watcher is started and
+    a frequent size scan finds changed files instead.
+
+    Startup backfill reads the most recently modified files first, so the
+    live window fills before older history; ``backfill`` tracks how far it
+    has got. Alerts skip older usage until it is done, then train on the
+    per-minute history.
+    """
+
+    # Names the data source in the totals header.
+    label = "session"
+
+    def __init__(
+        self,
+        config: AppConfig,
+        pricing: dict[str, dict[str, float]],
+        roots: list[Path],
+        perf: PhaseTimer | None = None,
+    ) -> None:
+        self.config = config
+        self.pricing = pricing
+        self.roots = roots
+        self.perf = perf or PhaseTimer()
+        self.scheduler = DebouncedRunner(config.debounce_ms)
+        self.store = StateStore(window_size=config.window_size)
+        self.reset_buckets()
+        self.dedupe = DedupeCache()
+        self.alerts = AlertMonitor(config, pricing)
+        self.tailer = JsonlTailer(track_stats=self.perf.enabled)
+        self.parser = SchemaParser()
+        self.reads = ReadScheduler(
+            byte_budget=config.read_budget_bytes,
+            time_budget_ms=config.read_budget_ms,
+        )
+        # _known_files: all discovered .jsonl paths, with their size at the
+        # last scan (-1 if only the watcher has seen them). Files waiting to
+        # be read (watchdog changes, backfill, leftovers) are queued in self.reads.
+        self._known_files: dict[Path, int] = {}
+        # Paths the watcher reports, with when; its threads only ever put here
+        # and the tick takes them, so everything else stays on the tick thread.
+        self._changed: queue.SimpleQueue[tuple[Path, int]] = queue.SimpleQueue()
+        # Compressed archives skip the tailer: each is parsed whole, once it
+        # has stopped changing, and remembered by (size, mtime). Hashing,
+        # decompression and parsing run on a background thread; the tick
+        # only applies the parsed rows, a slice at a time.
+        self.archives = ArchiveReader(default_archive_cache_dir())
+        self._archive_queue: set[Path] = set()
+        self._archives_read: dict[Path, tuple[int, int]] = {}
+        self._archive_pool: ThreadPoolExecutor | None = None
+        self._archive_jobs: dict[Path, Future[list[RequestUsage]]] = {}
+        self._archive_rows: deque[_ArchiveRows] = deque()
+        self.backfill = BackfillProgress()
+        self.time_index: TimeIndexStore | None = None
+        if config.time_index:
+            index_dir = Path(config.index_dir).expanduser() if config.index_dir else default_index_dir()
+            self.time_index = TimeIndexStore(index_dir)
+        self._last_index_flush_ms = 0
+        # Optional durable store; fed every parsed record and deduped by its unique index.
+        self.database: UsageDatabase | None = None
+        db_path = database_path(config)
+        if db_path is not None:
+            try:
+                self.database = UsageDatabase(db_path)
+            except sqlite3.Error as exc:
+                log.warning("Cannot open usage database %s: %s", db_path, exc)
+        self._listeners: list[Callable[[list[RequestUsage], StateSnapshot], None]] = []
+        self._root_users = {root: root_user(root) for root in roots} if config.all_users else {}
+        self._file_users: dict[Path, str | None] = {}
+        self._executor = (
+            ThreadPoolExecutor(max_workers=config.scan_workers, thread_name_prefix="cctv-scan")
+            if len(roots) > 1
+            else None
+        )
+        self.watching = len(roots) <= config.max_watched_roots
+        self.watcher = UsageWatcher(roots, self.on_file_changed, poll=config.poll) if self.watching else None
+        self._last_file_scan_ms = 0
+        # Full rescan every 30s; without a watcher the scan is what finds changes.
+        self._file_scan_interval_ms = 30_000 if self.watching else 5_000
+        self.memory = MemoryGovernor(config.max_memory_bytes)
+        self._register_memory()
+
+    def _register_memory(self) -> None:
+        # Lower priority sheds first: pure caches, then bookkeeping, then dedupe history.
+        memory = self.memory
+        memory.register("archive rows", self._archive_memory_usage, priority=10)
+        if self.time_index is not None:
+            memory.register("time index", self.time_index.memory_usage, self.time_index.shed, priority=20)
+        memory.register("schemas", self.parser.memory_usage, self.parser.shed, priority=30)
+        memory.register("filter index", self._index_memory_usage, self._shed_index, priority=35)
+        memory.register("files", self._files_memory_usage, self._compact_files, priority=40)
+        memory.register("offsets", self.tailer.memory_usage, priority=40)
+        memory.register("alerts", self.alerts.memory_usage, self.alerts.shed, priority=40)
+        memory.register("dedupe", self.dedupe.memory_usage, self.dedupe.shed, priority=90)
+
+    def _archive_memory_usage(self) -> tuple[int, int]:
+        rows = sum(len(r.usages) - r.applied for r in self._archive_rows)
+        return len(self._archive_rows), rows * USAGE_ENTRY_BYTES
+
+    def _index_memory_usage(self) -> tuple[int, int]:
+        recent, history = self.store.recent.memory_usage(), self.store.history.memory_usage()
+        return recent[0] + history[0], recent[1] + history[1]
+
+    def _shed_index(self, fraction: float) -> int:
+        # Only the long-range history is worth trimming; recent is one window.
+        return self.store.history.shed(fraction)
+
+    def _files_memory_usage(self) -> tuple[int, int]:
+        entries = len(self._known_files) + len(self._file_users)
+        return len(self._known_files), entries * PATH_ENTRY_BYTES
+
+    def _compact_files(self, fraction: float) -> int:
+        """Drop per-file bookkeeping for files that are gone or idle; nothing is re-read."""
+        freed = len(self._file_users)
+        self._file_users.clear()
+        for path in self.tailer.paths():
+            if path not in self._known_files:
+                self.tailer.forget(path)
+                self.parser.forget(path)
+                if self.time_index is not None:
+                    self.time_index.forget(path)
+                freed += 1
+        freed += len(self.tailer.stats)
+        self.tailer.stats.clear()
+        freed += self.reads.forget_inactive(now_ms())
+        return freed * PATH_ENTRY_BYTES
+
+    def on_file_changed(self, path: Path) -> None:
+        """Watcher callback; safe from any thread."""
+        self._changed.put((path, now_ms()))
+        self.scheduler.mark_dirty()
+
+    def _take_changes(self) -> None:
+        while True:
+            try:
+                path, changed_ms = self._changed.get_nowait()
+            except queue.Empty:
+                return
+            self._known_files.setdefault(path, -1)
+            if is_archive(path):
+                self._archive_queue.add(path)
+            else:
+                self.reads.mark_active(path, changed_ms)
+
+    def _enqueue(self, path: Path, now: int) -> None:
+        if is_archive(path):
+            self._archive_queue.add(path)
+        else:
+            self.reads.enqueue(path, now)
+
+    def start(self) -> None:
+        # One-time full scan; watchdog events keep the set up-to-date after this.
+        discovered = scan_usage_file_stats(self.roots, self._executor)
+        self._known_files = {path: size for path, (size, _) in discovered.items()}
+        self._last_file_scan_ms = now_ms()
+        self.backfill = BackfillProgress.of({path: size for path, (size, _) in discovered.items()})
+        self.alerts.backfilling = self.backfill.active
+        # Newest first: recent sessions are what the live window shows.
+        for path, (_, mtime_ns) in sorted(discovered.items(), key=lambda kv: (-kv[1][1], kv[0])):
+            if is_archive(path):
+                self._archive_queue.add(path)
+            else:
+                self.reads.enqueue(path, self._last_file_scan_ms, priority=-mtime_ns)
+        if self.watcher is not None:
+            self.watcher.start()
+
+    def stop(self) -> None:
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.time_index is not None:
+            self.time_index.flush()
+        if self.database is not None:
+            self.database.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self._archive_pool is not None:
+            self._archive_pool.shutdown(wait=False, cancel_futures=True)
+
+    def user_of(self, path: Path) -> str | None:
+        if not self._root_users:
+            return None
+        try:
+            return self._file_users[path]
+        except KeyError:
+            pass
+        user = next((self._root_users[p] for p in path.parents if p in self._root_users), None)
+        self._file_users[path] = user
+        return user
+
+    def add_listener(self, listener: Callable[[list[RequestUsage], StateSnapshot], None]) -> None:
+        """Call ``listener(applied, snapshot)`` after each tick that applied new usage.
+
+        Runs on the ticking thread, right after the snapshot is published.
+        """
+        self._listeners.append(listener)
+
+    def set_instrumented(self, enabled: bool) -> None:
+        self.perf.enabled = enabled
+        self.tailer.track_stats = enabled
+
+    @property
+    def _watch_mode(self) -> str:
+        if self.watcher is None:
+            return "size scans"
+        return "polled" if self.watcher.polling else "watched"
+
+    def debug_lines(self) -> list[str]:
+        lines = [
+            f"roots {len(self.roots)} ({self._watch_mode}) | "
+            f"files known {len(self._known_files)} | queued {self.reads.pending} | "
+            f"archives {len(self._archives_read)} read, {len(self._archive_jobs)} parsing, "
+            f"{len(self._archive_queue)} waiting | "
+            f"read {self.reads.last_tick_bytes / 1_048_576:.1f} MB"
+        ]
+        if self.backfill.active:
+            lines.append(f"backfill {self.backfill.describe()}")
+        lines.extend(self.memory.debug_lines())
+        lines.append(f"alerts {self.alerts.fired} fired, {self.alerts.suppressed} suppressed by cooldown")
+        if self.database is not None:
+            lines.append(f"database {self.database.path} | {self.database.inserted} events stored this run")
+        busiest = sorted(self.tailer.stats.items(), key=lambda kv: kv[1].read_ns, reverse=True)[:5]
+        for path, stats in busiest:
+            lines.append(
+                f"  {path.name} | reads {stats.reads} | {stats.bytes_read / 1_048_576:.1f} MB | "
+                f"lines {stats.lines} | read {stats.read_ns / 1e6:.1f}ms (last {stats.last_read_ns / 1e6:.2f}ms)"
+            )
+        return lines
+
+    def reset_buckets(self) -> None:
+        now_bucket = floor_to_bucket_ms(now_ms(), self.config.bucket_seconds)
+        self.store.replace_buckets(empty_buckets(self.config.window_size, now_bucket, self.config.bucket_seconds))
+        self.store.publish()
+        self.scheduler.mark_dirty()
+
+    def _submit_archives(self, now: int) -> None:
+        """Start parsing settled archives from the queue on the archive thread."""
+        for path in sorted(self._archive_queue):
+            if path in self._archive_jobs:
+                continue  # changed again while being parsed; looked at once that finishes
+            try:
+                st = path.stat()
+            except OSError:
+                self._archive_queue.discard(path)
+                self.backfill.advance(path, 0, finished=True)
+                continue
+            if now - st.st_mtime_ns // 1_000_000 < _ARCHIVE_SETTLE_MS:
+                continue  # possibly still being compressed; retry next tick
+            self._archive_queue.discard(path)
+            signature = (st.st_size, st.st_mtime_ns)
+            if self._archives_read.get(path) == signature:
+                self.backfill.advance(path, 0, finished=True)
+                continue
+            self._archives_read[path] = signature
+            if self._archive_pool is None:
+                self._archive_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cctv-archive")
+            self._archive_jobs[path] = self._archive_pool.submit(self._parse_archive, path, self.user_of(path))
+
+    def _parse_archive(self, path: Path, user: str | None) -> list[RequestUsage]:
+        # Runs on the archive thread; touches nothing the tick reads.
+        usages = self.archives.usages(path)
+        if user is not None:
+            usages = [replace(u, user=user) for u in usages]
+        return usages
+
+    def _archive_slices(self, budget_ms: int) -> Iterator[tuple[str | None, list[RequestUsage]]]:
+        """Rows of parsed archives, by project, until ``budget_ms`` is spent."""
+        for path, job in list(self._archive_jobs.items()):
+            if not job.done():
+                continue
+            del self._archive_jobs[path]
+            try:
+                usages = job.result()
+            except Exception:
+                log.exception("Cannot read archive %s", path)
+                self.backfill.advance(path, 0, finished=True)
+                continue
+            self._archive_rows.append(_ArchiveRows(path, project_of(path), usages))
+        deadline = perf_counter_ns() + budget_ms * 1_000_000
+        while self._archive_rows and perf_counter_ns() < deadline:
+            rows = self._archive_rows[0]
+            chunk = rows.usages[rows.applied : rows.applied + _ARCHIVE_SLICE_ROWS]
+            rows.applied += len(chunk)
+            if rows.applied >= len(rows.usages):
+                self._archive_rows.popleft()
+                self.backfill.advance(rows.path, 0, finished=True)
+            if self.database is not None and chunk:
+                self.database.add(chunk, rows.project)
+            yield rows.project, chunk
+
+    def tick(self, now: int | None = None, read_budget_ms: int | None = None) -> None:
+        """One pass of the pipeline; ``read_budget_ms`` overrides ``config.read_budget_ms``."""
+        perf = self.perf
+        perf.begin_tick()
+        if now is None:
+            now = now_ms()
+        t = perf.start()
+        self._take_changes()
+
+        # Periodic full rescan to discover files created before the watcher started
+        # or missed due to timing. Much less frequent now that watchdog tracks changes.
+        if (now - self._last_file_scan_ms) >= self._file_scan_interval_ms:
+            rescanned = scan_usage_files(self.roots, self._executor)
+            for path, size in rescanned.items():
+                # Compare with the last scan, not the tailer offset: a torn last
+                # line keeps the offset short of the size until it is finished.
+                known = self._known_files.get(path)
+                if known is None or (not self.watching and size != known):
+                    self._enqueue(path, now)
+            # Files deleted before they were read will never finish.
+            for path in self.backfill.pending.keys() - rescanned.keys():
+                self.backfill.advance(path, 0, finished=True)
+            self._known_files = rescanned
+            self._last_file_scan_ms = now
+        perf.stop("discover", t)
+
+        # Only clear dirty flag when it actually triggered the scan.
+        if self.scheduler.should_run():
+            self.scheduler.mark_clean()
+
+        self.store.advance_time(now, self.config.bucket_seconds)
+
+        if read_budget_ms is None:
+            read_budget_ms = self.config.read_budget_ms
+        applied: list[RequestUsage] | None = [] if self._listeners else None
+        # Read queued files within this tick's budget; the rest carries over.
+        for path in self.reads.drain(self.tailer, now, read_budget_ms):
+            t = perf.start()
+            start = self.tailer.offset(path)
+            lines = self.tailer.read_new_lines(path, self.reads.slice_bytes)
+            t = perf.lap("tail", t)
+            if self.backfill.active:
+                self.backfill.advance(path, self.tailer.offset(path) - start, not self.tailer.has_backlog(path))
+            usages = self.parser.parse_lines(path, lines, self.user_of(path))
+            t = perf.lap("parse", t)
+            if self.time_index is not None and lines:
+                end = self.tailer.offset(path)
+                if end <= start:
+                    # Truncated and re-read from the top.
+                    self.time_index.reset(path)
+                    start = 0
+                self.time_index.record(path, start, end, (u.timestamp_ms for u in usages))
+            project = project_of(path)
+            if self.database is not None and usages:
+                self.database.add(usages, project)
+            for usage in usages:
+                if not self.dedupe.add_if_new(usage.event_id):
+                    continue
+                self.store.apply_usage(usage, self.config.bucket_seconds, self.pricing, project)
+                self.alerts.observe(usage, path.stem, now)
+                if applied is not None:
+                    applied.append(usage)
+            perf.stop("aggregate", t)
+
+        if self._archive_queue or self._archive_jobs or self._archive_rows:
+            t = perf.start()
+            self._submit_archives(now)
+            for project, usages in self._archive_slices(read_budget_ms):
+                for usage in usages:
+                    if not self.dedupe.add_if_new(usage.event_id):
+                        continue
+                    self.store.apply_usage(usage, self.config.bucket_seconds, self.pricing, project)
+                    self.alerts.observe(usage, None, now)
+                    if applied is not None:
+                        applied.append(usage)
+            perf.stop("archive", t)
+
+        if self.alerts.backfilling and not self.backfill.active:
+            # Backfill ran newest file first; train on the history in time order instead.
+            self.alerts.finish_backfill(self.store.history, now)
+
+        if self.database is not None and self.database.pending:
+            t = perf.start()
+            self.database.flush()
+            perf.stop("db", t)
+
+        if self.time_index is not None and now - self._last_index_flush_ms >= self._file_scan_interval_ms:
+            self.time_index.flush()
+            self._last_index_flush_ms = now
+
+        self.memory.check(now)
+
+        self.store.maybe_rescale()
+        snap = self.store.publish()
+        if applied:
+            for listener in self._listeners:
+                listener(applied, snap)
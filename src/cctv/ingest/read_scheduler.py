@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import heapq
+from collections import deque
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Iterator
+
+from cctv.ingest.tailer import JsonlTailer
+from cctv.util.time import now_ms
+
+
+class ReadScheduler:
+    """Decides which files the tailer reads each tick, and how much.
+
+    Files are read in slices of ``slice_bytes``, round-robin. Files changed
+    within ``live_window_ms`` are served before backfill, but every tick
+    still gets at least one backfill slice. Backfill goes in ascending
+    ``priority`` (the pipeline passes newest-first at startup), round-robin
+    among equals. A tick stops once ``byte_budget`` or ``time_budget_ms`` is
+    spent; unfinished files stay queued for the next tick. Not thread-safe:
+    the pipeline only calls it from the tick.
+    """
+
+    def __init__(
+        self,
+        byte_budget: int = 8 * 1024 * 1024,
+        time_budget_ms: int = 50,
+        slice_bytes: int = 512 * 1024,
+        live_window_ms: int = 10_000,
+    ) -> None:
+        self.byte_budget = byte_budget
+        self.time_budget_ms = time_budget_ms
+        self.slice_bytes = slice_bytes
+        self.live_window_ms = live_window_ms
+        self._live: deque[Path] = deque()
+        # Heap of (priority, sequence, path); the sequence keeps equal priorities FIFO.
+        self._backfill: list[tuple[int, int, Path]] = []
+        self._priority: dict[Path, int] = {}
+        self._seq = 0
+        # Authoritative queue membership; the queues may hold stale duplicates.
+        self._queued: set[Path] = set()
+        self._last_active: dict[Path, int] = {}
+        self.last_tick_bytes = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._queued)
+
+    def is_live(self, path: Path, now: int) -> bool:
+        last = self._last_active.get(path)
+        return last is not None and now - last <= self.live_window_ms
+
+    def mark_active(self, path: Path, now: int | None = None) -> None:
+        self._last_active[path] = now_ms() if now is None else now
+        self._queued.add(path)
+        self._live.append(path)
+
+    def forget_inactive(self, now: int) -> int:
+        """Drop activity records past the live window for files not queued; returns how many."""
+        stale = [
+            path for path, last in self._last_active.items()
+            if now - last > self.live_window_ms and path not in self._queued
+        ]
+        for path in stale:
+            del self._last_active[path]
+        return len(stale)
+
+    def enqueue(self, path: Path, now: int | None = None, priority: int | None = None) -> None:
+        """Queue ``path``; a given ``priority`` sticks to it until it is read to the end."""
+        if now is None:
+            now = now_ms()
+        if priority is not None:
+            self._priority[path] = priority
+        live = self.is_live(path, now)
+        if path in self._queued and not live:
+            return
+        self._queued.add(path)
+        if live:
+            self._live.append(path)
+        else:
+            self._seq += 1
+            heapq.heappush(self._backfill, (self._priority.get(path, 0), self._seq, path))
+
+    def forget(self, path: Path) -> None:
+        self._queued.discard(path)
+        self._last_active.pop(path, None)
+        self._priority.pop(path, None)
+
+    def _pop(self, backfill_only: bool) -> tuple[Path | None, bool]:
+        if not backfill_only:
+            while self._live:
+                path = self._live.popleft()
+                if path in self._queued:
+                    self._queued.discard(path)
+                    return path, True
+        while self._backfill:
+            _, _, path = heapq.heappop(self._backfill)
+            if path in self._queued:
+                self._queued.discard(path)
+                return path, False
+        return None, False
+
+    def drain(
+        self, tailer: JsonlTailer, now: int | None = None, time_budget_ms: int | None = None
+    ) -> Iterator[Path]:
+        """Yield paths to read next; the caller reads one slice of each.
+
+        Budgets are checked between slices, using the tailer's offsets to
+        account for what the caller actually consumed. ``time_budget_ms``
+        overrides the scheduler's own for this call.
+        """
+        if now is None:
+            now = now_ms()
+        if time_budget_ms is None:
+            time_budget_ms = self.time_budget_ms
+        deadline = perf_counter_ns() + time_budget_ms * 1_000_000
+        spent = 0
+        backfill_served = False
+        while self._queued:
+            exhausted = spent >= self.byte_budget or perf_counter_ns() >= deadline
+            if exhausted and backfill_served:
+                break
+            path, live = self._pop(backfill_only=exhausted)
+            if path is None:
+                break
+            before = tailer.offset(path)
+            yield path
+            after = tailer.offset(path)
+            spent += after - before if after >= before else after
+            if not live:
+                backfill_served = True
+            if tailer.has_backlog(path):
+                self.enqueue(path, now)
+            else:
+                self._priority.pop(path, None)
+        self.last_tick_bytes = spent
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any
+
+from cctv.domain.models import RequestUsage
+from cctv.ingest.parser import (
+    FALLBACK_ID_KEYS,
+    ID_KEYS,
+    INPUT_KEYS,
+    MODEL_KEYS,
+    OUTPUT_KEYS,
+    TS_KEYS,
+    _nested_get,
+    _parse_timestamp_ms,
+    _pick_int,
+    content_event_id,
+    load_record,
+    parse_usage_record,
+    pick_cache_fields,
+    pick_event_id,
+)
+from cctv.util.memory import PATH_ENTRY_BYTES
+
+# Returned by UsageSchema.extract when a record does not have the cached layout.
+_MISMATCH: Any = object()
+
+
+def _first_present(rec: dict[str, Any], keys: list[str]) -> str | None:
+    for k in keys:
+        if rec.get(k) is not None:
+            return k
+    return None
+
+
+def _preceding(keys: list[str], key: str | None) -> tuple[str, ...]:
+    """Aliases the generic parser tries before ``key``."""
+    if key is None or key not in keys:
+        return ()
+    return tuple(keys[: keys.index(key)])
+
+
+def _any_present(rec: dict[str, Any], keys: tuple[str, ...]) -> bool:
+    for k in keys:
+        if rec.get(k) is not None:
+            return True
+    return False
+
+
+@dataclass(frozen=True)
+class UsageSchema:
+    """Resolved field locations for one record layout.
+
+    ``None`` for a key means the generic alias lookup is used for that field.
+    A record that also carries an alias the generic parser would prefer to
+    a cached key does not fit, so both parsers always agree on every field.
+    """
+
+    name: str
+    nested: bool
+    input_key: str | None
+    output_key: str | None
+    ts_key: str | None
+    id_key: str | None
+    # "top" / "usage" read ``model_key`` from the record / usage dict,
+    # "message" reads ``message.model``.
+    model_from: str | None
+    model_key: str | None
+    # Per field, the aliases that outrank the cached key; derived, not compared.
+    _top_shadows: tuple[str, ...] = field(init=False, repr=False, compare=False)
+    _usage_shadows: tuple[str, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        top = list(_preceding(TS_KEYS, self.ts_key))
+        if self.id_key in ID_KEYS:
+            top += _preceding(ID_KEYS, self.id_key)
+        elif self.id_key is not None:
+            top += ID_KEYS
+            top += _preceding(FALLBACK_ID_KEYS, self.id_key)
+        usage = list(_preceding(INPUT_KEYS, self.input_key)) + list(_preceding(OUTPUT_KEYS, self.output_key))
+        if self.model_from == "top":
+            top += _preceding(MODEL_KEYS, self.model_key)
+        elif self.model_from == "usage":
+            top += MODEL_KEYS
+            usage += _preceding(MODEL_KEYS, self.model_key)
+        elif self.model_from == "message":
+            top += MODEL_KEYS
+            usage += MODEL_KEYS
+        object.__setattr__(self, "_top_shadows", tuple(top))
+        object.__setattr__(self, "_usage_shadows", tuple(usage))
+
+    def extract(self, rec: dict[str, Any], line: str) -> RequestUsage | None:
+        if self.nested:
+            message = rec.get("message")
+            usage_rec = message.get("usage") if isinstance(message, dict) else None
+            if not isinstance(usage_rec, dict):
+                return _MISMATCH
+        elif isinstance(_nested_get(rec, ("message", "usage")), dict):
+            return _MISMATCH  # the generic parser prefers nested usage
+        else:
+            usage_rec = rec
+        if _any_present(rec, self._top_shadows) or _any_present(usage_rec, self._usage_shadows):
+            return _MISMATCH
+
+        try:
+            input_tokens = int(usage_rec[self.input_key]) if self.input_key else _pick_int(usage_rec, INPUT_KEYS)
+            output_tokens = int(usage_rec[self.output_key]) if self.output_key else _pick_int(usage_rec, OUTPUT_KEYS)
+        except (KeyError, TypeError, ValueError):
+            return _MISMATCH
+        if input_tokens == 0 and output_tokens == 0:
+            return None
+
+        if self.ts_key is None:
+            return _MISMATCH
+        ts = rec.get(self.ts_key)
+        if ts is None:
+            return _MISMATCH
+
+        event_id = None
+        if self.id_key is not None:
+            raw_id = rec.get(self.id_key)
+            if raw_id is None or raw_id == "":
+                return _MISMATCH
+            event_id = str(raw_id)
+
+        if self.model_from == "message":
+            raw_model = rec["message"].get("model") if self.nested else _nested_get(rec, ("message", "model"))
+        elif self.model_from == "top":
+            raw_model = rec.get(self.model_key)
+        elif self.model_from == "usage":
+            raw_model = usage_rec.get(self.model_key)
+        else:
+            return _MISMATCH
+        if not raw_model:
+            return _MISMATCH
+
+        cache_hit, cache_read, cache_creation = pick_cache_fields(rec, usage_rec)
+        model = str(raw_model)
+        if event_id is None:
+            event_id = pick_event_id(rec) or content_event_id(
+                rec, line, ts, model, input_tokens, output_tokens, cache_read, cache_creation
+            )
+        return RequestUsage(
+            event_id=event_id,
+            timestamp_ms=_parse_timestamp_ms(ts),
+            model=model,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cache_hit=cache_hit,
+            cache_read_input_tokens=cache_read,
+            cache_creation_input_tokens=cache_creation,
+        )
+
+
+def detect_schema(rec: dict[str, Any]) -> UsageSchema | None:
+    """Resolve where ``parse_usage_record`` found each field in ``rec``."""
+    usage_obj = _nested_get(rec, ("message", "usage"))
+    nested = isinstance(usage_obj, dict)
+    usage_rec = usage_obj if nested else rec
+
+    input_key = _first_present(usage_rec, INPUT_KEYS)
+    output_key = _first_present(usage_rec, OUTPUT_KEYS)
+    if input_key is None and output_key is None:
+        return None
+
+    model_from: str | None = None
+    model_key = _first_present(rec, MODEL_KEYS)
+    if model_key is not None and rec[model_key] != "":
+        model_from = "top"
+    else:
+        model_key = _first_present(usage_rec, MODEL_KEYS)
+        if model_key is not None and usage_rec[model_key] != "":
+            model_from = "usage"
+        elif _nested_get(rec, ("message", "model")):
+            model_from, model_key = "message", None
+
+    if nested:
+        name = "claude-session"
+    elif input_key == "prompt_tokens" or output_key == "completion_tokens":
+        name = "openai"
+    else:
+        name = "flat"
+    return UsageSchema(
+        name=name,
+        nested=nested,
+        input_key=input_key,
+        output_key=output_key,
+        ts_key=_first_present(rec, TS_KEYS),
+        id_key=_first_present(rec, ID_KEYS) or _first_present(rec, FALLBACK_ID_KEYS),
+        model_from=model_from,
+        model_key=model_key,
+    )
+
+
+class SchemaParser:
+    """Parses lines with an extractor compiled once per file.
+
+    The first usage record of a file fixes its schema. Records that do not
+    fit are parsed generically and, if they turn out to be usage records,
+    the schema is re-detected from them.
+    """
+
+    def __init__(self) -> None:
+        self._schemas: dict[Path, UsageSchema] = {}
+        self.redetections = 0
+
+    def schema_for(self, path: Path) -> UsageSchema | None:
+        return self._schemas.get(path)
+
+    def forget(self, path: Path) -> None:
+        self._schemas.pop(path, None)
+
+    def memory_usage(self) -> tuple[int, int]:
+        return len(self._schemas), len(self._schemas) * PATH_ENTRY_BYTES
+
+    def shed(self, fraction: float) -> int:
+        # Schemas are re-detected from the next usage record of each file.
+        drop = list(self._schemas)[: int(len(self._schemas) * fraction)]
+        for path in drop:
+            del self._schemas[path]
+        return len(drop) * PATH_ENTRY_BYTES
+
+    def parse_lines(self, path: Path, lines: list[str], user: str | None = None) -> list[RequestUsage]:
+        out = self._parse_lines(path, lines)
+        if user is not None:
+            out = [replace(usage, user=user) for usage in out]
+        return out
+
+    def _parse_lines(self, path: Path, lines: list[str]) -> list[RequestUsage]:
+        schema = self._schemas.get(path)
+        out: list[RequestUsage] = []
+        for line in lines:
+            rec = load_record(line)
+            if rec is None:
+                continue
+            if schema is not None:
+                usage = schema.extract(rec, line)
+                if usage is not _MISMATCH:
+                    if usage is not None:
+                        out.append(usage)
+                    continue
+            usage = parse_usage_record(rec, line)
+            if usage is None:
+                continue
+            detected = detect_schema(rec)
+            if detected is not None and detected != schema:
+                if schema is not None:
+                    self.redetections += 1
+                schema = detected
+                self._schemas[path] = detected
+            out.append(usage)
+        return out
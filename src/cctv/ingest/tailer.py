@@ -1,28 +1,98 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from pathlib import Path
+from time import perf_counter_ns
+
+from cctv.util.memory import PATH_ENTRY_BYTES
 
 # Cap per-tick reads to prevent OOM on large session files.
 _MAX_BYTES_PER_READ = 4 * 1024 * 1024  # 4 MB
 
 
+@dataclass
+class FileReadStats:
+    reads: int = 0
+    bytes_read: int = 0
+    lines: int = 0
+    read_ns: int = 0
+    last_read_ns: int = 0
+
+
 class JsonlTailer:
-    def __init__(self) -> None:
+    """Reads complete new lines from growing JSONL files.
+
+    Offsets only ever advance past a newline, so a line that is still being
+    written (or was cut by ``max_bytes``) is picked up whole on a later read.
+    """
+
+    def __init__(self, track_stats: bool = False) -> None:
         self._offsets: dict[Path, int] = {}
+        # Files whose last read stopped at max_bytes with more data behind it.
+        self._backlogged: set[Path] = set()
+        self.track_stats = track_stats
+        self.stats: dict[Path, FileReadStats] = {}
+
+    def offset(self, path: Path) -> int:
+        return self._offsets.get(path, 0)
+
+    def has_backlog(self, path: Path) -> bool:
+        return path in self._backlogged
 
-    def read_new_lines(self, path: Path) -> list[str]:
-        if not path.exists():
-            self._offsets.pop(path, None)
+    def paths(self) -> list[Path]:
+        return list(self._offsets)
+
+    def forget(self, path: Path) -> None:
+        self._offsets.pop(path, None)
+        self._backlogged.discard(path)
+        self.stats.pop(path, None)
+
+    def memory_usage(self) -> tuple[int, int]:
+        return len(self._offsets), (len(self._offsets) + len(self.stats)) * PATH_ENTRY_BYTES
+
+    def read_new_lines(self, path: Path, max_bytes: int = _MAX_BYTES_PER_READ) -> list[str]:
+        started = perf_counter_ns() if self.track_stats else 0
+        try:
+            size = path.stat().st_size
+        except OSError:
+            self.forget(path)
             return []
 
         last = self._offsets.get(path, 0)
-        size = path.stat().st_size
         if size < last:
             last = 0
+        if size == last:
+            self._backlogged.discard(path)
+            return []
 
-        with path.open("r", encoding="utf-8", errors="replace") as f:
+        with path.open("rb") as f:
             f.seek(last)
-            chunk = f.read(_MAX_BYTES_PER_READ)
-            self._offsets[path] = f.tell()
+            chunk = f.read(max_bytes)
+            end = chunk.rfind(b"\n")
+            if end == -1 and len(chunk) == max_bytes:
+                # A single line longer than max_bytes: finish it rather than stall.
+                chunk += f.readline()
+                end = chunk.rfind(b"\n")
+        if end == -1:
+            self._backlogged.discard(path)
+            return []
+
+        consumed = end + 1
+        self._offsets[path] = last + consumed
+        if last + consumed < size and len(chunk) >= max_bytes:
+            self._backlogged.add(path)
+        else:
+            self._backlogged.discard(path)
 
-        return [line.strip() for line in chunk.splitlines() if line.strip()]
+        text = chunk[:consumed].decode("utf-8", errors="replace")
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        if started:
+            stats = self.stats.get(path)
+            if stats is None:
+                stats = self.stats[path] = FileReadStats()
+            stats.reads += 1
+            stats.bytes_read += consumed
+            stats.lines += len(lines)
+            stats.last_read_ns = perf_counter_ns() - started
+            stats.read_ns += stats.last_read_ns
+        return lines
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable
+
+from cctv.util.memory import PATH_ENTRY_BYTES
+
+log = logging.getLogger(__name__)
+
+# Adjacent reads are merged into one block until it covers this many bytes.
+_BLOCK_BYTES = 256 * 1024
+_FORMAT = 1
+
+
+@dataclass
+class FileTimeIndex:
+    """Sparse timestamp index over the first ``end`` bytes of one file.
+
+    ``blocks`` are ``[start, end, min_ts, max_ts]`` byte ranges that begin
+    and end on line boundaries; ``min_ts``/``max_ts`` are ``None`` for a
+    block without usage records. Files are append-only, so the index stays
+    valid as a file grows and is dropped if the file shrinks or is replaced.
+    """
+
+    inode: int
+    end: int = 0
+    blocks: list[list[int | None]] = field(default_factory=list)
+
+    @property
+    def min_ts(self) -> int | None:
+        return min((b[2] for b in self.blocks if b[2] is not None), default=None)
+
+    @property
+    def max_ts(self) -> int | None:
+        return max((b[3] for b in self.blocks if b[3] is not None), default=None)
+
+    def add(self, start: int, end: int, timestamps: Iterable[int]) -> bool:
+        """Index ``[start, end)`` if it reaches past ``self.end`` without a gap.
+
+        A range that overlaps what is already indexed, as when a file is
+        re-read from the top after a restart, only adds ``[self.end, end)``;
+        its timestamps may include earlier records, which still bound it.
+        """
+        if start > self.end or end <= self.end:
+            return False
+        start = self.end
+        lo = hi = None
+        for ts in timestamps:
+            if lo is None or ts < lo:
+                lo = ts
+            if hi is None or ts > hi:
+                hi = ts
+        last = self.blocks[-1] if self.blocks else None
+        if last is not None and last[1] - last[0] < _BLOCK_BYTES:
+            last[1] = end
+            if lo is not None:
+                last[2] = lo if last[2] is None else min(last[2], lo)
+                last[3] = hi if last[3] is None else max(last[3], hi)
+        else:
+            self.blocks.append([start, end, lo, hi])
+        self.end = end
+        return True
+
+    def ranges(self, since_ms: int | None, until_ms: int | None) -> list[tuple[int, int]]:
+        """Byte ranges that may hold records in ``[since_ms, until_ms)``."""
+        out: list[tuple[int, int]] = []
+        for start, end, lo, hi in self.blocks:
+            if lo is None or hi is None:
+                continue
+            if since_ms is not None and hi < since_ms:
+                continue
+            if until_ms is not None and lo >= until_ms:
+                continue
+            if out and out[-1][1] == start:
+                out[-1] = (out[-1][0], end)
+            else:
+                out.append((start, end))
+        return out
+
+
+def _opt_int(value: Any) -> int | None:
+    return None if value is None else int(value)
+
+
+class TimeIndexStore:
+    """Loads, validates, extends and persists per-file time indexes.
+
+    Each indexed file gets a JSON sidecar under ``directory`` named after a
+    hash of its path. Sidecars are written by ``flush`` and replaced
+    atomically, so concurrent cctv processes never see a partial file.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._indexes: dict[Path, FileTimeIndex | None] = {}
+        self._dirty: set[Path] = set()
+
+    def _sidecar(self, path: Path) -> Path:
+        digest = hashlib.sha1(str(path).encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def _load(self, path: Path) -> FileTimeIndex | None:
+        try:
+            data = json.loads(self._sidecar(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        # Anything else that does not have the expected shape counts as no sidecar.
+        try:
+            if data.get("format") != _FORMAT or data.get("path") != str(path):
+                return None
+            return FileTimeIndex(
+                inode=int(data["inode"]),
+                end=int(data["end"]),
+                blocks=[[int(start), int(end), _opt_int(lo), _opt_int(hi)] for start, end, lo, hi in data["blocks"]],
+            )
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+
+    def get(self, path: Path) -> FileTimeIndex | None:
+        """The index for ``path`` if it still matches the file on disk."""
+        try:
+            st = path.stat()
+        except OSError:
+            self._indexes.pop(path, None)
+            return None
+        if path not in self._indexes:
+            self._indexes[path] = self._load(path)
+        index = self._indexes[path]
+        if index is not None and (index.inode != st.st_ino or index.end > st.st_size):
+            index = self._indexes[path] = None
+        if index is None:
+            index = self._indexes[path] = FileTimeIndex(inode=st.st_ino)
+        return index
+
+    def record(self, path: Path, start: int, end: int, timestamps: Iterable[int]) -> None:
+        index = self._indexes.get(path) or self.get(path)
+        if index is not None and index.add(start, end, timestamps):
+            self._dirty.add(path)
+
+    def reset(self, path: Path) -> None:
+        """Start over for a file that was truncated in place."""
+        try:
+            inode = path.stat().st_ino
+        except OSError:
+            self.forget(path)
+            return
+        self._indexes[path] = FileTimeIndex(inode=inode)
+        self._dirty.add(path)
+
+    def forget(self, path: Path) -> None:
+        self._indexes.pop(path, None)
+        self._dirty.discard(path)
+
+    def memory_usage(self) -> tuple[int, int]:
+        blocks = sum(len(index.blocks) for index in self._indexes.values() if index is not None)
+        # A block is a list of four ints.
+        return len(self._indexes), len(self._indexes) * PATH_ENTRY_BYTES + blocks * 120
+
+    def shed(self, fraction: float) -> int:
+        """Flush, then drop ``fraction`` of the loaded indexes; ``get`` reloads them from their sidecars."""
+        before = self.memory_usage()[1]
+        self.flush()
+        for path in list(self._indexes)[: int(len(self._indexes) * fraction)]:
+            del self._indexes[path]
+        return before - self.memory_usage()[1]
+
+    def flush(self) -> int:
+        """Write every index changed since the last flush; returns the count."""
+        written = 0
+        if self._dirty:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+            except OSError as exc:
+                log.warning("Cannot create time index directory %s: %s", self.directory, exc)
+                self._dirty.clear()
+                return 0
+        for path in sorted(self._dirty):
+            index = self._indexes.get(path)
+            if index is None:
+                continue
+            target = self._sidecar(path)
+            tmp = target.with_suffix(f".{os.getpid()}.tmp")
+            data = {"format": _FORMAT, "path": str(path), "inode": index.inode, "end": index.end, "blocks": index.blocks}
+            try:
+                tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+                os.replace(tmp, target)
+                written += 1
+            except OSError as exc:
+                log.debug("Cannot write time index for %s: %s", path, exc)
+        self._dirty.clear()
+        return written
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from cctv.ingest.archive import is_usage_file
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class _Dir:
+    path: str
+    mtime_ns: int
+    # Usage file name → (size, mtime_ns).
+    files: dict[str, tuple[int, int]] = field(default_factory=dict)
+    subdirs: set[str] = field(default_factory=set)
+    interval_s: float = 0.0
+    due: float = 0.0
+
+
+class ScandirPoller:
+    """Change detection for filesystems without working inotify.
+
+    Instead of re-walking every root each interval (as watchdog's
+    ``PollingObserver`` does), each directory is checked on its own
+    schedule: one ``stat`` of the directory, which changes when entries are
+    added, removed or renamed, plus one ``stat`` per known usage file, for
+    appends. Only a directory whose mtime moved is re-listed, with
+    ``os.scandir``. A directory's interval doubles while nothing in it
+    changes, up to ``max_interval_s``, and drops back to ``interval_s`` on
+    any change, so idle project folders cost almost nothing.
+    """
+
+    def __init__(
+        self,
+        roots: list[Path],
+        on_change: Callable[[Path], None],
+        interval_s: float = 1.0,
+        max_interval_s: float = 10.0,
+    ) -> None:
+        self._roots = roots
+        self._on_change = on_change
+        self.interval_s = interval_s
+        self.max_interval_s = max_interval_s
+        self._dirs: dict[str, _Dir] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.stats_done = 0
+
+    def start(self) -> None:
+        now = time.monotonic()
+        for root in self._roots:
+            self._add_tree(str(root), now, notify=False)
+        self._thread = threading.Thread(target=self._run, name="cctv-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    @property
+    def directories(self) -> int:
+        return len(self._dirs)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.poll_once()
+            except Exception:  # pragma: no cover - keep polling whatever one pass hit
+                log.exception("Polling pass failed")
+
+    def poll_once(self, now: float | None = None) -> int:
+        """Check every directory that is due; returns the number of changed files reported."""
+        if now is None:
+            now = time.monotonic()
+        changed = 0
+        for d in list(self._dirs.values()):
+            if d.due > now or d.path not in self._dirs:
+                continue
+            found = self._poll_dir(d, now)
+            changed += found
+            d.interval_s = self.interval_s if found else min(d.interval_s * 2, self.max_interval_s)
+            d.due = now + d.interval_s
+        return changed
+
+    def _stat(self, path: str) -> os.stat_result | None:
+        self.stats_done += 1
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+    def _poll_dir(self, d: _Dir, now: float) -> int:
+        st = self._stat(d.path)
+        if st is None:
+            self._remove_tree(d.path)
+            return 1
+        changed = 0
+        if st.st_mtime_ns != d.mtime_ns:
+            d.mtime_ns = st.st_mtime_ns
+            changed += self._relist(d, now)
+        for name, signature in list(d.files.items()):
+            fst = self._stat(os.path.join(d.path, name))
+            if fst is None:
+                continue  # removed; the relist above or on the next mtime change drops it
+            current = (fst.st_size, fst.st_mtime_ns)
+            if current != signature:
+                d.files[name] = current
+                self._on_change(Path(d.path, name))
+                changed += 1
+        return changed
+
+    def _list(self, path: str) -> tuple[dict[str, tuple[int, int]], set[str]] | None:
+        files: dict[str, tuple[int, int]] = {}
+        subdirs: set[str] = set()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.add(entry.name)
+                        elif is_usage_file(Path(entry.name)):
+                            est = entry.stat()
+                            files[entry.name] = (est.st_size, est.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        self.stats_done += 1 + len(files)
+        return files, subdirs
+
+    def _relist(self, d: _Dir, now: float) -> int:
+        listed = self._list(d.path)
+        if listed is None:
+            return 0
+        files, subdirs = listed
+        changed = 0
+        for name in d.files.keys() - files.keys():
+            self._on_change(Path(d.path, name))
+            changed += 1
+        for name in files.keys() - d.files.keys():
+            self._on_change(Path(d.path, name))
+            changed += 1
+        # Files present before and after keep their old signature, so the
+        # per-file pass reports them if they changed too.
+        d.files = {name: d.files.get(name, sig) for name, sig in files.items()}
+        for name in d.subdirs - subdirs:
+            self._remove_tree(os.path.join(d.path, name))
+        for name in subdirs - d.subdirs:
+            changed += self._add_tree(os.path.join(d.path, name), now, notify=True)
+        d.subdirs = subdirs
+        return changed
+
+    def _add_tree(self, path: str, now: float, notify: bool) -> int:
+        st = self._stat(path)
+        listed = self._list(path) if st is not None else None
+        if listed is None:
+            return 0
+        files, subdirs = listed
+        self._dirs[path] = _Dir(path, st.st_mtime_ns, files, subdirs, self.interval_s, now + self.interval_s)
+        changed = 0
+        if notify:
+            for name in files:
+                self._on_change(Path(path, name))
+                changed += 1
+        for name in subdirs:
+            changed += self._add_tree(os.path.join(path, name), now, notify)
+        return changed
+
+    def _remove_tree(self, path: str) -> None:
+        prefix = path + os.sep
+        for key in [k for k in self._dirs if k == path or k.startswith(prefix)]:
+            for name in self._dirs.pop(key).files:
+                self._on_change(Path(key, name))
@@ -5,7 +5,12 @@ from typing import Callable
 
 from watchdog.events import FileSystemEvent, FileSystemEventHandler
 from watchdog.observers import Observer
-from watchdog.observers.polling import PollingObserver
+
+from cctv.ingest.archive import is_usage_file
+from cctv.monitor.poller import ScandirPoller
+
+# Our own reads open and close files; only writes, moves and deletes matter.
+_READ_EVENTS = frozenset({"opened", "closed_no_write"})
 
 
 class _Handler(FileSystemEventHandler):
@@ -14,43 +19,50 @@ class _Handler(FileSystemEventHandler):
         self._callback = callback
 
     def on_any_event(self, event: FileSystemEvent) -> None:
-        if getattr(event, "is_directory", False):
+        if getattr(event, "is_directory", False) or event.event_type in _READ_EVENTS:
             return
         p = Path(event.src_path)
-        if p.suffix == ".jsonl":
+        if is_usage_file(p):
             self._callback(p)
 
 
 class UsageWatcher:
-    def __init__(self, roots: list[Path], on_change: Callable[[Path], None]) -> None:
+    def __init__(self, roots: list[Path], on_change: Callable[[Path], None], poll: bool = False) -> None:
         self._roots = roots
         self._on_change = on_change
         self._observer: Observer | None = None
+        self._poller: ScandirPoller | None = None
+        self._force_poll = poll
+
+    @property
+    def polling(self) -> bool:
+        return self._poller is not None
 
     def start(self) -> None:
-        handler = _Handler(self._on_change)
         # Try native observer first (FSEvents on macOS, inotify on Linux).
-        # Fall back to polling if the native backend fails to start.
-        observer: Observer = Observer()
-        try:
-            for root in self._roots:
-                if root.exists():
-                    observer.schedule(handler, str(root), recursive=True)
-            observer.start()
-            self._observer = observer
-            return
-        except Exception:
-            observer.stop()
-            observer.join(timeout=1.0)
+        # Fall back to polling if the native backend fails to start; native
+        # backends start fine on network mounts but never fire, hence --poll.
+        if not self._force_poll:
+            handler = _Handler(self._on_change)
+            observer: Observer = Observer()
+            try:
+                for root in self._roots:
+                    if root.exists():
+                        observer.schedule(handler, str(root), recursive=True)
+                observer.start()
+                self._observer = observer
+                return
+            except Exception:
+                observer.stop()
+                observer.join(timeout=1.0)
 
-        fallback = PollingObserver()
-        for root in self._roots:
-            if root.exists():
-                fallback.schedule(handler, str(root), recursive=True)
-        fallback.start()
-        self._observer = fallback
+        self._poller = ScandirPoller(self._roots, self._on_change)
+        self._poller.start()
 
     def stop(self) -> None:
+        if self._poller is not None:
+            self._poller.stop()
+            self._poller = None
         if self._observer is None:
             return
         self._observer.stop()
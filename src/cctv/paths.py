@@ -1,14 +1,23 @@
 from __future__ import annotations
 
+import glob
 import os
+import tempfile
+import warnings
 from pathlib import Path
 
 try:
-    from platformdirs import user_data_dir
+    from platformdirs import user_cache_dir, user_data_dir, user_runtime_dir
 except ImportError:  # pragma: no cover
+    def user_cache_dir(appname: str) -> str:
+        return str(Path.home() / ".cache" / appname)
+
     def user_data_dir(appname: str, appauthor: str) -> str:
         return str(Path.home() / ".local" / "share" / appname)
 
+    def user_runtime_dir(appname: str) -> str:
+        return str(Path(tempfile.gettempdir()) / f"{appname}-{os.getuid()}")
+
 
 def default_usage_roots() -> list[Path]:
     env = os.getenv("CCTV_USAGE_GLOB")
@@ -25,3 +34,44 @@ def default_usage_roots() -> list[Path]:
         if c.exists():
             existing.append(c)
     return existing or [Path.home() / ".claude"]
+
+
+def default_socket_path() -> Path:
+    env = os.getenv("CCTV_SOCKET")
+    if env:
+        return Path(env).expanduser()
+    with warnings.catch_warnings():
+        # platformdirs warns when XDG_RUNTIME_DIR is unset, then falls back to /tmp.
+        warnings.simplefilter("ignore")
+        return Path(user_runtime_dir("cctv")) / "daemon.sock"
+
+
+def all_user_roots(pattern: str = "/home/*/.claude") -> list[Path]:
+    """Every user's Claude directory matching ``pattern``, e.g. on a shared host."""
+    return sorted(Path(p) for p in glob.glob(os.path.expanduser(pattern)) if os.path.isdir(p))
+
+
+def root_user(root: Path) -> str:
+    # /home/<user>/.claude → <user>
+    return root.parent.name
+
+
+def default_index_dir() -> Path:
+    return Path(user_cache_dir("cctv")) / "index"
+
+
+def default_archive_cache_dir() -> Path:
+    return Path(user_cache_dir("cctv")) / "archives"
+
+
+def default_database_path() -> Path:
+    return Path(user_data_dir("cctv", "cctv")) / "usage.db"
+
+
+def project_of(path: Path) -> str | None:
+    # <root>/projects/<project>/<session>.jsonl (or deeper, for subagents) → <project>
+    parts = path.parts
+    for i in range(len(parts) - 2, -1, -1):
+        if parts[i] == "projects":
+            return parts[i + 1]
+    return None
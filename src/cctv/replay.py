@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import math
+from dataclasses import replace
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from cctv.aggregate.bucketer import empty_buckets
+from cctv.alerts import AlertMonitor
+from cctv.config import AppConfig
+from cctv.domain.models import RequestUsage
+from cctv.domain.state import StateStore
+from cctv.ingest.archive import ArchiveReader, first_usage_ms, is_archive
+from cctv.ingest.dedupe import DedupeCache
+from cctv.ingest.locator import scan_usage_files
+from cctv.ingest.schema import SchemaParser
+from cctv.ingest.time_index import TimeIndexStore
+from cctv.paths import default_archive_cache_dir, default_index_dir
+from cctv.summary import parse_time_bound, read_line_chunks
+from cctv.util.profiling import PhaseTimer
+from cctv.util.time import ScaledClock, floor_to_bucket_ms, now_ms, set_clock
+
+log = logging.getLogger(__name__)
+
+# Records within a session file are only roughly in time order; each file
+# stream is re-sorted through a heap this deep before the k-way merge.
+# Anything further out of order is replayed late and logged.
+_REORDER_DEPTH = 256
+_CHUNK_BYTES = 256 * 1024
+# Bytes read per step when looking for a file's first usage records.
+_PEEK_BYTES = 16 * 1024
+
+
+def parse_speed(raw: str) -> float:
+    s = raw.strip().lower().removesuffix("x")
+    try:
+        speed = float(s)
+    except ValueError:
+        raise ValueError(f"Invalid speed {raw!r}; use e.g. 60x") from None
+    if not math.isfinite(speed) or speed <= 0:
+        raise ValueError(f"Speed must be a positive number, got {raw!r}")
+    return speed
+
+
+def _reordered(usages: Iterable[RequestUsage], depth: int = _REORDER_DEPTH) -> Iterator[RequestUsage]:
+    heap: list[tuple[int, int, RequestUsage]] = []
+    for seq, usage in enumerate(usages):
+        heapq.heappush(heap, (usage.timestamp_ms, seq, usage))
+        if len(heap) > depth:
+            yield heapq.heappop(heap)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def _file_usages(
+    path: Path, ranges: list[tuple[int, int]], since_ms: int, until_ms: int
+) -> Iterator[RequestUsage]:
+    parser = SchemaParser()
+    for start, end in ranges:
+        for _, _, lines in read_line_chunks(path, start, end, _CHUNK_BYTES):
+            for usage in parser.parse_lines(path, lines):
+                if since_ms <= usage.timestamp_ms < until_ms:
+                    yield usage
+
+
+def _first_usage_ms(path: Path, start: int, end: int) -> int | None:
+    parser = SchemaParser()
+    for _, _, lines in read_line_chunks(path, start, end, _PEEK_BYTES):
+        usages = parser.parse_lines(path, lines)
+        if usages:
+            return min(u.timestamp_ms for u in usages)
+    return None
+
+
+def _archive_usages(archives: ArchiveReader, path: Path, since_ms: int, until_ms: int) -> Iterator[RequestUsage]:
+    # Read lazily, when the merge first pulls from this stream.
+    for usage in archives.usages(path):
+        if since_ms <= usage.timestamp_ms < until_ms:
+            yield usage
+
+
+def merged_usages(
+    roots: list[Path],
+    since_ms: int,
+    until_ms: int,
+    index: TimeIndexStore | None = None,
+    archives: ArchiveReader | None = None,
+) -> Iterator[RequestUsage]:
+    """All usage in ``[since_ms, until_ms)`` across ``roots``, in timestamp order.
+
+    A streaming k-way merge over lazily opened streams. Each file is keyed by
+    its first usage timestamp (from its time index, or by reading its first
+    records) and only opened once the merge reaches that time, so memory is
+    bounded by one chunk and one reorder heap per file whose span overlaps
+    the replay time, not by the number of files or the length of the range.
+    Indexed files outside the range are not opened at all. Events that
+    arrive after a later one was already replayed are counted and logged.
+    """
+    if archives is None:
+        archives = ArchiveReader()
+    # (first timestamp, path, opener); a stream is only opened when the merge reaches its first timestamp.
+    pending: list[tuple[int, str, Callable[[], Iterator[RequestUsage]]]] = []
+    for path, size in sorted(scan_usage_files(roots).items()):
+        if is_archive(path):
+            first = first_usage_ms(path)
+            if first is not None:
+                pending.append((
+                    max(first, since_ms), str(path),
+                    lambda path=path: _reordered(_archive_usages(archives, path, since_ms, until_ms)),
+                ))
+            continue
+        file_index = index.get(path) if index is not None else None
+        if file_index is None:
+            ranges = [(0, size)]
+            first = _first_usage_ms(path, 0, size)
+        else:
+            ranges = file_index.ranges(since_ms, until_ms)
+            firsts = [file_index.min_ts] if ranges else []
+            if file_index.end < size:
+                ranges.append((file_index.end, size))
+                firsts.append(_first_usage_ms(path, file_index.end, size))
+            first = min((ts for ts in firsts if ts is not None), default=None)
+        if ranges and first is not None:
+            pending.append((
+                max(first, since_ms), str(path),
+                lambda path=path, ranges=ranges: _reordered(_file_usages(path, ranges, since_ms, until_ms)),
+            ))
+    pending.sort(key=lambda source: source[:2])
+
+    seq = count()
+    heap: list[tuple[int, int, RequestUsage, Iterator[RequestUsage]]] = []
+    opened = 0
+    last_ms: int | None = None
+    late = 0
+    dedupe = DedupeCache()
+    while True:
+        while opened < len(pending) and (not heap or pending[opened][0] <= heap[0][0]):
+            stream = pending[opened][2]()
+            opened += 1
+            first_usage = next(stream, None)
+            if first_usage is not None:
+                heapq.heappush(heap, (first_usage.timestamp_ms, next(seq), first_usage, stream))
+        if not heap:
+            break
+        ts, _, usage, stream = heap[0]
+        following = next(stream, None)
+        if following is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (following.timestamp_ms, next(seq), following, stream))
+        if last_ms is not None and ts < last_ms:
+            if late == 0:
+                log.warning("Replaying %s out of timestamp order (%d ms late)", usage.event_id, last_ms - ts)
+            late += 1
+        else:
+            last_ms = ts
+        if dedupe.add_if_new(usage.event_id):
+            yield usage
+    if late:
+        log.warning("%d replayed events were out of timestamp order", late)
+
+
+class ReplaySource:
+    """Feeds historical usage through a StateStore on an accelerated clock.
+
+    Stands in for UsagePipeline in the TUI. While started, ``now_ms()``
+    everywhere returns replay time. As in the live TUI, a bucket spans one
+    refresh, here of replay time.
+    """
+
+    def __init__(
+        self,
+        config: AppConfig,
+        pricing: dict[str, dict[str, float]],
+        roots: list[Path],
+        since_ms: int,
+        until_ms: int,
+        speed: float,
+        index: TimeIndexStore | None = None,
+        perf: PhaseTimer | None = None,
+        archives: ArchiveReader | None = None,
+    ) -> None:
+        self.config = replace(config, bucket_seconds=max(1, round(config.refresh_seconds * speed)))
+        self.pricing = pricing
+        self.perf = perf or PhaseTimer()
+        self.clock = ScaledClock(since_ms, speed, end_ms=until_ms)
+        self.since_ms = since_ms
+        self.until_ms = until_ms
+        self.store = StateStore(window_size=config.window_size)
+        self.replayed = 0
+        self.alerts = AlertMonitor(self.config, pricing)
+        self._events = merged_usages(roots, since_ms, until_ms, index, archives)
+        self._pending: RequestUsage | None = None
+        self.reset_buckets()
+
+    def start(self) -> None:
+        self.clock.restart()
+        set_clock(self.clock)
+
+    def stop(self) -> None:
+        set_clock(None)
+
+    def set_instrumented(self, enabled: bool) -> None:
+        self.perf.enabled = enabled
+
+    def reset_buckets(self) -> None:
+        now_bucket = floor_to_bucket_ms(self.clock(), self.config.bucket_seconds)
+        self.store.replace_buckets(empty_buckets(self.config.window_size, now_bucket, self.config.bucket_seconds))
+        self.store.publish()
+
+    def tick(self, now: int | None = None) -> None:
+        perf = self.perf
+        perf.begin_tick()
+        if now is None:
+            now = self.clock()
+        t = perf.start()
+        self.store.advance_time(now, self.config.bucket_seconds)
+        while True:
+            usage = self._pending
+            if usage is None:
+                usage = next(self._events, None)
+                if usage is None:
+                    break
+            if usage.timestamp_ms > now:
+                self._pending = usage
+                break
+            self._pending = None
+            self.store.apply_usage(usage, self.config.bucket_seconds, self.pricing)
+            self.alerts.observe(usage, None, now)
+            self.replayed += 1
+        perf.stop("aggregate", t)
+        self.store.maybe_rescale()
+        self.store.publish()
+
+    @property
+    def label(self) -> str:
+        at = datetime.fromtimestamp(self.clock() / 1000).strftime("%Y-%m-%d %H:%M:%S")
+        state = "finished" if self.clock.finished else f"{self.clock.speed:g}x"
+        return f"replay {at}, {state}"
+
+    def debug_lines(self) -> list[str]:
+        return [f"{self.label} | events {self.replayed} | bucket {self.config.bucket_seconds}s"]
+
+
+def build_replay(
+    config: AppConfig, pricing: dict[str, dict[str, float]], roots: list[Path], perf: PhaseTimer | None = None
+) -> ReplaySource:
+    now = now_ms()
+    if not config.replay_from:
+        raise SystemExit("cctv replay needs --from (e.g. --from 2026-01-31T09:00 or --from 2d)")
+    try:
+        since_ms = parse_time_bound(config.replay_from, now)
+        until_ms = parse_time_bound(config.replay_to, now) if config.replay_to else now
+        speed = parse_speed(config.replay_speed)
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from None
+    if until_ms <= since_ms:
+        raise SystemExit("--to must be after --from")
+    index = None
+    if config.time_index:
+        index = TimeIndexStore(Path(config.index_dir).expanduser() if config.index_dir else default_index_dir())
+    archives = ArchiveReader(default_archive_cache_dir())
+    return ReplaySource(config, pricing, roots, since_ms, until_ms, speed, index=index, perf=perf, archives=archives)
@@ -0,0 +1 @@
+"""server package."""
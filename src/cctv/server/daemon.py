@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+from cctv.config import AppConfig
+from cctv.domain.delta import apply_message, delta_message, snapshot_message
+from cctv.domain.models import StateSnapshot
+from cctv.domain.state import StateStore
+from cctv.ingest.pipeline import UsagePipeline
+from cctv.util.profiling import PhaseTimer
+
+log = logging.getLogger(__name__)
+
+# Messages a client may fall behind by before it is dropped; it reconnects
+# and starts over from a full snapshot.
+_MAX_PENDING = 256
+
+
+def encode_message(msg: dict[str, Any]) -> bytes:
+    return json.dumps(msg, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def daemon_available(socket_path: Path) -> bool:
+    """True if a daemon is accepting connections on ``socket_path``."""
+    if not hasattr(socket, "AF_UNIX") or not socket_path.exists():
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.5)
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+
+class _Subscriber:
+    """Outgoing message queue of one connected client."""
+
+    def __init__(self, limit: int = _MAX_PENDING) -> None:
+        self._pending: deque[bytes] = deque()
+        self._cond = threading.Condition()
+        self.limit = limit
+        self.closed = False
+
+    def push(self, data: bytes) -> None:
+        with self._cond:
+            if len(self._pending) >= self.limit:
+                self.closed = True
+            else:
+                self._pending.append(data)
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+    def next(self) -> bytes | None:
+        with self._cond:
+            while not self._pending and not self.closed:
+                self._cond.wait()
+            if self.closed:
+                return None
+            return self._pending.popleft()
+
+
+class DeltaBroadcaster:
+    """Fans published snapshots out to subscribers as snapshot + deltas.
+
+    Each new snapshot is diffed and encoded once, whatever the number of
+    clients. A subscriber gets the last broadcast snapshot in full and then
+    every delta after it, so attaching never waits for ingest.
+    """
+
+    def __init__(self, snapshot: StateSnapshot, bucket_seconds: int) -> None:
+        self.bucket_seconds = bucket_seconds
+        self._lock = threading.Lock()
+        self._subscribers: set[_Subscriber] = set()
+        self._last = snapshot
+        self._snapshot_bytes: bytes | None = None
+
+    @property
+    def clients(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> _Subscriber:
+        sub = _Subscriber()
+        with self._lock:
+            if self._snapshot_bytes is None:
+                self._snapshot_bytes = encode_message(snapshot_message(self._last, self.bucket_seconds))
+            sub.push(self._snapshot_bytes)
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: _Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+        sub.close()
+
+    def broadcast(self, snap: StateSnapshot) -> bool:
+        with self._lock:
+            if snap.version == self._last.version:
+                return False
+            data = encode_message(delta_message(self._last, snap))
+            self._last = snap
+            self._snapshot_bytes = None
+            for sub in list(self._subscribers):
+                sub.push(data)
+                if sub.closed:
+                    self._subscribers.discard(sub)
+                    log.warning("Dropped a client that fell %d messages behind", sub.limit)
+        return True
+
+
+def _make_handler(broadcaster: DeltaBroadcaster) -> type[socketserver.StreamRequestHandler]:
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            sub = broadcaster.subscribe()
+            try:
+                while (data := sub.next()) is not None:
+                    self.wfile.write(data)
+                    self.wfile.flush()
+            except OSError:
+                pass
+            finally:
+                broadcaster.unsubscribe(sub)
+
+    return Handler
+
+
+def _bind(socket_path: Path, handler: type[socketserver.StreamRequestHandler]) -> socketserver.ThreadingUnixStreamServer:
+    if daemon_available(socket_path):
+        raise SystemExit(f"A cctv daemon is already listening on {socket_path}")
+    socket_path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    socket_path.unlink(missing_ok=True)
+    # Owner-only from the moment it exists; a chmod alone would leave a window.
+    umask = os.umask(0o077)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(str(socket_path), handler)
+    finally:
+        os.umask(umask)
+    server.daemon_threads = True
+    os.chmod(socket_path, 0o600)
+    return server
+
+
+def serve_daemon(
+    config: AppConfig,
+    pricing: dict[str, dict[str, float]],
+    roots: list[Path],
+    socket_path: Path,
+) -> None:
+    if not hasattr(socket, "AF_UNIX"):
+        raise SystemExit("cctv daemon needs Unix domain sockets, which this platform lacks")
+    pipeline = UsagePipeline(config, pricing, roots)
+    pipeline.start()
+    pipeline.tick()
+    broadcaster = DeltaBroadcaster(pipeline.store.snapshot, config.bucket_seconds)
+    server = _bind(socket_path, _make_handler(broadcaster))
+    thread = threading.Thread(target=server.serve_forever, name="cctv-daemon", daemon=True)
+    thread.start()
+    log.info("cctv daemon listening on %s", socket_path)
+    try:
+        while True:
+            time.sleep(config.refresh_seconds)
+            pipeline.tick()
+            broadcaster.broadcast(pipeline.store.snapshot)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+        pipeline.stop()
+
+
+class DaemonClient:
+    """Mirrors a daemon's state into a local StateStore.
+
+    Stands in for UsagePipeline in the TUI. A reader thread applies the
+    daemon's messages and publishes; the UI only ever reads snapshots.
+    """
+
+    def __init__(self, socket_path: Path, window_size: int, perf: PhaseTimer | None = None) -> None:
+        self.socket_path = socket_path
+        self.perf = perf or PhaseTimer()
+        self.store = StateStore(window_size=window_size)
+        self.connected = False
+        # The daemon's bucket width, from its snapshot message; None until attached.
+        self.bucket_seconds: int | None = None
+        self.messages = 0
+        self.bytes_received = 0
+        self._stop = threading.Event()
+        self._sock: socket.socket | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="cctv-daemon-client", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def tick(self, now: int | None = None) -> None:
+        # State arrives on the reader thread; nothing to ingest here.
+        self.perf.begin_tick()
+
+    def reset_buckets(self) -> None:
+        # Bucket width is the daemon's; a client cannot change it.
+        pass
+
+    @property
+    def label(self) -> str:
+        return "daemon" if self.connected else "daemon, reconnecting"
+
+    def set_instrumented(self, enabled: bool) -> None:
+        self.perf.enabled = enabled
+
+    def debug_lines(self) -> list[str]:
+        state = "attached" if self.connected else "reconnecting"
+        return [
+            f"daemon {self.socket_path} ({state}) | messages {self.messages} | "
+            f"received {self.bytes_received / 1_048_576:.1f} MB"
+        ]
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.connect(str(self.socket_path))
+                    self._sock = sock
+                    self.connected = True
+                    with sock.makefile("rb") as stream:
+                        for line in stream:
+                            self.bytes_received += len(line)
+                            self.messages += 1
+                            msg = json.loads(line)
+                            if msg["type"] == "snapshot":
+                                self.bucket_seconds = msg["bucket_seconds"]
+                            apply_message(self.store, msg)
+            except (OSError, ValueError) as exc:
+                log.debug("daemon connection lost: %s", exc)
+            except (KeyError, TypeError) as exc:
+                # E.g. a daemon of another version; start over from its next snapshot.
+                log.warning("Malformed message from daemon, reconnecting: %r", exc)
+            finally:
+                self._sock = None
+                self.connected = False
+            self._stop.wait(1.0)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from cctv.config import AppConfig
+from cctv.domain.models import StateSnapshot
+from cctv.domain.state import StateStore
+from cctv.ingest.pipeline import UsagePipeline
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Upper bounds of the per-request token histograms.
+TOKEN_BUCKETS = (100, 1_000, 5_000, 10_000, 50_000, 100_000, 200_000, 500_000, 1_000_000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_openmetrics(snap: StateSnapshot) -> bytes:
+    totals = sorted(snap.totals_by_model.items())
+    out: list[str] = []
+
+    def counter(name: str, help_text: str, attr: str) -> None:
+        out.append(f"# TYPE {name} counter")
+        out.append(f"# HELP {name} {help_text}")
+        for model, total in totals:
+            out.append(f'{name}_total{{model="{_escape(model)}"}} {getattr(total, attr)}')
+
+    counter("cctv_input_tokens", "Uncached input tokens.", "input_tokens")
+    counter("cctv_output_tokens", "Output tokens.", "output_tokens")
+    counter("cctv_cache_read_input_tokens", "Input tokens served from the prompt cache.", "cache_read_input_tokens_total")
+    counter("cctv_cost_usd", "Estimated cost in USD.", "cost_usd")
+
+    out.append("# TYPE cctv_requests counter")
+    out.append("# HELP cctv_requests Requests with token usage.")
+    for model, total in totals:
+        out.append(f'cctv_requests_total{{model="{_escape(model)}"}} {total.input_sketch.count}')
+
+    for kind in ("input", "output"):
+        name = f"cctv_request_{kind}_tokens"
+        out.append(f"# TYPE {name} histogram")
+        out.append(f"# HELP {name} {kind.capitalize()} tokens per request (bucket counts are approximate).")
+        for model, total in totals:
+            sketch = getattr(total, f"{kind}_sketch")
+            label = _escape(model)
+            for bound in TOKEN_BUCKETS:
+                out.append(f'{name}_bucket{{model="{label}",le="{bound}"}} {sketch.count_le(bound)}')
+            out.append(f'{name}_bucket{{model="{label}",le="+Inf"}} {sketch.count}')
+            out.append(f'{name}_sum{{model="{label}"}} {getattr(total, f"{kind}_tokens")}')
+            out.append(f'{name}_count{{model="{label}"}} {sketch.count}')
+
+    if snap.totals_by_user:
+        by_user = sorted(
+            (user, model, total) for user, partition in snap.totals_by_user.items() for model, total in partition.items()
+        )
+        for name, help_text, attr in (
+            ("cctv_user_input_tokens", "Uncached input tokens per user.", "input_tokens"),
+            ("cctv_user_output_tokens", "Output tokens per user.", "output_tokens"),
+            ("cctv_user_cost_usd", "Estimated cost in USD per user.", "cost_usd"),
+        ):
+            out.append(f"# TYPE {name} counter")
+            out.append(f"# HELP {name} {help_text}")
+            for user, model, total in by_user:
+                labels = f'user="{_escape(user)}",model="{_escape(model)}"'
+                out.append(f"{name}_total{{{labels}}} {getattr(total, attr)}")
+
+    out.append("# TYPE cctv_state_version gauge")
+    out.append("# HELP cctv_state_version Version of the state the metrics were rendered from.")
+    out.append(f"cctv_state_version {snap.version}")
+    out.append("# EOF")
+    return ("\n".join(out) + "\n").encode("utf-8")
+
+
+class MetricsExporter:
+    """Holds the rendered exposition for the latest published snapshot.
+
+    Scrapes only read ``body``; re-rendering happens at most once per
+    snapshot version, on the ingest side.
+    """
+
+    def __init__(self, store: StateStore) -> None:
+        self.store = store
+        self._version = -1
+        self.body = b"# EOF\n"
+
+    def update(self) -> bool:
+        snap = self.store.snapshot
+        if snap.version == self._version:
+            return False
+        self._version = snap.version
+        # Rebinding is atomic, so request threads see either the old or new body.
+        self.body = render_openmetrics(snap)
+        return True
+
+
+def _make_handler(exporter: MetricsExporter) -> type[BaseHTTPRequestHandler]:
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = exporter.body
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            log.debug("%s - %s", self.address_string(), format % args)
+
+    return _Handler
+
+
+def serve_metrics(config: AppConfig, pricing: dict[str, dict[str, float]], roots: list[Path]) -> None:
+    pipeline = UsagePipeline(config, pricing, roots)
+    exporter = MetricsExporter(pipeline.store)
+    server = ThreadingHTTPServer((config.metrics_host, config.metrics_port), _make_handler(exporter))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="cctv-metrics", daemon=True)
+
+    pipeline.start()
+    pipeline.tick()
+    exporter.update()
+    thread.start()
+    log.info("Serving metrics on http://%s:%d/metrics", config.metrics_host, config.metrics_port)
+    try:
+        while True:
+            time.sleep(config.refresh_seconds)
+            pipeline.tick()
+            exporter.update()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        pipeline.stop()
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from cctv.config import AppConfig
+from cctv.domain.models import BucketPoint, ModelTotal, StateSnapshot
+from cctv.ingest.pipeline import UsagePipeline
+
+log = logging.getLogger(__name__)
+
+# Unsent bytes a browser tab may fall behind by before it is dropped; its
+# EventSource reconnects and starts over from a full snapshot.
+_MAX_BUFFER_BYTES = 1024 * 1024
+_KEEPALIVE_SECONDS = 15.0
+
+
+# Browser messages leave out the sketches and cache internals the daemon
+# wire format carries: a bucket is [start_ms, input, output, count] and a
+# total is [model, input, output, cache_read, cost_usd, requests, cache_hit_rate].
+
+def _bucket_row(point: BucketPoint) -> list[Any]:
+    return [point.start_ms, point.input_tokens, point.output_tokens, point.count]
+
+
+def _total_row(total: ModelTotal) -> list[Any]:
+    rate = total.cumulative_cache_hit_rate
+    return [
+        total.model,
+        total.input_tokens,
+        total.output_tokens,
+        total.cache_read_input_tokens_total,
+        round(total.cost_usd, 6),
+        total.input_sketch.count,
+        round(rate, 4) if rate is not None else None,
+    ]
+
+
+def web_snapshot_message(snap: StateSnapshot, bucket_seconds: int) -> dict[str, Any]:
+    return {
+        "bucket_seconds": bucket_seconds,
+        "buckets": [_bucket_row(b) for b in snap.buckets],
+        "totals": [_total_row(t) for t in snap.totals_by_model.values()],
+        "scale": [snap.scale_input_max, snap.scale_output_max],
+    }
+
+
+def web_delta_message(old: StateSnapshot, new: StateSnapshot) -> dict[str, Any]:
+    old_buckets = {b.start_ms: b for b in old.buckets}
+    return {
+        "first": new.buckets[0].start_ms if new.buckets else None,
+        "buckets": [_bucket_row(b) for b in new.buckets if old_buckets.get(b.start_ms) is not b],
+        "totals": [
+            _total_row(t) for model, t in new.totals_by_model.items() if old.totals_by_model.get(model) is not t
+        ],
+        "scale": [new.scale_input_max, new.scale_output_max],
+    }
+
+
+def encode_event(event: str, version: int, msg: dict[str, Any]) -> bytes:
+    data = json.dumps(msg, separators=(",", ":"))
+    return f"event: {event}\nid: {version}\ndata: {data}\n\n".encode("utf-8")
+
+
+class SseBroadcaster:
+    """Fans published snapshots out to browser tabs as Server-Sent Events.
+
+    Like the daemon's ``DeltaBroadcaster``, each snapshot is diffed and
+    encoded once however many tabs are open; a tab gets the last broadcast
+    snapshot in full and every delta after it. All methods run on the event
+    loop, so writers need no locking.
+    """
+
+    def __init__(self, snapshot: StateSnapshot, bucket_seconds: int, max_buffer: int = _MAX_BUFFER_BYTES) -> None:
+        self.bucket_seconds = bucket_seconds
+        self.max_buffer = max_buffer
+        self._clients: set[asyncio.StreamWriter] = set()
+        self._last = snapshot
+        self._snapshot_bytes: bytes | None = None
+        self._last_send = time.monotonic()
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+    def subscribe(self, writer: asyncio.StreamWriter) -> None:
+        if self._snapshot_bytes is None:
+            self._snapshot_bytes = encode_event(
+                "snapshot", self._last.version, web_snapshot_message(self._last, self.bucket_seconds)
+            )
+        writer.write(self._snapshot_bytes)
+        self._clients.add(writer)
+
+    def unsubscribe(self, writer: asyncio.StreamWriter) -> None:
+        self._clients.discard(writer)
+
+    def broadcast(self, snap: StateSnapshot) -> bool:
+        if snap.version == self._last.version:
+            if time.monotonic() - self._last_send >= _KEEPALIVE_SECONDS:
+                self._send(b": keepalive\n\n")
+            return False
+        data = encode_event("delta", snap.version, web_delta_message(self._last, snap))
+        self._last = snap
+        self._snapshot_bytes = None
+        self._send(data)
+        return True
+
+    def _send(self, data: bytes) -> None:
+        self._last_send = time.monotonic()
+        for writer in list(self._clients):
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                self._clients.discard(writer)
+                writer.close()
+                log.warning("Dropped a browser that fell %d bytes behind", self.max_buffer)
+                continue
+            writer.write(data)
+
+
+def _response(status: str, content_type: str, body: bytes) -> bytes:
+    head = (
+        f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _make_handler(broadcaster: SseBroadcaster):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except (ValueError, ConnectionError):
+            writer.close()
+            return
+        path = target.split("?", 1)[0]
+        try:
+            if method != "GET":
+                writer.write(_response("405 Method Not Allowed", "text/plain", b"Method not allowed\n"))
+            elif path == "/":
+                writer.write(_response("200 OK", "text/html; charset=utf-8", INDEX_HTML))
+            elif path == "/events":
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                    b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n"
+                )
+                broadcaster.subscribe(writer)
+                try:
+                    # Nothing is read from an event stream; EOF means the tab went away.
+                    while await reader.read(4096):
+                        pass
+                finally:
+                    broadcaster.unsubscribe(writer)
+            else:
+                writer.write(_response("404 Not Found", "text/plain", b"Not found\n"))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def _serve_web(config: AppConfig, pipeline: UsagePipeline) -> None:
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="cctv-ingest") as ingest:
+        await loop.run_in_executor(ingest, pipeline.tick)
+        broadcaster = SseBroadcaster(pipeline.store.snapshot, config.bucket_seconds)
+        server = await asyncio.start_server(_make_handler(broadcaster), config.web_host, config.web_port)
+        log.info("Serving dashboard on http://%s:%d/", config.web_host, config.web_port)
+        async with server:
+            while True:
+                await asyncio.sleep(config.refresh_seconds)
+                # Ingest blocks on file reads; keep the loop free to serve tabs.
+                await loop.run_in_executor(ingest, pipeline.tick)
+                broadcaster.broadcast(pipeline.store.snapshot)
+
+
+def serve_web(config: AppConfig, pricing: dict[str, dict[str, float]], roots: list[Path]) -> None:
+    pipeline = UsagePipeline(config, pricing, roots)
+    pipeline.start()
+    try:
+        asyncio.run(_serve_web(config, pipeline))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+
+
+INDEX_HTML = b"""<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>cctv</title>
+<style>
+body { background: #111; color: #ddd; font: 14px ui-monospace, monospace; margin: 1.5em; }
+h2 { font-size: 14px; font-weight: normal; color: #888; margin: 1.2em 0 0.3em; }
+canvas { width: 100%; height: 160px; background: #181818; }
+table { border-collapse: collapse; margin-top: 0.5em; }
+th, td { padding: 2px 12px; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+th { color: #888; font-weight: normal; }
+#status { color: #888; }
+</style>
+</head>
+<body>
+<div>cctv <span id="status">connecting</span></div>
+<h2>input tokens / bucket</h2><canvas id="input"></canvas>
+<h2>output tokens / bucket</h2><canvas id="output"></canvas>
+<h2>totals</h2>
+<table><thead><tr>
+<th>model</th><th>requests</th><th>input</th><th>output</th><th>cache read</th><th>cache hit</th><th>cost</th>
+</tr></thead><tbody id="totals"></tbody></table>
+<script>
+let buckets = new Map(), totals = new Map(), scale = [100, 100], bucketSeconds = 10, dirty = false;
+
+function apply(msg, full) {
+  if (full) { buckets = new Map(); totals = new Map(); bucketSeconds = msg.bucket_seconds; }
+  for (const b of msg.buckets) buckets.set(b[0], b);
+  if (!full && msg.first !== null) for (const start of buckets.keys()) if (start < msg.first) buckets.delete(start);
+  for (const t of msg.totals) totals.set(t[0], t);
+  scale = msg.scale;
+  if (!dirty) { dirty = true; requestAnimationFrame(render); }
+}
+
+function draw(id, column, max) {
+  const canvas = document.getElementById(id), ctx = canvas.getContext("2d");
+  canvas.width = canvas.clientWidth * devicePixelRatio;
+  canvas.height = canvas.clientHeight * devicePixelRatio;
+  const rows = [...buckets.values()].sort((a, b) => a[0] - b[0]);
+  const w = canvas.width / Math.max(rows.length, 1);
+  ctx.fillStyle = column === 1 ? "#4aa3df" : "#e0a040";
+  rows.forEach((b, i) => {
+    const h = Math.min(b[column] / Math.max(max, 1), 1) * canvas.height;
+    ctx.fillRect(i * w, canvas.height - h, Math.max(w - 1, 1), h);
+  });
+}
+
+function render() {
+  dirty = false;
+  draw("input", 1, scale[0]);
+  draw("output", 2, scale[1]);
+  const fmt = n => n.toLocaleString();
+  // Model names come from log files: set them as text, never as markup.
+  const rows = [...totals.values()].sort((a, b) => b[4] - a[4]).map(t => {
+    const tr = document.createElement("tr");
+    for (const cell of [t[0], fmt(t[5]), fmt(t[1]), fmt(t[2]), fmt(t[3]),
+                        t[6] === null ? "-" : (t[6] * 100).toFixed(1) + "%", "$" + t[4].toFixed(4)]) {
+      const td = document.createElement("td");
+      td.textContent = cell;
+      tr.appendChild(td);
+    }
+    return tr;
+  });
+  document.getElementById("totals").replaceChildren(...rows);
+  document.getElementById("status").textContent = `live, ${bucketSeconds}s buckets`;
+}
+
+const events = new EventSource("/events");
+events.addEventListener("snapshot", e => apply(JSON.parse(e.data), true));
+events.addEventListener("delta", e => apply(JSON.parse(e.data), false));
+events.onerror = () => { document.getElementById("status").textContent = "reconnecting"; };
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,444 @@
+from __future__ import annotations
+
+import getpass
+import heapq
+import json
+import logging
+import os
+import socket
+import struct
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
+from pathlib import Path
+from typing import Iterator
+
+from cctv.aggregate.totals import apply_usage_to_totals, merge_model_totals, remove_usage_from_totals
+from cctv.config import AppConfig
+from cctv.database import QueryRow, format_query
+from cctv.domain.delta import bucket_from_row, bucket_row, total_from_row, total_row
+from cctv.domain.models import BucketPoint, ModelTotal, RequestUsage
+from cctv.export import parse_file_rows
+from cctv.ingest.locator import scan_usage_files
+from cctv.paths import default_archive_cache_dir, root_user
+from cctv.pricing import model_price
+from cctv.summary import parse_time_bound
+from cctv.util.hashing import digest64
+from cctv.util.time import now_ms
+
+log = logging.getLogger(__name__)
+
+# A snapshot file is
+#
+#   header   MAGIC, format version (u16)
+#   blocks   per block: event count (u32), compressed size (u32), zlib(events)
+#   meta     zlib(JSON): string tables, hourly buckets, totals with sketches
+#   footer   meta offset (u64), meta size (u64), MAGIC
+#
+# Events are sorted by the 64-bit digest of their event ID and carry what
+# they contributed to the aggregates, so a merge can find events two inputs
+# share with a streaming k-way merge and subtract the extra copies.
+
+MAGIC = b"CCTVSNAP"
+FORMAT_VERSION = 1
+BUCKET_MS = 3_600_000
+BLOCK_EVENTS = 4_096
+# Digests are random and do not compress; level 1 gets most of the rest at a
+# fraction of the default level's cost.
+_BLOCK_LEVEL = 1
+
+_HEADER = struct.Struct("<8sH")
+_FOOTER = struct.Struct("<QQ8s")
+_BLOCK = struct.Struct("<II")
+# digest, timestamp, model, project, user, input, output, cache read, cache creation, cost (micro-USD), cache hit
+_EVENT = struct.Struct("<QqHHHIIIIIb")
+_NONE = 0xFFFF
+_U32_MAX = 0xFFFF_FFFF
+
+# One decoded event; string fields are indexes into the snapshot's tables.
+Event = tuple
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def event_digest(event_id: str) -> int:
+    return digest64(event_id.encode("utf-8"))
+
+
+def default_source() -> str:
+    return f"{getpass.getuser()}@{socket.gethostname()}"
+
+
+@dataclass
+class Snapshot:
+    """Aggregates of a snapshot file: what ``StateStore`` holds, bucketed hourly."""
+
+    sources: list[str] = field(default_factory=list)
+    events: int = 0
+    buckets: dict[int, BucketPoint] = field(default_factory=dict)
+    totals_by_model: dict[str, ModelTotal] = field(default_factory=dict)
+    # Keyed by the user who recorded the usage (a snapshot's source by default).
+    totals_by_user: dict[str, dict[str, ModelTotal]] = field(default_factory=dict)
+
+    def add(self, usage: RequestUsage, pricing: dict[str, dict[str, float]]) -> None:
+        start = usage.timestamp_ms - usage.timestamp_ms % BUCKET_MS
+        point = self.buckets.get(start)
+        if point is None:
+            point = self.buckets[start] = BucketPoint(start_ms=start)
+        point.input_tokens += usage.input_tokens
+        point.output_tokens += usage.output_tokens
+        point.count += 1
+        apply_usage_to_totals(self.totals_by_model, usage, pricing)
+        apply_usage_to_totals(self.totals_by_user.setdefault(usage.user or "", {}), usage, pricing)
+        self.events += 1
+
+    def remove(self, usage: RequestUsage, cost_usd: float) -> None:
+        point = self.buckets.get(usage.timestamp_ms - usage.timestamp_ms % BUCKET_MS)
+        if point is not None:
+            point.input_tokens -= usage.input_tokens
+            point.output_tokens -= usage.output_tokens
+            point.count -= 1
+        remove_usage_from_totals(self.totals_by_model, usage, cost_usd)
+        remove_usage_from_totals(self.totals_by_user.get(usage.user or "", {}), usage, cost_usd)
+        self.events -= 1
+
+    def merge(self, other: Snapshot) -> None:
+        self.sources.extend(s for s in other.sources if s not in self.sources)
+        for start, point in other.buckets.items():
+            mine = self.buckets.get(start)
+            if mine is None:
+                mine = self.buckets[start] = BucketPoint(start_ms=start)
+            mine.input_tokens += point.input_tokens
+            mine.output_tokens += point.output_tokens
+            mine.count += point.count
+        merge_model_totals(self.totals_by_model, other.totals_by_model)
+        for user, totals in other.totals_by_user.items():
+            merge_model_totals(self.totals_by_user.setdefault(user, {}), totals)
+        self.events += other.events
+
+
+@dataclass
+class _Tables:
+    models: list[str] = field(default_factory=list)
+    projects: list[str] = field(default_factory=list)
+    users: list[str] = field(default_factory=list)
+
+    def code(self, table: list[str], value: str | None) -> int:
+        # Tables are small (tens of entries), so a list scan beats keeping an index.
+        if value is None:
+            return _NONE
+        try:
+            return table.index(value)
+        except ValueError:
+            table.append(value)
+            return len(table) - 1
+
+    def usage(self, event: Event) -> RequestUsage:
+        _, ts, model, _, user, input_tokens, output_tokens, cache_read, cache_creation, _, hit = event
+        return RequestUsage(
+            event_id="",
+            timestamp_ms=ts,
+            model=self.models[model],
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cache_hit=None if hit < 0 else bool(hit),
+            cache_read_input_tokens=cache_read,
+            cache_creation_input_tokens=cache_creation,
+            user=self.users[user] if user != _NONE else None,
+        )
+
+
+def _encode_meta(snapshot: Snapshot, tables: _Tables) -> bytes:
+    meta = {
+        "version": FORMAT_VERSION,
+        "created_ms": now_ms(),
+        "sources": snapshot.sources,
+        "events": snapshot.events,
+        "bucket_ms": BUCKET_MS,
+        "models": tables.models,
+        "projects": tables.projects,
+        "users": tables.users,
+        "buckets": [bucket_row(p) for _, p in sorted(snapshot.buckets.items())],
+        "totals": [total_row(t) for t in snapshot.totals_by_model.values()],
+        "user_totals": [
+            {"user": user, **total_row(t)} for user, totals in snapshot.totals_by_user.items() for t in totals.values()
+        ],
+    }
+    return zlib.compress(json.dumps(meta, separators=(",", ":")).encode("utf-8"))
+
+
+def _decode_meta(data: bytes) -> tuple[Snapshot, _Tables]:
+    meta = json.loads(zlib.decompress(data))
+    snapshot = Snapshot(sources=meta["sources"], events=meta["events"])
+    snapshot.buckets = {row[0]: bucket_from_row(row) for row in meta["buckets"]}
+    snapshot.totals_by_model = {row["model"]: total_from_row(row) for row in meta["totals"]}
+    for row in meta["user_totals"]:
+        row = dict(row)
+        user = row.pop("user")
+        snapshot.totals_by_user.setdefault(user, {})[row["model"]] = total_from_row(row)
+    return snapshot, _Tables(meta["models"], meta["projects"], meta["users"])
+
+
+class SnapshotWriter:
+    """Streams digest-sorted events to ``path``; aggregates are written on ``close``.
+
+    The file is written under a temporary name and renamed into place, so a
+    reader never sees a partial snapshot.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._tmp = path.with_name(path.name + ".tmp")
+        self._f = self._tmp.open("wb")
+        self._f.write(_HEADER.pack(MAGIC, FORMAT_VERSION))
+        self._block: list[bytes] = []
+
+    def add(self, event: Event) -> None:
+        self._block.append(_EVENT.pack(*event))
+        if len(self._block) >= BLOCK_EVENTS:
+            self._flush_block()
+
+    def _flush_block(self) -> None:
+        if not self._block:
+            return
+        data = zlib.compress(b"".join(self._block), _BLOCK_LEVEL)
+        self._f.write(_BLOCK.pack(len(self._block), len(data)))
+        self._f.write(data)
+        self._block = []
+
+    def close(self, snapshot: Snapshot, tables: _Tables) -> None:
+        self._flush_block()
+        meta = _encode_meta(snapshot, tables)
+        offset = self._f.tell()
+        self._f.write(meta)
+        self._f.write(_FOOTER.pack(offset, len(meta), MAGIC))
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        self._f.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class SnapshotReader:
+    """Aggregates of a snapshot file up front, events one block at a time.
+
+    ``events`` reopens the file per block, so hundreds of readers merged at
+    once hold no descriptors and one decompressed block each.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        try:
+            with path.open("rb") as f:
+                magic, version = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != MAGIC:
+                    raise SnapshotError(f"{path} is not a cctv snapshot")
+                if version != FORMAT_VERSION:
+                    raise SnapshotError(f"{path} has snapshot format {version}; this cctv reads {FORMAT_VERSION}")
+                f.seek(-_FOOTER.size, os.SEEK_END)
+                offset, size, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+                if magic != MAGIC:
+                    raise SnapshotError(f"{path} is truncated")
+                f.seek(offset)
+                self.snapshot, self.tables = _decode_meta(f.read(size))
+        except SnapshotError:
+            raise
+        except (OSError, struct.error, zlib.error, ValueError, KeyError) as exc:
+            raise SnapshotError(f"Cannot read snapshot {path}: {exc}") from None
+        self._events_end = offset
+
+    def events(self) -> Iterator[Event]:
+        pos = _HEADER.size
+        while pos < self._events_end:
+            with self.path.open("rb") as f:
+                f.seek(pos)
+                _, size = _BLOCK.unpack(f.read(_BLOCK.size))
+                data = zlib.decompress(f.read(size))
+            pos += _BLOCK.size + size
+            yield from _EVENT.iter_unpack(data)
+
+
+def build_snapshot(
+    files: list[tuple[Path, str | None]],
+    output: Path,
+    pricing: dict[str, dict[str, float]],
+    source: str,
+    since_ms: int | None = None,
+    until_ms: int | None = None,
+    executor: Executor | None = None,
+    archive_cache_dir: Path | None = None,
+) -> Snapshot:
+    """Write a snapshot of the usage in ``files``; returns its aggregates.
+
+    Usage without a per-file user is attributed to ``source``. This machine's
+    events are held in memory to be sorted by digest before writing.
+    """
+    snapshot = Snapshot(sources=[source])
+    tables = _Tables()
+    events: dict[int, Event] = {}
+    skipped = 0
+    mapper = executor.map if executor is not None else map
+    paths = [path for path, _ in files]
+    users = [user for _, user in files]
+    for rows in mapper(
+        parse_file_rows, paths, users, repeat(since_ms), repeat(until_ms), repeat(archive_cache_dir)
+    ):
+        for event_id, ts, model, project, user, input_tokens, output_tokens, cache_read, cache_creation, hit in rows:
+            digest = event_digest(event_id)
+            if digest in events:
+                continue
+            in_rate, out_rate = model_price(pricing, model)
+            cost_micros = round(input_tokens * in_rate + output_tokens * out_rate)
+            counts = (input_tokens, output_tokens, cache_read, cache_creation, cost_micros)
+            if not all(0 <= n <= _U32_MAX for n in counts):
+                # Counts are stored as u32; a negative or huge count is a bad log line.
+                skipped += 1
+                continue
+            usage = RequestUsage(
+                event_id, ts, model, input_tokens, output_tokens, hit, cache_read, cache_creation, user or source
+            )
+            snapshot.add(usage, pricing)
+            events[digest] = (
+                digest,
+                ts,
+                tables.code(tables.models, model),
+                tables.code(tables.projects, project),
+                tables.code(tables.users, usage.user),
+                input_tokens,
+                output_tokens,
+                cache_read,
+                cache_creation,
+                cost_micros,
+                -1 if hit is None else int(hit),
+            )
+    if skipped:
+        log.warning("Skipped %d events with token counts outside 0..%d", skipped, _U32_MAX)
+    writer = SnapshotWriter(output)
+    try:
+        for digest in sorted(events):
+            writer.add(events[digest])
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close(snapshot, tables)
+    return snapshot
+
+
+@dataclass
+class MergeResult:
+    snapshot: Snapshot
+    inputs: int = 0
+    duplicates: int = 0
+
+
+def _remapped(reader: SnapshotReader, tables: _Tables) -> Iterator[Event]:
+    # Rewrites an input's table indexes to the merged tables'.
+    models = [tables.code(tables.models, m) for m in reader.tables.models]
+    projects = [tables.code(tables.projects, p) for p in reader.tables.projects]
+    users = [tables.code(tables.users, u) for u in reader.tables.users]
+    for digest, ts, model, project, user, *rest in reader.events():
+        yield (
+            digest,
+            ts,
+            models[model],
+            projects[project] if project != _NONE else _NONE,
+            users[user] if user != _NONE else _NONE,
+            *rest,
+        )
+
+
+def merge_snapshots(inputs: list[Path], output: Path | None = None) -> MergeResult:
+    """Combine snapshots, counting each event ID once.
+
+    The inputs' aggregates are summed; then their digest-sorted events are
+    k-way merged, and every repeat of a digest has its recorded contribution
+    subtracted. Memory is one block per input plus the aggregates, however
+    many events there are. The result is the same in any grouping or order
+    of inputs.
+    """
+    readers = [SnapshotReader(path) for path in inputs]
+    result = MergeResult(Snapshot(), inputs=len(readers))
+    merged = result.snapshot
+    tables = _Tables()
+    for reader in readers:
+        merged.merge(reader.snapshot)
+    streams = [_remapped(reader, tables) for reader in readers]
+    writer = SnapshotWriter(output) if output is not None else None
+    last = None
+    try:
+        for event in heapq.merge(*streams):
+            if event[0] == last:
+                result.duplicates += 1
+                merged.remove(tables.usage(event), event[9] / 1_000_000)
+                continue
+            last = event[0]
+            if writer is not None:
+                writer.add(event)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        writer.close(merged, tables)
+    return result
+
+
+def format_merge(result: MergeResult) -> str:
+    snapshot = result.snapshot
+    rows = [
+        QueryRow(
+            key=(user, model),
+            requests=total.input_sketch.count,
+            input_tokens=total.input_tokens,
+            output_tokens=total.output_tokens,
+            cost_usd=total.cost_usd,
+        )
+        for user, totals in sorted(snapshot.totals_by_user.items())
+        for model, total in sorted(totals.items())
+        if total.input_sketch.count
+    ]
+    cost = sum(t.cost_usd for t in snapshot.totals_by_model.values())
+    return "\n".join([
+        format_query(["user", "model"], rows),
+        f"{snapshot.events} events from {result.inputs} snapshots ({len(snapshot.sources)} sources), "
+        f"{result.duplicates} duplicates dropped | total cost: ${cost:.4f}",
+    ])
+
+
+def run_snapshot(config: AppConfig, pricing: dict[str, dict[str, float]], roots: list[Path]) -> None:
+    now = now_ms()
+    try:
+        since_ms = parse_time_bound(config.since, now) if config.since else None
+        until_ms = parse_time_bound(config.until, now) if config.until else None
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from None
+    files: list[tuple[Path, str | None]] = []
+    for root in roots:
+        user = root_user(root) if config.all_users else None
+        files.extend((path, user) for path in sorted(scan_usage_files([root])))
+    output = Path(config.export_path or "cctv.snap").expanduser()
+    try:
+        with ProcessPoolExecutor(max_workers=config.scan_workers) as executor:
+            snapshot = build_snapshot(
+                files, output, pricing, default_source(), since_ms, until_ms, executor, default_archive_cache_dir()
+            )
+    except struct.error as exc:
+        raise SystemExit(f"Cannot write snapshot {output}: {exc}") from None
+    print(f"wrote {snapshot.events} events from {len(files)} files to {output}")
+
+
+def run_merge(config: AppConfig) -> None:
+    if not config.inputs:
+        raise SystemExit("cctv merge needs snapshot files, e.g. cctv merge a.snap b.snap")
+    output = Path(config.export_path).expanduser() if config.export_path else None
+    try:
+        result = merge_snapshots([Path(p).expanduser() for p in config.inputs], output)
+    except SnapshotError as exc:
+        raise SystemExit(str(exc)) from None
+    print(format_merge(result))
+    if output is not None:
+        print(f"wrote {output}")
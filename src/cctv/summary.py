@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+from cctv.aggregate.totals import apply_usage_to_totals
+from cctv.config import AppConfig
+from cctv.domain.models import ModelTotal, RequestUsage
+from cctv.ingest.archive import ArchiveReader, is_archive
+from cctv.ingest.dedupe import DedupeCache
+from cctv.ingest.locator import scan_usage_files
+from cctv.ingest.schema import SchemaParser
+from cctv.ingest.time_index import TimeIndexStore
+from cctv.paths import default_archive_cache_dir, default_index_dir
+from cctv.util.time import now_ms
+
+_RELATIVE = re.compile(r"^(\d+)\s*([smhdw])$")
+_UNIT_MS = {"s": 1_000, "m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+
+def parse_time_bound(raw: str, now: int | None = None) -> int:
+    """Parse ``--since``/``--until``: ``30m``/``24h``/``7d``/``2w`` ago, or an ISO date/time.
+
+    Naive ISO values are local time.
+    """
+    s = raw.strip().lower()
+    m = _RELATIVE.match(s)
+    if m:
+        return (now_ms() if now is None else now) - int(m.group(1)) * _UNIT_MS[m.group(2)]
+    try:
+        dt = datetime.fromisoformat(raw.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid time {raw!r}; use e.g. 24h, 7d, 2026-01-31 or 2026-01-31T09:00") from None
+    if dt.tzinfo is None:
+        dt = dt.astimezone()
+    return int(dt.timestamp() * 1000)
+
+
+@dataclass
+class SummaryResult:
+    totals_by_model: dict[str, ModelTotal]
+    files_total: int = 0
+    files_skipped: int = 0
+    bytes_total: int = 0
+    bytes_read: int = 0
+
+
+def read_line_chunks(
+    path: Path, start: int, end: int, chunk_bytes: int = 4 * 1024 * 1024
+) -> Iterator[tuple[int, int, list[str]]]:
+    """Yield ``(chunk_start, chunk_end, lines)`` for the whole lines in ``[start, end)``.
+
+    The file is reopened per chunk, so a paused consumer holds no descriptor.
+    """
+    pos = start
+    while pos < end:
+        with path.open("rb") as f:
+            f.seek(pos)
+            data = f.read(min(chunk_bytes, end - pos))
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                if len(data) < chunk_bytes:
+                    # Unterminated last line; a writer may still be on it.
+                    return
+                data += f.readline()
+                cut = data.rfind(b"\n") + 1
+                if cut == 0:
+                    return
+        text = data[:cut].decode("utf-8", errors="replace")
+        yield pos, pos + cut, [line for line in text.splitlines() if line.strip()]
+        pos += cut
+
+
+def summarize(
+    roots: list[Path],
+    pricing: dict[str, dict[str, float]],
+    since_ms: int | None,
+    until_ms: int | None,
+    index: TimeIndexStore | None = None,
+    archives: ArchiveReader | None = None,
+) -> SummaryResult:
+    """Totals of usage timestamped in ``[since_ms, until_ms)``.
+
+    Indexed files are skipped or read only in the blocks that can match;
+    bytes past the index are read in full and added to it. Archives come
+    from ``archives``' content-hash cache when known.
+    """
+    result = SummaryResult(totals_by_model={})
+    if archives is None:
+        archives = ArchiveReader()
+    parser = SchemaParser()
+    dedupe = DedupeCache()
+    sizes = scan_usage_files(roots)
+    result.files_total = len(sizes)
+
+    def consume(usages: list[RequestUsage]) -> None:
+        for usage in usages:
+            if since_ms is not None and usage.timestamp_ms < since_ms:
+                continue
+            if until_ms is not None and usage.timestamp_ms >= until_ms:
+                continue
+            if dedupe.add_if_new(usage.event_id):
+                apply_usage_to_totals(result.totals_by_model, usage, pricing)
+
+    for path, size in sorted(sizes.items()):
+        result.bytes_total += size
+        if is_archive(path):
+            before = archives.decompressed_bytes
+            consume(archives.usages(path))
+            result.bytes_read += archives.decompressed_bytes - before
+            continue
+        file_index = index.get(path) if index is not None else None
+        indexed_end = file_index.end if file_index is not None else 0
+        ranges = file_index.ranges(since_ms, until_ms) if file_index is not None else []
+        if not ranges and indexed_end >= size:
+            result.files_skipped += 1
+            continue
+        try:
+            for start, end in ranges:
+                for chunk_start, chunk_end, lines in read_line_chunks(path, start, end):
+                    result.bytes_read += chunk_end - chunk_start
+                    consume(parser.parse_lines(path, lines))
+            for chunk_start, chunk_end, lines in read_line_chunks(path, indexed_end, size):
+                result.bytes_read += chunk_end - chunk_start
+                usages = parser.parse_lines(path, lines)
+                if index is not None:
+                    index.record(path, chunk_start, chunk_end, (u.timestamp_ms for u in usages))
+                consume(usages)
+        except OSError:
+            continue
+    if index is not None:
+        index.flush()
+    return result
+
+
+def format_summary(result: SummaryResult, since_ms: int | None, until_ms: int | None) -> str:
+    def fmt(ts: int | None) -> str:
+        if ts is None:
+            return "-"
+        return datetime.fromtimestamp(ts / 1000, tz=timezone.utc).astimezone().strftime("%Y-%m-%d %H:%M")
+
+    lines = [f"Usage {fmt(since_ms)} → {fmt(until_ms)}"]
+    if not result.totals_by_model:
+        lines.append("No usage in range")
+    for model, total in sorted(result.totals_by_model.items()):
+        lines.append(
+            f"{model} | requests: {total.input_sketch.count} | input tokens: {total.input_tokens} | "
+            f"output tokens: {total.output_tokens} | cost: ${total.cost_usd:.4f}"
+        )
+    if len(result.totals_by_model) > 1:
+        cost = sum(t.cost_usd for t in result.totals_by_model.values())
+        lines.append(f"total cost: ${cost:.4f}")
+    lines.append(
+        f"scanned {result.files_total} files ({result.files_skipped} skipped by index), "
+        f"read {result.bytes_read / 1_048_576:.1f} of {result.bytes_total / 1_048_576:.1f} MB"
+    )
+    return "\n".join(lines)
+
+
+def run_summary(config: AppConfig, pricing: dict[str, dict[str, float]], roots: list[Path]) -> None:
+    now = now_ms()
+    try:
+        since_ms = parse_time_bound(config.since, now) if config.since else None
+        until_ms = parse_time_bound(config.until, now) if config.until else None
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from None
+    index = None
+    if config.time_index:
+        index = TimeIndexStore(Path(config.index_dir).expanduser() if config.index_dir else default_index_dir())
+    result = summarize(roots, pricing, since_ms, until_ms, index, ArchiveReader(default_archive_cache_dir()))
+    print(format_summary(result, since_ms, until_ms))
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import threading
 from collections import deque
 from dataclasses import replace
+from datetime import datetime
 from pathlib import Path
 
 from textual.app import App, ComposeResult
@@ -10,18 +12,24 @@ from textual.events import Resize
 from textual.timer import Timer
 from textual.widgets import Static
 
-from cctv.aggregate.bucketer import empty_buckets
+from cctv.aggregate.bucketer import window_sketches
 from cctv.config import AppConfig
-from cctv.domain.state import StateStore
-from cctv.ingest.dedupe import DedupeCache
-from cctv.ingest.locator import find_usage_files
-from cctv.ingest.parser import parse_usage_line
-from cctv.ingest.tailer import JsonlTailer
-from cctv.monitor.scheduler import DebouncedRunner
-from cctv.monitor.watcher import UsageWatcher
-from cctv.tui.render import render_histogram_grid
-from cctv.tui.widgets import HintsWidget, HistogramWidget, NavWidget, StatusLineWidget
-from cctv.util.time import floor_to_bucket_ms, now_ms
+from cctv.domain.models import BucketPoint, StateSnapshot
+from cctv.domain.state import next_scale
+from cctv.ingest.pipeline import UsagePipeline
+from cctv.replay import ReplaySource
+from cctv.server.daemon import DaemonClient
+from cctv.tui.render import format_percentiles
+from cctv.tui.widgets import (
+    DebugWidget,
+    HintsWidget,
+    HistogramWidget,
+    NavWidget,
+    PercentilesWidget,
+    StatusLineWidget,
+)
+from cctv.util.profiling import PhaseTimer
+from cctv.util.time import now_ms
 
 
 class CctvApp(App):
@@ -30,6 +38,8 @@ class CctvApp(App):
     #top { height: 3fr; }
     #bottom { height: 3fr; }
     #status { height: auto; min-height: 1; }
+    #pct { height: auto; min-height: 1; }
+    #debug { height: auto; min-height: 1; display: none; color: $warning; }
     #nav { height: 2fr; min-height: 5; border: round green; }
     #hints { height: 1; color: $text-muted; }
     """
@@ -38,10 +48,34 @@ class CctvApp(App):
         ("up", "nav_up", "Move Up"),
         ("down", "nav_down", "Move Down"),
         ("enter", "nav_select", "Select"),
+        ("d", "toggle_debug", "Debug"),
         ("q", "quit", "Quit"),
     ]
 
-    def __init__(self, config: AppConfig, pricing: dict[str, dict[str, float]], roots: list[Path]) -> None:
+    PERCENTILES = (0.5, 0.95, 0.99)
+    USER_ROWS = 10
+    TICK_PHASES = ("discover", "tail", "parse", "aggregate", "archive", "db", "render")
+    # Time ranges for the filter; "live" is the rolling window of refresh-sized buckets.
+    RANGES = (
+        ("live", None),
+        ("15m", 900_000),
+        ("1h", 3_600_000),
+        ("2h", 7_200_000),
+        ("6h", 21_600_000),
+        ("24h", 86_400_000),
+    )
+    # Startup backfill runs in short frames between refreshes, so keys and
+    # redraws are handled while history is still being read.
+    BACKFILL_FRAME_MS = 25
+    BACKFILL_FRAME_GAP_S = 0.01
+
+    def __init__(
+        self,
+        config: AppConfig,
+        pricing: dict[str, dict[str, float]],
+        roots: list[Path],
+        pipeline: UsagePipeline | DaemonClient | ReplaySource | None = None,
+    ) -> None:
         super().__init__()
         # Use replace() to avoid mutating the caller's config object.
         self.config = replace(
@@ -50,63 +84,116 @@ class CctvApp(App):
         )
         self.pricing = pricing
         self.roots = roots
-        now_bucket = floor_to_bucket_ms(now_ms(), self.config.bucket_seconds)
-        buckets = empty_buckets(self.config.window_size, now_bucket, self.config.bucket_seconds)
-        self.store = StateStore(window_size=self.config.window_size)
-        self.store.state.buckets = buckets
-        self.dedupe = DedupeCache()
-        self.tailer = JsonlTailer()
-        self.scheduler = DebouncedRunner(self.config.debounce_ms)
+        # An attached daemon client stands in for the local pipeline.
+        if pipeline is None:
+            perf = PhaseTimer(enabled=bool(self.config.profile_path))
+            pipeline = UsagePipeline(self.config, pricing, roots, perf=perf)
+        self.pipeline = pipeline
+        self.perf = pipeline.perf
+        self.store = self.pipeline.store
+        self.show_debug = False
         self.refresh_options = deque([1.0, 10.0, 60.0])
-        # _known_files: all discovered .jsonl paths.
-        # _pending_files: files flagged by watchdog since last tick.
-        self._known_files: set[Path] = set()
-        self._pending_files: set[Path] = set()
-        self.watcher = UsageWatcher(roots, self._on_file_changed)
         self._timer: Timer | None = None
         self.nav_selected_idx = 0
-        self._last_file_scan_ms = 0
-        self._file_scan_interval_ms = 30_000  # full rescan every 30s
-
-    def _on_file_changed(self, path: Path) -> None:
-        self._known_files.add(path)
-        self._pending_files.add(path)
-        self.scheduler.mark_dirty()
+        self._rendered_version = -1
+        self._resize_pending = False
+        self._backfill_timer: Timer | None = None
+        # The pipeline starts on a worker thread; whichever of it and
+        # on_unmount comes second stops the pipeline.
+        self._start_lock = threading.Lock()
+        self._started = False
+        self._closing = False
+        # A daemon client only mirrors the window: the daemon sets the bucket
+        # width and there are no indexes to filter.
+        self.attached = isinstance(pipeline, DaemonClient)
+        self.filterable = not self.attached
+        self.filter_model: str | None = None
+        self.filter_project: str | None = None
+        self.filter_range = 0
 
     def compose(self) -> ComposeResult:
         with Vertical():
             yield HistogramWidget("Input tokens / bucket", id="top")
             yield HistogramWidget("Output tokens / bucket", id="bottom")
             yield StatusLineWidget(id="status")
+            yield PercentilesWidget(id="pct")
+            yield DebugWidget(id="debug")
             yield NavWidget(id="nav")
             yield HintsWidget(id="hints")
 
     def on_mount(self) -> None:
-        # One-time full scan; watchdog events keep the set up-to-date after this.
-        discovered = set(find_usage_files(self.roots))
-        self._known_files = discovered
-        self._pending_files = discovered.copy()
-        self._last_file_scan_ms = now_ms()
-        self.watcher.start()
+        # Paint the empty frame first; the startup scan runs once it is on screen.
+        self._render_all()
+        self.call_after_refresh(self._start_pipeline)
+
+    def _start_pipeline(self) -> None:
+        # The startup scan walks every log directory, so it runs off the UI thread.
+        self.run_worker(self._start_in_thread, name="start pipeline", thread=True)
+
+    def _start_in_thread(self) -> None:
+        self.pipeline.start()
+        with self._start_lock:
+            if self._closing:
+                self.pipeline.stop()
+                return
+            self._started = True
+        try:
+            self.call_from_thread(self._pipeline_started)
+        except RuntimeError:
+            pass  # the app closed in the meantime; on_unmount stopped the pipeline
+
+    def _pipeline_started(self) -> None:
         self._timer = self.set_interval(self.config.refresh_seconds, self._tick)
+        self._schedule_backfill()
         self._render_all()
 
     def on_unmount(self) -> None:
-        self.watcher.stop()
+        if self._backfill_timer is not None:
+            self._backfill_timer.stop()
+        with self._start_lock:
+            self._closing = True
+            started = self._started
+        if started:
+            self.pipeline.stop()
+
+    def _backfilling(self) -> bool:
+        # Only the local pipeline backfills; a daemon or replay has no progress to show.
+        backfill = getattr(self.pipeline, "backfill", None)
+        return backfill is not None and backfill.active
+
+    def _schedule_backfill(self) -> None:
+        if self._backfill_timer is None and self._backfilling():
+            self._backfill_timer = self.set_timer(self.BACKFILL_FRAME_GAP_S, self._backfill_frame)
+
+    def _backfill_frame(self) -> None:
+        self._backfill_timer = None
+        self.pipeline.tick(read_budget_ms=self.BACKFILL_FRAME_MS)
+        t = self.perf.start()
+        self._render_all()
+        self.perf.stop("render", t)
+        self._schedule_backfill()
 
     def on_resize(self, _: Resize) -> None:
+        # A drag produces a storm of Resize events; render once after the next refresh.
+        if not self._resize_pending:
+            self._resize_pending = True
+            self.call_after_refresh(self._flush_resize)
+
+    def _flush_resize(self) -> None:
+        self._resize_pending = False
         self._render_all()
 
     def action_cycle_refresh(self) -> None:
+        if self.attached:
+            return
         self.refresh_options.rotate(-1)
         self.config.refresh_seconds = self.refresh_options[0]
         self.config.bucket_seconds = max(1, int(round(self.config.refresh_seconds)))
         if self._timer is not None:
+            # Until the pipeline has started, _pipeline_started sets the timer.
             self._timer.stop()
-        self._timer = self.set_interval(self.config.refresh_seconds, self._tick)
-        now_bucket = floor_to_bucket_ms(now_ms(), self.config.bucket_seconds)
-        self.store.state.buckets = empty_buckets(self.config.window_size, now_bucket, self.config.bucket_seconds)
-        self.scheduler.mark_dirty()
+            self._timer = self.set_interval(self.config.refresh_seconds, self._tick)
+        self.pipeline.reset_buckets()
 
     def action_toggle_totals(self) -> None:
         self.config.show_totals = not self.config.show_totals
@@ -116,84 +203,100 @@ class CctvApp(App):
         self.config.show_cache_hit = not self.config.show_cache_hit
         self._render_all()
 
+    def action_toggle_percentiles(self) -> None:
+        self.config.show_percentiles = not self.config.show_percentiles
+        self._render_all()
+
+    def action_cycle_model(self) -> None:
+        self.filter_model = self._next_option(self.filter_model, self.store.history.models())
+
+    def action_cycle_project(self) -> None:
+        self.filter_project = self._next_option(self.filter_project, self.store.history.projects())
+
+    def action_cycle_range(self) -> None:
+        self.filter_range = (self.filter_range + 1) % len(self.RANGES)
+
+    @staticmethod
+    def _next_option(current: str | None, options: list[str]) -> str | None:
+        # Cycles all → each value in turn → all.
+        choices: list[str | None] = [None, *options]
+        idx = choices.index(current) if current in choices else 0
+        return choices[(idx + 1) % len(choices)]
+
+    def action_toggle_debug(self) -> None:
+        self.show_debug = not self.show_debug
+        # Timers only run while someone is looking at them (or --profile is set).
+        instrumented = self.show_debug or bool(self.config.profile_path)
+        self.pipeline.set_instrumented(instrumented)
+        self.query_one("#debug", DebugWidget).display = self.show_debug
+        self._render_all()
+
+    def _nav_items(self) -> list[tuple[str, str]]:
+        if self.attached:
+            refresh = f"bucket: {self.config.bucket_seconds}s (set by daemon)"
+        else:
+            refresh = f"refresh interval: {self.config.refresh_seconds:g}s"
+        items = [
+            (refresh, "cycle_refresh"),
+            (f"totals: {'ON' if self.config.show_totals else 'OFF'}", "toggle_totals"),
+            (f"cache-hit: {'ON' if self.config.show_cache_hit else 'OFF'}", "toggle_cache"),
+            (f"percentiles: {'ON' if self.config.show_percentiles else 'OFF'}", "toggle_percentiles"),
+        ]
+        if self.filterable:
+            items += [
+                (f"model: {self.filter_model or 'all'}", "cycle_model"),
+                (f"project: {self.filter_project or 'all'}", "cycle_project"),
+                (f"range: {self.RANGES[self.filter_range][0]}", "cycle_range"),
+            ]
+        return items
+
     def action_nav_up(self) -> None:
-        self.nav_selected_idx = (self.nav_selected_idx - 1) % 3
+        self.nav_selected_idx = (self.nav_selected_idx - 1) % len(self._nav_items())
         self._render_all()
 
     def action_nav_down(self) -> None:
-        self.nav_selected_idx = (self.nav_selected_idx + 1) % 3
+        self.nav_selected_idx = (self.nav_selected_idx + 1) % len(self._nav_items())
         self._render_all()
 
     def action_nav_select(self) -> None:
-        if self.nav_selected_idx == 0:
-            self.action_cycle_refresh()
-        elif self.nav_selected_idx == 1:
-            self.action_toggle_totals()
-        else:
-            self.action_toggle_cache()
+        _, action = self._nav_items()[self.nav_selected_idx]
+        getattr(self, f"action_{action}")()
         self._render_all()
 
     def _tick(self) -> None:
-        now = now_ms()
-
-        # Periodic full rescan to discover files created before the watcher started
-        # or missed due to timing. Much less frequent now that watchdog tracks changes.
-        if (now - self._last_file_scan_ms) >= self._file_scan_interval_ms:
-            rescanned = set(find_usage_files(self.roots))
-            newly_found = rescanned - self._known_files
-            self._known_files = rescanned
-            self._pending_files.update(newly_found)
-            self._last_file_scan_ms = now
-
-        # Only clear dirty flag when it actually triggered the scan.
-        if self.scheduler.should_run():
-            self.scheduler.mark_clean()
-
-        self.store.advance_time(now, self.config.bucket_seconds)
-
-        # Drain pending files flagged by watchdog (or initial full scan).
-        to_read = self._pending_files
-        self._pending_files = set()
-        for path in to_read:
-            for line in self.tailer.read_new_lines(path):
-                usage = parse_usage_line(line)
-                if usage is None:
-                    continue
-                if not self.dedupe.add_if_new(usage.event_id):
-                    continue
-                self.store.apply_usage(usage, self.config.bucket_seconds, self.pricing)
-
-        self.store.maybe_rescale()
-        self._render_all()
+        self.pipeline.tick()
+        if self.attached and self.pipeline.bucket_seconds not in (None, self.config.bucket_seconds):
+            self.config.bucket_seconds = self.pipeline.bucket_seconds
+            self._render_all()
+        t = self.perf.start()
+        self._render_all(force=False)
+        self.perf.stop("render", t)
 
-    def _render_all(self) -> None:
+    def _render_all(self, force: bool = True) -> None:
+        # Everything below reads one immutable snapshot, never the live state.
+        snap = self.store.snapshot
+        if not force and snap.version == self._rendered_version and not self.show_debug:
+            return
+        self._rendered_version = snap.version
         top = self.query_one("#top", HistogramWidget)
         bottom = self.query_one("#bottom", HistogramWidget)
         status = self.query_one("#status", Static)
         nav = self.query_one("#nav", NavWidget)
 
-        input_scale = max(1, self.store.state.scale_input_max)
-        output_scale = max(1, self.store.state.scale_output_max)
-        top_body = render_histogram_grid(
-            self.store.state.buckets,
-            input_scale,
-            mode="input",
-            width=max(1, top.size.width),
-            height=max(1, top.size.height - 1),
-        )
-        bottom_body = render_histogram_grid(
-            self.store.state.buckets,
-            output_scale,
-            mode="output",
-            width=max(1, bottom.size.width),
-            height=max(1, bottom.size.height - 1),
-        )
-        top.set_content(top_body, input_scale)
-        bottom.set_content(bottom_body, output_scale)
+        filtered = self._filtered_buckets(snap)
+        if filtered is None:
+            top.title, bottom.title = "Input tokens / bucket", "Output tokens / bucket"
+            top.set_data(snap.buckets, max(1, snap.scale_input_max), mode="input")
+            bottom.set_data(snap.buckets, max(1, snap.scale_output_max), mode="output")
+        else:
+            label = self._filter_label()
+            top.title, bottom.title = f"Input tokens / bucket [{label}]", f"Output tokens / bucket [{label}]"
+            top.set_data(filtered, next_scale(max((b.input_tokens for b in filtered), default=0)), mode="input")
+            bottom.set_data(filtered, next_scale(max((b.output_tokens for b in filtered), default=0)), mode="output")
 
         if self.config.show_totals:
-            lines: list[str] = ["Cumulative totals (session):"]
-            for model, total in sorted(self.store.state.totals_by_model.items()):
+            lines: list[str] = [f"Cumulative totals ({self.pipeline.label}):"]
+            for model, total in sorted(snap.totals_by_model.items()):
                 part = (
                     f"{model} | input tokens: {total.input_tokens} | "
                     f"output tokens: {total.output_tokens} | cost: ${total.cost_usd:.4f}"
@@ -211,19 +314,36 @@ class CctvApp(App):
                     )
                     part += f" | req cache hit: {req_cache} | cumulative cache hit: {cum_cache}"
                 lines.append(self._fit_line(part, max(1, status.size.width)))
+            lines.extend(self._fit_line(line, max(1, status.size.width)) for line in self._user_lines(snap))
             if len(lines) == 1:
                 lines = ["No usage yet"]
+            for notice in (self._progress_line(), self._alert_line()):
+                if notice:
+                    lines.insert(0, self._fit_line(notice, max(1, status.size.width)))
             status.styles.height = len(lines)
             status.update("\n".join(lines))
         else:
             status.styles.height = 1
-            status.update("Totals hidden")
+            status.update(self._alert_line() or self._progress_line() or "Totals hidden")
 
-        nav_options = [
-            f"refresh interval: {self.config.refresh_seconds:g}s",
-            f"totals: {'ON' if self.config.show_totals else 'OFF'}",
-            f"cache-hit: {'ON' if self.config.show_cache_hit else 'OFF'}",
-        ]
+        pct = self.query_one("#pct", PercentilesWidget)
+        if self.config.show_percentiles:
+            pct_lines = [
+                self._fit_line(line, max(1, pct.size.width)) for line in self._percentile_lines(snap)
+            ]
+            pct.display = True
+            pct.styles.height = len(pct_lines)
+            pct.update("\n".join(pct_lines))
+        else:
+            pct.display = False
+
+        if self.show_debug:
+            debug = self.query_one("#debug", DebugWidget)
+            debug_lines = [self._fit_line(line, max(1, debug.size.width)) for line in self._debug_lines()]
+            debug.styles.height = len(debug_lines)
+            debug.update("\n".join(debug_lines))
+
+        nav_options = [label for label, _ in self._nav_items()]
         nav_width = nav.size.width - 2
         if nav_width < 10:
             nav_width = max(10, self.size.width - 4)
@@ -233,6 +353,88 @@ class CctvApp(App):
             width=nav_width,
         )
 
+    def _filtered_buckets(self, snap: StateSnapshot) -> list[BucketPoint] | None:
+        """Buckets for the active filter from the store's indexes; None when unfiltered."""
+        range_ms = self.RANGES[self.filter_range][1]
+        if self.filter_model is None and self.filter_project is None and range_ms is None:
+            return None
+        # The pipeline ticks on this thread, so the live indexes are safe to read here.
+        # Replay runs on its own clock; the newest live bucket tracks whichever applies.
+        now = snap.buckets[-1].start_ms if snap.buckets else now_ms()
+        return self.store.filtered_buckets(self.filter_model, self.filter_project, range_ms, now)
+
+    def _filter_label(self) -> str:
+        parts = [self.filter_model or "all models", self.filter_project or "all projects"]
+        range_label, range_ms = self.RANGES[self.filter_range]
+        parts.append(range_label if range_ms is None else f"last {range_label}")
+        return ", ".join(parts)
+
+    def _progress_line(self) -> str | None:
+        if not self._started:
+            return "Scanning for session logs..." if isinstance(self.pipeline, UsagePipeline) else None
+        if not self._backfilling():
+            return None
+        return f"Backfilling history: {self.pipeline.backfill.describe()}"
+
+    def _alert_line(self) -> str | None:
+        # A daemon client has no alerts of its own; the daemon logs them.
+        alerts = getattr(self.pipeline, "alerts", None)
+        alert = alerts.latest if alerts is not None else None
+        if alert is None or now_ms() - alert.timestamp_ms > self.config.alert_cooldown_seconds * 1000:
+            return None
+        at = datetime.fromtimestamp(alert.timestamp_ms / 1000).strftime("%H:%M")
+        return f"ALERT {at} {alert.message}"
+
+    def _user_lines(self, snap: StateSnapshot) -> list[str]:
+        if not snap.totals_by_user:
+            return []
+        rows = []
+        for user, partition in snap.totals_by_user.items():
+            totals = partition.values()
+            rows.append((
+                sum(t.cost_usd for t in totals),
+                user,
+                sum(t.input_sketch.count for t in totals),
+                sum(t.input_tokens for t in totals),
+                sum(t.output_tokens for t in totals),
+            ))
+        rows.sort(reverse=True)
+        lines = [f"By user ({len(rows)} users, top {min(len(rows), self.USER_ROWS)} by cost):"]
+        for cost, user, requests, input_tokens, output_tokens in rows[: self.USER_ROWS]:
+            lines.append(
+                f"{user} | requests: {requests} | input tokens: {input_tokens} | "
+                f"output tokens: {output_tokens} | cost: ${cost:.4f}"
+            )
+        return lines
+
+    def _percentile_lines(self, snap: StateSnapshot) -> list[str]:
+        window_in, window_out = window_sketches(snap.buckets)
+        if window_in.count == 0 and not snap.totals_by_model:
+            return ["No requests yet"]
+        lines = [
+            "Tokens per request p50 / p95 / p99:",
+            f"window ({window_in.count} req) | input: {format_percentiles(window_in.quantiles(self.PERCENTILES))} | "
+            f"output: {format_percentiles(window_out.quantiles(self.PERCENTILES))}",
+        ]
+        for model, total in sorted(snap.totals_by_model.items()):
+            lines.append(
+                f"{model} | input: {format_percentiles(total.input_sketch.quantiles(self.PERCENTILES))} | "
+                f"output: {format_percentiles(total.output_sketch.quantiles(self.PERCENTILES))}"
+            )
+        return lines
+
+    def _debug_lines(self) -> list[str]:
+        perf = self.perf
+        last = " | ".join(f"{p} {perf.previous_ns.get(p, 0) / 1e6:.2f}ms" for p in self.TICK_PHASES)
+        mean = " | ".join(f"{p} {perf.mean_ms(p):.2f}ms" for p in self.TICK_PHASES)
+        source, *details = self.pipeline.debug_lines()
+        return [
+            f"debug: tick #{perf.ticks} | {source}",
+            f"last tick: {last}",
+            f"mean tick: {mean}",
+            *details,
+        ]
+
     @staticmethod
     def _fit_line(text: str, width: int) -> str:
         if width <= 0:
@@ -8,6 +8,7 @@ from cctv.util.math import nice_step
 
 FULL = "█"
 GRID = "┈"
+LABEL_WIDTH = 8
 
 
 def _pick_values(buckets: Sequence[BucketPoint], mode: str) -> list[int]:
@@ -47,6 +48,10 @@ def _format_tokens(value: int) -> str:
     return str(value)
 
 
+def format_percentiles(values: Sequence[float | None]) -> str:
+    return " / ".join("-" if v is None else _format_tokens(int(round(v))) for v in values)
+
+
 def _build_ticks(scale_max: int) -> list[int]:
     if scale_max <= 100:
         step = 10
@@ -79,25 +84,17 @@ def _build_uniform_tick_rows(height: int, scale_max: int) -> dict[int, int]:
     return out
 
 
-def render_histogram_grid(
+def histogram_columns(
     buckets: Iterable[BucketPoint],
     scale_max: int,
     mode: str,
-    width: int,
+    graph_width: int,
     height: int,
-) -> str:
-    if width <= 0 or height <= 0:
-        return ""
-    bucket_list = list(buckets)
-    values = _pick_values(bucket_list, mode)
+) -> list[int]:
+    """Bar height in rows for each of the ``graph_width`` columns."""
+    values = _pick_values(list(buckets), mode)
     if scale_max <= 0:
         scale_max = 1
-
-    # 8 chars label + separator + graph area
-    label_width = 8
-    if width <= label_width + 1:
-        return ""
-    graph_width = width - label_width - 1
     columns = _downsample(values, graph_width)
     # Keep bars proportional to current y-scale and panel height.
     # Using floor-like conversion avoids sticky 1-row bars after rescaling.
@@ -107,9 +104,11 @@ def render_histogram_grid(
         if v > 0 and h == 0:
             h = 1
         bar_heights.append(h)
+    return bar_heights
 
-    row_labels = _build_uniform_tick_rows(height, scale_max)
 
+def histogram_rows(bar_heights: Sequence[int], scale_max: int, height: int, label_width: int = LABEL_WIDTH) -> list[str]:
+    row_labels = _build_uniform_tick_rows(height, max(1, scale_max))
     rows: list[str] = []
     for r in range(height):
         threshold = height - r
@@ -120,4 +119,24 @@ def render_histogram_grid(
         fill_char = GRID if is_major else " "
         line = "".join(FULL if h >= threshold else fill_char for h in bar_heights)
         rows.append(f"{label}│{line}")
-    return "\n".join(rows)
+    return rows
+
+
+def render_histogram_grid(
+    buckets: Iterable[BucketPoint],
+    scale_max: int,
+    mode: str,
+    width: int,
+    height: int,
+) -> str:
+    if width <= 0 or height <= 0:
+        return ""
+    if scale_max <= 0:
+        scale_max = 1
+
+    # 8 chars label + separator + graph area
+    if width <= LABEL_WIDTH + 1:
+        return ""
+    graph_width = width - LABEL_WIDTH - 1
+    bar_heights = histogram_columns(buckets, scale_max, mode, graph_width, height)
+    return "\n".join(histogram_rows(bar_heights, scale_max, height))
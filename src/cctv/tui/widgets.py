@@ -1,22 +1,105 @@
 from __future__ import annotations
 
+from itertools import zip_longest
+from typing import Iterable
+
+from rich.segment import Segment
 from rich.text import Text
+from textual.cache import LRUCache
+from textual.events import Resize
+from textual.geometry import Region
+from textual.strip import Strip
+from textual.widget import Widget
 from textual.widgets import Static
 
+from cctv.domain.models import BucketPoint
+from cctv.tui.render import LABEL_WIDTH, histogram_columns, histogram_rows
+
+
+class HistogramWidget(Widget):
+    """Histogram drawn line by line through the Line API.
+
+    ``set_data`` recomputes the column heights and only repaints rows whose
+    text changed; row strips are cached by text, so unchanged rows cost a
+    dict lookup per frame.
+    """
 
-class HistogramWidget(Static):
     def __init__(self, title: str, **kwargs) -> None:
-        super().__init__("", **kwargs)
+        super().__init__(**kwargs)
         self.title = title
+        self._rows: list[str] = []
+        self._frame_key: tuple | None = None
+        self._strips: LRUCache[str, Strip] = LRUCache(maxsize=256)
+        self._data: tuple[Iterable[BucketPoint], int, str] | None = None
+        self._resize_pending = False
+
+    def notify_style_update(self) -> None:
+        # Strips hold resolved styles; a theme or CSS change must rebuild them.
+        super().notify_style_update()
+        self._strips.clear()
+        self.refresh()
+
+    def on_resize(self, _: Resize) -> None:
+        # Resize events arrive after layout; redraw once per frame from the last data.
+        if not self._resize_pending:
+            self._resize_pending = True
+            self.call_after_refresh(self._flush_resize)
+
+    def _flush_resize(self) -> None:
+        self._resize_pending = False
+        if self._data is not None:
+            self.set_data(*self._data)
+
+    def set_data(self, buckets: Iterable[BucketPoint], scale_max: int, mode: str) -> None:
+        self._data = (buckets, scale_max, mode)
+        width = self.size.width
+        height = max(1, self.size.height - 1)
+        graph_width = max(0, width - LABEL_WIDTH - 1)
+        bar_heights = histogram_columns(buckets, scale_max, mode, graph_width, height)
+        frame_key = (scale_max, width, height, tuple(bar_heights), self.title)
+        if frame_key == self._frame_key:
+            return
+        resized = self._frame_key is None or self._frame_key[1:3] != (width, height)
+        self._frame_key = frame_key
 
-    def set_content(self, body: str, scale_max: int) -> None:
-        self.update(f"{self.title}  (y-max: {scale_max})\n{body}")
+        rows = [f"{self.title}  (y-max: {scale_max})"]
+        if graph_width > 0:
+            rows.extend(histogram_rows(bar_heights, scale_max, height))
+        old_rows = self._rows
+        self._rows = rows
+        if resized:
+            self.refresh()
+            return
+        changed = [
+            Region(0, y, width, 1) for y, (old, new) in enumerate(zip_longest(old_rows, rows)) if old != new
+        ]
+        if changed:
+            self.refresh(*changed)
+
+    def render_line(self, y: int) -> Strip:
+        width = self.size.width
+        if y >= len(self._rows):
+            return Strip.blank(width, self.rich_style)
+        text = self._rows[y]
+        strip = self._strips.get(text)
+        if strip is None:
+            strip = Strip([Segment(text, self.rich_style)])
+            self._strips[text] = strip
+        return strip.adjust_cell_length(width, self.rich_style)
 
 
 class StatusLineWidget(Static):
     pass
 
 
+class PercentilesWidget(Static):
+    pass
+
+
+class DebugWidget(Static):
+    pass
+
+
 class NavWidget(Static):
     def set_options(self, options: list[str], selected: int, width: int) -> None:
         text = Text()
@@ -36,7 +119,7 @@ class NavWidget(Static):
 
 
 class HintsWidget(Static):
-    HINTS = "  q  quit   ↑/↓  navigate   Enter  select"
+    HINTS = "  q  quit   ↑/↓  navigate   Enter  select   d  debug"
 
     def on_mount(self) -> None:
         self.update(self.HINTS)
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+import hashlib
+
+
+def digest64(data: bytes) -> int:
+    """Stable 64-bit digest of ``data``, the same in every process and on every machine.
+
+    Built-in ``hash`` is salted per process, and the standard library has no
+    other 64-bit hash; on the few dozen bytes this is used for, BLAKE2b costs
+    about as much as the call itself.
+    """
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass
+from typing import Callable
+
+log = logging.getLogger(__name__)
+
+# Rough per-entry footprints used for accounting: CPython objects plus their
+# container slots, from tracemalloc on a 64-bit build. A path is a log file
+# Path keying a dict; an ID is a UUID's hash in a set and a deque; a series
+# entry is an int bucket start keying a three-int list.
+PATH_ENTRY_BYTES = 410
+ID_ENTRY_BYTES = 85
+USAGE_ENTRY_BYTES = 260
+SERIES_ENTRY_BYTES = 230
+
+_SIZE = re.compile(r"^(\d+(?:\.\d+)?)\s*([kmg]?)i?b?$")
+_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+
+
+def parse_size(raw: str) -> int:
+    """Parse ``64MB``, ``512k``, ``1.5GiB`` or plain bytes."""
+    m = _SIZE.match(raw.strip().lower())
+    if m is None:
+        raise ValueError(f"Invalid size {raw!r}; use e.g. 64MB or 1GB")
+    return int(float(m.group(1)) * _SIZE_UNITS[m.group(2)])
+
+
+def rss_bytes() -> int | None:
+    """Current resident set size, or None where it cannot be read cheaply."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        return None
+    # Peak rather than current outside Linux; kilobytes on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class MemoryComponent:
+    name: str
+    # Returns (entries, approximate bytes).
+    usage: Callable[[], tuple[int, int]]
+    # Frees about ``fraction`` of the component; returns approximate bytes freed.
+    shed: Callable[[float], int] | None
+    priority: int
+
+
+class MemoryGovernor:
+    """Central memory budget for the caches that grow with uptime.
+
+    Components register an accounting callback and, if they can give memory
+    back, a shed callback. ``check`` compares RSS (or, where RSS is not
+    available, the accounted total) with the budget and sheds components in
+    ascending ``priority`` until the overshoot is covered, so cheap-to-rebuild
+    caches go before state whose loss costs accuracy.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int | None,
+        interval_ms: int = 5_000,
+        rss: Callable[[], int | None] = rss_bytes,
+    ) -> None:
+        self.budget_bytes = budget_bytes
+        self.interval_ms = interval_ms
+        self._rss = rss
+        self._components: list[MemoryComponent] = []
+        self._last_check_ms: int | None = None
+        self.last_rss: int | None = None
+        self.sheds = 0
+        self.shed_bytes = 0
+
+    def register(
+        self,
+        name: str,
+        usage: Callable[[], tuple[int, int]],
+        shed: Callable[[float], int] | None = None,
+        priority: int = 50,
+    ) -> None:
+        self._components.append(MemoryComponent(name, usage, shed, priority))
+        self._components.sort(key=lambda c: c.priority)
+
+    def accounted(self) -> list[tuple[str, int, int]]:
+        return [(c.name, *c.usage()) for c in self._components]
+
+    def check(self, now: int) -> int:
+        """Shed if over budget; at most once per ``interval_ms``. Returns bytes shed."""
+        if self.budget_bytes is None:
+            return 0
+        if self._last_check_ms is not None and now - self._last_check_ms < self.interval_ms:
+            return 0
+        self._last_check_ms = now
+        self.last_rss = self._rss()
+        used = self.last_rss if self.last_rss is not None else sum(b for _, _, b in self.accounted())
+        over = used - self.budget_bytes
+        if over <= 0:
+            return 0
+        freed = 0
+        for component in self._components:
+            if component.shed is None:
+                continue
+            _, size = component.usage()
+            if size <= 0:
+                continue
+            # Shed at least half of each cache reached, all of it if that is what it takes.
+            fraction = min(1.0, max(0.5, (over - freed) / size))
+            freed += component.shed(fraction)
+            if freed >= over:
+                break
+        self.sheds += 1
+        self.shed_bytes += freed
+        log.info("Memory %.1f MB over budget; shed about %.1f MB", over / 1_048_576, freed / 1_048_576)
+        return freed
+
+    def debug_lines(self) -> list[str]:
+        if self.budget_bytes is None:
+            self.last_rss = self._rss()
+        rss = f"{self.last_rss / 1_048_576:.1f} MB" if self.last_rss is not None else "n/a"
+        budget = f"{self.budget_bytes / 1_048_576:.0f} MB" if self.budget_bytes is not None else "none"
+        parts = [
+            f"{name} {entries} (~{size / 1_048_576:.1f} MB)" for name, entries, size in self.accounted()
+        ]
+        return [
+            f"memory rss {rss} / budget {budget} | shed {self.sheds}x, ~{self.shed_bytes / 1_048_576:.1f} MB",
+            "  " + " | ".join(parts),
+        ]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import cProfile
+import os
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Callable
+
+
+class PhaseTimer:
+    """Accumulates ``perf_counter_ns`` durations per named phase.
+
+    When disabled, ``start`` and ``lap`` return 0 and ``stop`` is a no-op, so
+    call sites can stay in place at the cost of a method call.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.ticks = 0
+        self.last_ns: dict[str, int] = {}
+        # Phase times of the last *completed* tick, for display mid-tick.
+        self.previous_ns: dict[str, int] = {}
+        self.total_ns: dict[str, int] = {}
+
+    def begin_tick(self) -> None:
+        if not self.enabled:
+            return
+        self.ticks += 1
+        self.previous_ns = self.last_ns
+        self.last_ns = {}
+
+    def start(self) -> int:
+        return perf_counter_ns() if self.enabled else 0
+
+    def stop(self, phase: str, started: int) -> None:
+        if not started:
+            return
+        elapsed = perf_counter_ns() - started
+        self.last_ns[phase] = self.last_ns.get(phase, 0) + elapsed
+        self.total_ns[phase] = self.total_ns.get(phase, 0) + elapsed
+
+    def lap(self, phase: str, started: int) -> int:
+        if not started:
+            return 0
+        now = perf_counter_ns()
+        elapsed = now - started
+        self.last_ns[phase] = self.last_ns.get(phase, 0) + elapsed
+        self.total_ns[phase] = self.total_ns.get(phase, 0) + elapsed
+        return now
+
+    def mean_ms(self, phase: str) -> float:
+        if self.ticks == 0:
+            return 0.0
+        return self.total_ns.get(phase, 0) / self.ticks / 1e6
+
+
+class _StackSampler(threading.Thread):
+    def __init__(self, thread_id: int, interval: float) -> None:
+        super().__init__(name="cctv-stack-sampler", daemon=True)
+        self._thread_id = thread_id
+        self._interval = interval
+        self._halt = threading.Event()
+        self.stacks: Counter[str] = Counter()
+
+    def run(self) -> None:
+        while not self._halt.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            names: list[str] = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def halt(self) -> None:
+        self._halt.set()
+        self.join(timeout=1.0)
+
+
+def run_profiled(fn: Callable[[], None], out_path: str, interval: float = 0.005) -> None:
+    """Run ``fn`` under a profiler and write the result to ``out_path`` on exit.
+
+    ``*.folded`` paths get sampled stacks in flamegraph folded format; any
+    other path gets a cProfile stats dump (readable with ``pstats``).
+    """
+    path = Path(out_path).expanduser()
+    if path.suffix == ".folded":
+        sampler = _StackSampler(threading.get_ident(), interval)
+        sampler.start()
+        try:
+            fn()
+        finally:
+            sampler.halt()
+            lines = [f"{stack} {count}" for stack, count in sampler.stacks.most_common()]
+            path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        fn()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(path))
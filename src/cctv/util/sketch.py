@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import math
+from typing import Iterable
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# Below this batch size the NumPy round-trip costs more than the Python loop.
+_NUMPY_MIN_BATCH = 64
+
+
+class QuantileSketch:
+    """Mergeable DDSketch-style quantile sketch with bounded relative error.
+
+    Values are counted in logarithmic bins, so ``quantile`` is accurate to
+    ``relative_accuracy`` and two sketches with the same accuracy merge by
+    adding bin counts.
+    """
+
+    __slots__ = ("relative_accuracy", "_gamma", "_inv_log_gamma", "bins", "zero_count", "count", "min", "max")
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError(f"relative_accuracy must be in (0, 1), got {relative_accuracy!r}")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._inv_log_gamma = 1.0 / math.log(self._gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        if value <= 0:
+            self.zero_count += 1
+            value = 0
+        else:
+            key = math.ceil(math.log(value) * self._inv_log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + 1
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def add_many(self, values: Iterable[float]) -> None:
+        if np is None:
+            for v in values:
+                self.add(v)
+            return
+        arr = np.fromiter(values, dtype=np.float64)
+        if arr.size < _NUMPY_MIN_BATCH:
+            for v in arr.tolist():
+                self.add(v)
+            return
+        positive = arr[arr > 0]
+        self.zero_count += int(arr.size - positive.size)
+        if positive.size:
+            keys, counts = np.unique(np.ceil(np.log(positive) * self._inv_log_gamma), return_counts=True)
+            bins = self.bins
+            for key, n in zip(keys.astype(np.int64).tolist(), counts.tolist()):
+                bins[key] = bins.get(key, 0) + n
+        self.count += int(arr.size)
+        self.min = min(self.min, max(0.0, float(arr.min())))
+        self.max = max(self.max, max(0.0, float(arr.max())))
+
+    def remove(self, value: float) -> None:
+        """Take back one earlier ``add(value)``; ``min`` and ``max`` keep their old bounds."""
+        if value <= 0:
+            self.zero_count -= 1
+        else:
+            key = math.ceil(math.log(value) * self._inv_log_gamma)
+            n = self.bins.get(key, 0) - 1
+            if n > 0:
+                self.bins[key] = n
+            else:
+                self.bins.pop(key, None)
+        self.count -= 1
+
+    def merge(self, other: QuantileSketch) -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        bins = self.bins
+        for key, n in other.bins.items():
+            bins[key] = bins.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def copy(self) -> QuantileSketch:
+        out = QuantileSketch(self.relative_accuracy)
+        out.bins = dict(self.bins)
+        out.zero_count = self.zero_count
+        out.count = self.count
+        out.min = self.min
+        out.max = self.max
+        return out
+
+    def to_dict(self) -> dict:
+        return {
+            "a": self.relative_accuracy,
+            "z": self.zero_count,
+            "n": self.count,
+            "lo": self.min if self.count else None,
+            "hi": self.max if self.count else None,
+            "b": sorted(self.bins.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> QuantileSketch:
+        out = cls(data["a"])
+        out.zero_count = data["z"]
+        out.count = data["n"]
+        if out.count:
+            out.min = data["lo"]
+            out.max = data["hi"]
+        out.bins = {int(k): int(c) for k, c in data["b"]}
+        return out
+
+    def quantile(self, q: float) -> float | None:
+        if self.count == 0:
+            return None
+        q = min(1.0, max(0.0, q))
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = 2.0 * self._gamma ** key / (self._gamma + 1.0)
+                return min(self.max, max(self.min, value))
+        return self.max
+
+    def count_le(self, value: float) -> int:
+        """Approximate number of added values ``<= value``."""
+        if value < 0:
+            return 0
+        n = self.zero_count
+        if value == 0:
+            return n
+        limit = math.ceil(math.log(value) * self._inv_log_gamma)
+        for key, count in self.bins.items():
+            if key <= limit:
+                n += count
+        return n
+
+    def quantiles(self, qs: Iterable[float]) -> list[float | None]:
+        return [self.quantile(q) for q in qs]
@@ -1,12 +1,114 @@
 from __future__ import annotations
 
+import calendar
 import time
+from typing import Callable
+
+# Epoch ms of "YYYY-MM-DDTHH:MM" prefixes seen so far; session logs reuse a handful.
+_MINUTE_PREFIX_MS: dict[str, int] = {}
+_MINUTE_PREFIX_CACHE_MAX = 4096
+# Lookup tables double as digit/range validation for the canonical shape.
+_SECONDS_MS = {f"{i:02d}": i * 1000 for i in range(60)}
+_MILLIS = {f"{i:03d}": i for i in range(1000)}
+
+
+# Replaces the wall clock for every now_ms() caller while set (see replay).
+_clock: Callable[[], int] | None = None
 
 
 def now_ms() -> int:
+    if _clock is not None:
+        return _clock()
     return int(time.time() * 1000)
 
 
+def set_clock(clock: Callable[[], int] | None) -> None:
+    """Install ``clock`` as the source of ``now_ms``; ``None`` restores wall time."""
+    global _clock
+    _clock = clock
+
+
+class ScaledClock:
+    """Virtual time starting at ``start_ms`` and running ``speed`` times faster than real time."""
+
+    def __init__(self, start_ms: int, speed: float = 1.0, end_ms: int | None = None) -> None:
+        self.start_ms = start_ms
+        self.speed = speed
+        self.end_ms = end_ms
+        self._origin = time.monotonic()
+
+    def __call__(self) -> int:
+        virtual = self.start_ms + int((time.monotonic() - self._origin) * 1000 * self.speed)
+        return virtual if self.end_ms is None else min(virtual, self.end_ms)
+
+    def restart(self) -> None:
+        """Rewind to ``start_ms`` as of now."""
+        self._origin = time.monotonic()
+
+    @property
+    def finished(self) -> bool:
+        return self.end_ms is not None and self() >= self.end_ms
+
+
 def floor_to_bucket_ms(ts_ms: int, bucket_seconds: int) -> int:
     bucket_ms = bucket_seconds * 1000
     return (ts_ms // bucket_ms) * bucket_ms
+
+
+def _minute_prefix_ms(prefix: str) -> int | None:
+    base = _MINUTE_PREFIX_MS.get(prefix)
+    if base is not None:
+        return base
+    if prefix[4] != "-" or prefix[7] != "-" or prefix[10] not in "Tt " or prefix[13] != ":":
+        return None
+    parts = (prefix[0:4], prefix[5:7], prefix[8:10], prefix[11:13], prefix[14:16])
+    if not all(p.isascii() and p.isdigit() for p in parts):
+        return None
+    year, month, day, hour, minute = (int(p) for p in parts)
+    if not (1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1] and hour <= 23 and minute <= 59):
+        return None
+    base = calendar.timegm((year, month, day, hour, minute, 0)) * 1000
+    if len(_MINUTE_PREFIX_MS) >= _MINUTE_PREFIX_CACHE_MAX:
+        _MINUTE_PREFIX_MS.clear()
+    _MINUTE_PREFIX_MS[prefix] = base
+    return base
+
+
+def parse_iso8601_ms(s: str) -> int | None:
+    """Parse a UTC ``YYYY-MM-DDTHH:MM:SS[.fff…](Z|+00:00)`` timestamp to epoch ms.
+
+    The minute prefix is converted once and memoized; seconds and fraction
+    are added arithmetically. Returns ``None`` for any other shape (naive
+    times, non-UTC offsets, …) so callers can fall back to
+    ``datetime.fromisoformat``.
+    """
+    if len(s) == 24 and s[19] == "." and s[23] == "Z":
+        # JavaScript toISOString() shape, as written by Claude Code.
+        base = _MINUTE_PREFIX_MS.get(s[:16])
+        if base is None:
+            base = _minute_prefix_ms(s[:16])
+        sec = _SECONDS_MS.get(s[17:19])
+        ms = _MILLIS.get(s[20:23])
+        if base is None or sec is None or ms is None or s[16] != ":":
+            return None
+        return base + sec + ms
+
+    if s.endswith("Z"):
+        end = len(s) - 1
+    elif s.endswith("+00:00"):
+        end = len(s) - 6
+    else:
+        return None
+    if end < 19 or s[16] != ":":
+        return None
+    base = _minute_prefix_ms(s[:16])
+    sec = _SECONDS_MS.get(s[17:19])
+    if base is None or sec is None:
+        return None
+    ms = 0
+    if end > 19:
+        frac = s[20:end]
+        if s[19] not in ".," or not (frac.isascii() and frac.isdigit()):
+            return None
+        ms = int(frac[:3].ljust(3, "0"))
+    return base + sec + ms
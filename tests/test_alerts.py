@@ -0,0 +1,88 @@
+import unittest
+from dataclasses import replace
+
+from cctv.aggregate.series import SeriesIndex
+from cctv.alerts import AlertMonitor, TokenSpikeDetector
+from cctv.config import parse_args
+from cctv.domain.models import RequestUsage
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}}
+MINUTE = 60_000
+T0 = 1_767_225_600_000  # 2026-01-01T00:00:00Z
+
+
+def _usage(ts_ms: int, input_tokens: int = 1_000, output_tokens: int = 100) -> RequestUsage:
+    return RequestUsage(f"e{ts_ms}", ts_ms, "sonnet", input_tokens, output_tokens)
+
+
+class TokenSpikeDetectorTest(unittest.TestCase):
+    def test_spike_after_warmup(self) -> None:
+        detector = TokenSpikeDetector(z_threshold=4.0, min_tokens=1)
+        for i in range(30):
+            self.assertIsNone(detector.observe(_usage(T0 + i * MINUTE, 1_000 + (i % 3) * 100)))
+        self.assertIsNone(detector.observe(_usage(T0 + 30 * MINUTE, 1_100)))
+        self.assertIsNotNone(detector.observe(_usage(T0 + 30 * MINUTE + 1, 50_000)))
+
+    def test_train_matches_observing_in_order(self) -> None:
+        totals = [0, 0, 1_100, 0, 1_300, 1_200] + [0] * 300 + [1_000, 1_100, 900, 400]
+        observed = TokenSpikeDetector(z_threshold=4.0)
+        for minute, tokens in enumerate(totals):
+            if tokens:
+                observed.observe(_usage(T0 + minute * MINUTE, tokens - 100))
+        trained = TokenSpikeDetector(z_threshold=4.0)
+        trained.train(T0 // MINUTE, totals)
+
+        self.assertEqual((trained.minutes, trained.tokens), (observed.minutes, observed.tokens))
+        self.assertAlmostEqual(trained.mean, observed.mean)
+        self.assertAlmostEqual(trained.var, observed.var)
+
+
+class AlertMonitorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.config = replace(parse_args([]), alert_z=0, alert_cost_per_min=1.0, alert_session_output=5_000)
+        self.now = T0 + 10 * MINUTE
+
+    def test_burst_alerts_once_per_subject(self) -> None:
+        monitor = AlertMonitor(self.config, PRICING)
+        # 200 requests in one minute at $0.0045 each: $0.90 after 200, over $1 soon after.
+        for i in range(400):
+            monitor.observe(_usage(self.now - 1_000 + i), "s1", self.now)
+
+        kinds = [(a.kind, a.subject) for a in monitor.recent]
+        self.assertEqual(kinds, [("session", "s1"), ("cost", "sonnet")])
+        self.assertGreater(monitor.suppressed, 100)
+
+        # A new burst after the cooldown alerts again.
+        later = self.now + 301_000
+        for i in range(60):
+            monitor.observe(_usage(later + i, output_tokens=100), "s1", later)
+        self.assertEqual(monitor.fired, 3)
+
+    def test_backfill_does_not_alert(self) -> None:
+        monitor = AlertMonitor(self.config, PRICING)
+        for i in range(400):
+            monitor.observe(_usage(T0 + i), "s1", self.now + 60 * MINUTE)
+        self.assertEqual(monitor.fired, 0)
+
+    def test_backfill_skips_old_usage_then_trains_on_history(self) -> None:
+        config = replace(self.config, alert_z=4.0)
+        history = SeriesIndex(MINUTE, 24 * 60 * MINUTE)
+        monitor = AlertMonitor(config, PRICING)
+        monitor.backfilling = True
+        now = T0 + 60 * MINUTE
+        # Newest first, as backfill reads files: the older minutes arrive late.
+        for minute in range(1, 41):
+            usage = _usage(now - minute * MINUTE)
+            history.add(usage, None)
+            monitor.observe(usage, "s1", now)
+        self.assertEqual(monitor.spikes.minutes, 0)
+
+        monitor.finish_backfill(history, now)
+
+        self.assertFalse(monitor.backfilling)
+        self.assertGreaterEqual(monitor.spikes.minutes, TokenSpikeDetector.WARMUP)
+        self.assertGreater(monitor.spikes.mean, 1_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
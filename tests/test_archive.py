@@ -0,0 +1,157 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from cctv.config import parse_args
+from cctv.ingest.archive import ArchiveReader, is_archive, is_usage_file
+from cctv.ingest.pipeline import UsagePipeline
+from cctv.replay import merged_usages
+from cctv.summary import summarize
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}}
+T0 = 1_767_225_600_000  # 2026-01-01T00:00:00Z
+
+
+def _line(event_id: str, ts_ms: int, input_tokens: int = 10) -> str:
+    return json.dumps({
+        "uuid": event_id,
+        "timestamp": ts_ms,
+        "message": {"model": "sonnet", "usage": {"input_tokens": input_tokens, "output_tokens": 1}},
+    }) + "\n"
+
+
+def _tick_until_archives_applied(pipeline: UsagePipeline, timeout: float = 5.0) -> None:
+    # Archives are parsed on a background thread; the tick applies them once done.
+    deadline = time.monotonic() + timeout
+    pipeline.tick()
+    while (pipeline._archive_jobs or pipeline._archive_rows) and time.monotonic() < deadline:
+        time.sleep(0.01)
+        pipeline.tick()
+
+
+class ArchiveReaderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.root = self.tmp / "logs"
+        self.root.mkdir()
+        self.body = "".join(_line(f"a{i}", T0 + i * 1000) for i in range(20))
+        self.archive = self.root / "s.jsonl.gz"
+        self.archive.write_bytes(gzip.compress(self.body.encode("utf-8")))
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_suffixes(self) -> None:
+        self.assertTrue(is_usage_file(Path("a.jsonl")))
+        self.assertTrue(is_usage_file(Path("a.jsonl.zst")))
+        self.assertFalse(is_usage_file(Path("a.json.gz")))
+        self.assertTrue(is_archive(Path("a.jsonl.gz")))
+        self.assertFalse(is_archive(Path("a.jsonl")))
+
+    def test_results_cached_by_content_hash(self) -> None:
+        cache = self.tmp / "cache"
+        reader = ArchiveReader(cache)
+        self.assertEqual([u.event_id for u in reader.usages(self.archive)], [f"a{i}" for i in range(20)])
+        read = reader.decompressed_bytes
+        self.assertEqual(read, len(self.body))
+
+        moved = self.archive.rename(self.root / "moved.jsonl.gz")
+        self.assertEqual(len(reader.usages(moved)), 20)
+        self.assertEqual(reader.decompressed_bytes, read)
+
+        fresh = ArchiveReader(cache)
+        self.assertEqual(fresh.usages(moved), reader.usages(moved))
+        self.assertEqual(fresh.decompressed_bytes, 0)
+
+    def test_malformed_cache_file_is_rebuilt(self) -> None:
+        cache = self.tmp / "cache"
+        ArchiveReader(cache).usages(self.archive)
+        (cache_file,) = cache.iterdir()
+        cache_format = json.loads(cache_file.read_text())["format"]
+        for body in ("[]", '{"format": 0}', f'{{"format": {cache_format}, "usages": [[1]]}}'):
+            cache_file.write_text(body, encoding="utf-8")
+
+            self.assertEqual(len(ArchiveReader(cache).usages(self.archive)), 20)
+
+    def test_truncated_archive_is_not_cached(self) -> None:
+        data = self.archive.read_bytes()
+        self.archive.write_bytes(data[: len(data) // 2])
+        reader = ArchiveReader(self.tmp / "cache")
+        with self.assertLogs("cctv.ingest.archive", "WARNING"):
+            reader.usages(self.archive)
+        self.assertFalse((self.tmp / "cache").exists())
+
+    @unittest.skipIf(zstandard is None, "zstandard not installed")
+    def test_zstd(self) -> None:
+        path = self.root / "z.jsonl.zst"
+        path.write_bytes(zstandard.ZstdCompressor().compress(self.body.encode("utf-8")))
+        self.assertEqual(len(ArchiveReader().usages(path)), 20)
+
+    def test_summary_and_replay_read_archives(self) -> None:
+        (self.root / "live.jsonl").write_text(_line("live", T0 + 500) + _line("a3", T0 + 3000))
+        result = summarize([self.root], PRICING, T0, T0 + 10_000, archives=ArchiveReader())
+        self.assertEqual(result.totals_by_model["sonnet"].input_tokens, 110)
+
+        replayed = list(merged_usages([self.root], T0, T0 + 10_000, archives=ArchiveReader()))
+        self.assertEqual([u.event_id for u in replayed[:3]], ["a0", "live", "a1"])
+        self.assertEqual(len(replayed), 11)
+
+    def test_pipeline_applies_large_archives_in_budgeted_slices(self) -> None:
+        big = self.root / "big.jsonl.gz"
+        big.write_bytes(gzip.compress("".join(_line(f"b{i}", T0 + i) for i in range(20_000)).encode("utf-8")))
+        settled = time.time() - 60
+        for path in (self.archive, big):
+            os.utime(path, (settled, settled))
+        pipeline = UsagePipeline(parse_args(["--no-time-index"]), PRICING, [self.root])
+        pipeline.archives = ArchiveReader()
+        pipeline.start()
+        try:
+            pipeline.tick(read_budget_ms=0)
+            deadline = time.monotonic() + 5
+            while pipeline._archive_jobs and time.monotonic() < deadline:
+                time.sleep(0.01)
+                pipeline.tick(read_budget_ms=0)
+            # Parsed off the tick, but a zero budget applies nothing yet.
+            self.assertEqual(pipeline.store.snapshot.totals_by_model, {})
+            self.assertTrue(pipeline.backfill.active)
+
+            pipeline.tick(read_budget_ms=60_000)
+        finally:
+            pipeline.stop()
+
+        self.assertEqual(pipeline.store.snapshot.totals_by_model["sonnet"].input_tokens, 200_200)
+        self.assertFalse(pipeline.backfill.active)
+
+    def test_pipeline_reads_settled_archives_once(self) -> None:
+        config = parse_args(["--bucket", "1", "--no-time-index"])
+        pipeline = UsagePipeline(config, PRICING, [self.root])
+        pipeline.archives = ArchiveReader()
+        fresh = self.root / "fresh.jsonl.gz"
+        fresh.write_bytes(gzip.compress(_line("f0", T0).encode("utf-8")))
+        settled = time.time() - 60
+        os.utime(self.archive, (settled, settled))
+        pipeline.start()
+        try:
+            _tick_until_archives_applied(pipeline)
+            self.assertEqual(pipeline.store.snapshot.totals_by_model["sonnet"].input_tokens, 200)
+            self.assertEqual(pipeline._archive_queue, {fresh})
+
+            pipeline.on_file_changed(self.archive)
+            _tick_until_archives_applied(pipeline)
+            self.assertEqual(pipeline.store.snapshot.totals_by_model["sonnet"].input_tokens, 200)
+        finally:
+            pipeline.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from cctv.domain.delta import snapshot_message
+from cctv.domain.models import RequestUsage
+from cctv.domain.state import StateStore
+from cctv.server.daemon import (
+    DaemonClient,
+    DeltaBroadcaster,
+    _bind,
+    _make_handler,
+    daemon_available,
+    encode_message,
+)
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}}
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class DaemonTest(unittest.TestCase):
+    def test_client_mirrors_daemon_state(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            socket_path = Path(tmp) / "daemon.sock"
+            store = StateStore(window_size=3)
+            store.apply_usage(RequestUsage("a", 1_000, "sonnet", 50, 5), 1, PRICING)
+            broadcaster = DeltaBroadcaster(store.publish(), bucket_seconds=10)
+            server = _bind(socket_path, _make_handler(broadcaster))
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            client = DaemonClient(socket_path, window_size=3)
+            try:
+                self.assertTrue(daemon_available(socket_path))
+                self.assertEqual(stat.S_IMODE(os.stat(socket_path).st_mode), 0o600)
+                client.start()
+                self.assertTrue(_wait_for(lambda: "sonnet" in client.store.snapshot.totals_by_model))
+                self.assertEqual(client.bucket_seconds, 10)
+
+                store.apply_usage(RequestUsage("b", 1_000, "sonnet", 70, 5), 1, PRICING)
+                broadcaster.broadcast(store.publish())
+
+                self.assertTrue(
+                    _wait_for(lambda: client.store.snapshot.totals_by_model["sonnet"].input_tokens == 120)
+                )
+                self.assertEqual(broadcaster.clients, 1)
+            finally:
+                client.stop()
+                server.shutdown()
+                server.server_close()
+
+    def test_client_reconnects_after_malformed_message(self) -> None:
+        store = StateStore(window_size=3)
+        store.apply_usage(RequestUsage("a", 1_000, "sonnet", 50, 5), 1, PRICING)
+        messages = [{"type": "snapshot"}, snapshot_message(store.publish(), 10)]
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                self.wfile.write(encode_message(messages.pop(0)))
+                self.wfile.flush()
+                self.rfile.read()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            socket_path = Path(tmp) / "daemon.sock"
+            server = _bind(socket_path, Handler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            client = DaemonClient(socket_path, window_size=3)
+            try:
+                with self.assertLogs("cctv.server.daemon", "WARNING"):
+                    client.start()
+                    self.assertTrue(_wait_for(lambda: "sonnet" in client.store.snapshot.totals_by_model))
+                self.assertTrue(client._thread.is_alive())
+            finally:
+                client.stop()
+                server.shutdown()
+                server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
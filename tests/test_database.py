@@ -0,0 +1,84 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from cctv.database import UsageDatabase, format_query, query_rollups
+from cctv.domain.models import RequestUsage
+from cctv.paths import project_of
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}, "opus": {"input": 15.0, "output": 75.0}}
+T0 = 1_767_225_600_000  # 2026-01-01T00:00:00Z
+
+
+def _usage(event_id: str, ts_ms: int, model: str = "sonnet") -> RequestUsage:
+    return RequestUsage(event_id=event_id, timestamp_ms=ts_ms, model=model, input_tokens=100, output_tokens=10)
+
+
+class UsageDatabaseTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "usage.db"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_rollups_ignore_duplicates_across_reopen(self) -> None:
+        db = UsageDatabase(self.path)
+        db.add([_usage("a", T0), _usage("b", T0 + 5_000), _usage("c", T0 + 60_000, "opus")], "proj")
+        self.assertEqual(db.flush(), 3)
+        db.close()
+
+        db = UsageDatabase(self.path)
+        db.add([_usage("a", T0), _usage("d", T0 + 61_000)], "proj")
+        self.assertEqual(db.flush(), 1)
+
+        rows = query_rollups(db.conn, ["model"], PRICING)
+        self.assertEqual([(r.key, r.requests, r.input_tokens) for r in rows], [
+            (("opus",), 1, 100),
+            (("sonnet",), 3, 300),
+        ])
+        minutes = db.conn.execute("SELECT count(*) FROM rollup_minute").fetchone()[0]
+        self.assertEqual(minutes, 3)
+        db.close()
+
+    def test_failed_flush_keeps_rows_for_retry(self) -> None:
+        db = UsageDatabase(self.path)
+        db.conn.execute("PRAGMA busy_timeout = 0")
+        other = sqlite3.connect(self.path)
+        other.execute("BEGIN IMMEDIATE")
+        db.add([_usage("a", T0), _usage("b", T0 + 5_000)], "proj")
+
+        with self.assertLogs("cctv.database", "WARNING"):
+            self.assertEqual(db.flush(), 0)
+        self.assertEqual(db.pending, 2)
+
+        other.rollback()
+        other.close()
+        self.assertEqual(db.flush(), 2)
+        self.assertEqual(db.pending, 0)
+        db.close()
+
+    def test_query_range_and_grouping(self) -> None:
+        db = UsageDatabase(self.path)
+        db.add([_usage("a", T0)], "one")
+        db.add([_usage("b", T0 + 120_000, "opus")], "two")
+        db.flush()
+
+        rows = query_rollups(db.conn, ["project"], PRICING, since_ms=T0 + 60_000)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0].key, ("two",))
+        self.assertAlmostEqual(rows[0].cost_usd, 100 / 1e6 * 15 + 10 / 1e6 * 75)
+        self.assertIn("two", format_query(["project"], rows))
+        with self.assertRaises(ValueError):
+            query_rollups(db.conn, ["week"], PRICING)
+        db.close()
+
+    def test_project_of(self) -> None:
+        self.assertEqual(project_of(Path("/h/.claude/projects/-src-app/s1.jsonl")), "-src-app")
+        self.assertEqual(project_of(Path("/h/.claude/projects/-src-app/s1/subagents/a.jsonl")), "-src-app")
+        self.assertIsNone(project_of(Path("/tmp/s1.jsonl")))
+
+
+if __name__ == "__main__":
+    unittest.main()
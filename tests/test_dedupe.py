@@ -0,0 +1,25 @@
+import unittest
+import uuid
+
+from cctv.ingest.dedupe import DedupeCache
+
+
+class DedupeCacheTest(unittest.TestCase):
+    def test_repeats_are_dropped_and_distinct_ids_kept(self) -> None:
+        cache = DedupeCache(max_size=100_000)
+        ids = [str(uuid.UUID(int=i)) for i in range(100_000)]
+
+        self.assertTrue(all(cache.add_if_new(event_id) for event_id in ids))
+        self.assertFalse(any(cache.add_if_new(event_id) for event_id in ids[::1000]))
+        self.assertEqual(len(cache), 100_000)
+
+    def test_evicted_ids_are_new_again(self) -> None:
+        cache = DedupeCache(max_size=2)
+        for event_id in ("a", "b", "c"):
+            cache.add_if_new(event_id)
+        self.assertTrue(cache.add_if_new("a"))
+        self.assertFalse(cache.add_if_new("c"))
+
+
+if __name__ == "__main__":
+    unittest.main()
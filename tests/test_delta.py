@@ -0,0 +1,89 @@
+import unittest
+
+from cctv.aggregate.bucketer import empty_buckets
+from cctv.domain.delta import apply_message, delta_message, snapshot_message
+from cctv.domain.models import RequestUsage
+from cctv.domain.state import StateStore
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}, "opus": {"input": 15.0, "output": 75.0}}
+
+
+def _store() -> StateStore:
+    store = StateStore(window_size=4)
+    store.replace_buckets(empty_buckets(4, 3_000, 1))
+    store.apply_usage(RequestUsage("a", 1_000, "sonnet", 50, 5), 1, PRICING)
+    store.apply_usage(RequestUsage("b", 2_000, "opus", 300, 7), 1, PRICING)
+    store.publish()
+    return store
+
+
+class DeltaTest(unittest.TestCase):
+    def test_snapshot_round_trip(self) -> None:
+        src = _store()
+        dst = StateStore(window_size=4)
+
+        apply_message(dst, snapshot_message(src.snapshot, 1))
+
+        self.assertEqual(dst.snapshot.buckets, src.snapshot.buckets)
+        self.assertEqual(dict(dst.snapshot.totals_by_model), dict(src.snapshot.totals_by_model))
+        self.assertAlmostEqual(dst.snapshot.totals_by_model["opus"].input_sketch.quantile(0.5), 300, delta=3)
+
+    def test_delta_carries_only_changed_rows(self) -> None:
+        src = _store()
+        before = src.snapshot
+        src.apply_usage(RequestUsage("c", 2_000, "sonnet", 10, 1), 1, PRICING)
+        after = src.publish()
+
+        msg = delta_message(before, after)
+
+        self.assertEqual([row[0] for row in msg["buckets"]], [2_000])
+        self.assertEqual([row["model"] for row in msg["totals"]], ["sonnet"])
+
+    def test_delta_applies_window_advance(self) -> None:
+        src = _store()
+        dst = StateStore(window_size=4)
+        apply_message(dst, snapshot_message(src.snapshot, 1))
+        before = src.snapshot
+        src.advance_time(6_500, 1)
+        src.apply_usage(RequestUsage("d", 6_100, "sonnet", 20, 2), 1, PRICING)
+
+        apply_message(dst, delta_message(before, src.publish()))
+
+        self.assertEqual([b.start_ms for b in dst.snapshot.buckets], [3_000, 4_000, 5_000, 6_000])
+        self.assertEqual(dst.snapshot.buckets, src.snapshot.buckets)
+        self.assertEqual(dst.snapshot.totals_by_model["sonnet"].input_tokens, 70)
+
+    def test_user_partitions_round_trip(self) -> None:
+        src = _store()
+        dst = StateStore(window_size=4)
+        apply_message(dst, snapshot_message(src.snapshot, 1))
+        before = src.snapshot
+        src.apply_usage(RequestUsage("e", 3_000, "sonnet", 40, 4, user="alice"), 1, PRICING)
+        src.apply_usage(RequestUsage("f", 3_000, "opus", 60, 6, user="bob"), 1, PRICING)
+
+        msg = delta_message(before, src.publish())
+        apply_message(dst, msg)
+
+        self.assertEqual(
+            sorted((row["user"], row["model"]) for row in msg["user_totals"]), [("alice", "sonnet"), ("bob", "opus")]
+        )
+        self.assertEqual(dst.snapshot.totals_by_user["alice"]["sonnet"].input_tokens, 40)
+        self.assertEqual(dst.snapshot.totals_by_model["opus"].input_tokens, 360)
+
+    def test_reconnect_snapshot_with_same_counts_replaces_published_copies(self) -> None:
+        dst = StateStore(window_size=4)
+        apply_message(dst, snapshot_message(_store().snapshot, 1))
+        # A restarted daemon: the same requests, different token counts.
+        restarted = StateStore(window_size=4)
+        restarted.replace_buckets(empty_buckets(4, 3_000, 1))
+        restarted.apply_usage(RequestUsage("a", 1_000, "sonnet", 999, 5), 1, PRICING)
+        restarted.apply_usage(RequestUsage("b", 2_000, "opus", 300, 7), 1, PRICING)
+
+        apply_message(dst, snapshot_message(restarted.publish(), 1))
+
+        self.assertEqual(dst.snapshot.totals_by_model["sonnet"].input_tokens, 999)
+        self.assertEqual(dst.snapshot.buckets, restarted.snapshot.buckets)
+
+
+if __name__ == "__main__":
+    unittest.main()
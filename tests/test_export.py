@@ -0,0 +1,83 @@
+import gzip
+import json
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from cctv.export import export_usage
+
+try:
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pq = None
+
+T0 = 1_767_225_600_000  # 2026-01-01T00:00:00Z
+
+
+def _line(event_id: str, ts_ms: int, model: str = "sonnet") -> str:
+    return json.dumps({
+        "uuid": event_id,
+        "timestamp": ts_ms,
+        "message": {"model": model, "usage": {"input_tokens": 10, "output_tokens": 1}},
+    }) + "\n"
+
+
+@unittest.skipIf(pq is None, "pyarrow not installed")
+class ExportTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        project = self.tmp / "projects" / "-src-app"
+        project.mkdir(parents=True)
+        self.live = project / "a.jsonl"
+        self.live.write_text("".join(_line(f"a{i}", T0 + i, "opus" if i % 2 else "sonnet") for i in range(5)))
+        self.archive = project / "b.jsonl.gz"
+        # a0 appears in both files.
+        self.archive.write_bytes(gzip.compress((_line("a0", T0) + _line("b1", T0 + 10)).encode("utf-8")))
+        self.files = [(self.live, None), (self.archive, "alice")]
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_parquet_batches_and_dictionary_columns(self) -> None:
+        out = self.tmp / "usage.parquet"
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            result = export_usage(self.files, out, "parquet", batch_rows=2, executor=executor, window=1)
+
+        self.assertEqual((result.rows, result.batches), (6, 3))
+        table = pq.read_table(out)
+        self.assertEqual(table.column("event_id").to_pylist(), ["a0", "a1", "a2", "a3", "a4", "b1"])
+        self.assertEqual(set(table.column("project").to_pylist()), {"-src-app"})
+        self.assertEqual(table.column("user").to_pylist()[-1], "alice")
+        self.assertEqual(str(table.schema.field("model").type), "dictionary<values=string, indices=int32, ordered=0>")
+
+    def test_archive_cache_dir_is_the_callers(self) -> None:
+        cache = self.tmp / "cache"
+        export_usage(self.files, self.tmp / "a.parquet", archive_cache_dir=cache)
+        export_usage(self.files, self.tmp / "b.parquet")
+
+        self.assertEqual(len(list(cache.iterdir())), 1)
+
+    def test_duplicates_are_dropped_across_the_whole_export(self) -> None:
+        late = self.tmp / "projects" / "-src-app" / "c.jsonl"
+        late.write_text(_line("a0", T0))
+        out = self.tmp / "usage.parquet"
+
+        result = export_usage(self.files + [(late, None)], out, "parquet", batch_rows=2)
+
+        self.assertEqual(result.rows, 6)
+
+    def test_arrow_with_range(self) -> None:
+        out = self.tmp / "usage.arrow"
+        result = export_usage(self.files, out, "arrow", since_ms=T0 + 3, batch_rows=1)
+
+        table = pa_ipc.open_file(out).read_all()
+        self.assertEqual(result.rows, 3)
+        self.assertEqual(table.column("event_id").to_pylist(), ["a3", "a4", "b1"])
+        self.assertEqual(table.column("model").to_pylist(), ["opus", "sonnet", "sonnet"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from cctv.ingest.dedupe import DedupeCache
+from cctv.util.memory import ID_ENTRY_BYTES, MemoryGovernor, parse_size
+
+
+class MemoryGovernorTest(unittest.TestCase):
+    def test_parse_size(self) -> None:
+        self.assertEqual(parse_size("64MB"), 64 * 1024 * 1024)
+        self.assertEqual(parse_size("512k"), 512 * 1024)
+        self.assertEqual(parse_size("1.5GiB"), int(1.5 * 1024**3))
+        self.assertEqual(parse_size("100"), 100)
+        with self.assertRaises(ValueError):
+            parse_size("lots")
+
+    def test_sheds_by_priority_until_covered(self) -> None:
+        rss = [10_000]
+        calls: list[str] = []
+        cache = {"size": 3_000}
+
+        def shed_cache(fraction: float) -> int:
+            calls.append("cache")
+            freed = int(cache["size"] * fraction)
+            cache["size"] -= freed
+            return freed
+
+        def shed_history(fraction: float) -> int:
+            calls.append("history")
+            return 0
+
+        governor = MemoryGovernor(budget_bytes=9_000, interval_ms=1_000, rss=lambda: rss[0])
+        governor.register("history", lambda: (1, 5_000), shed_history, priority=90)
+        governor.register("cache", lambda: (1, cache["size"]), shed_cache, priority=10)
+        governor.register("fixed", lambda: (1, 100))
+
+        self.assertEqual(governor.check(0), 1_500)
+        self.assertEqual(calls, ["cache"])
+        # Rate limited, then under budget.
+        self.assertEqual(governor.check(500), 0)
+        rss[0] = 8_000
+        self.assertEqual(governor.check(1_000), 0)
+        self.assertEqual(governor.sheds, 1)
+        self.assertIn("cache 1", governor.debug_lines()[1])
+
+    def test_dedupe_shed_keeps_floor(self) -> None:
+        dedupe = DedupeCache(max_size=20_000)
+        for i in range(20_000):
+            dedupe.add_if_new(f"e{i}")
+
+        self.assertEqual(dedupe.shed(0.5), 10_000 * ID_ENTRY_BYTES)
+        self.assertEqual(len(dedupe), 10_000)
+        self.assertFalse(dedupe.add_if_new("e19999"))
+        self.assertTrue(dedupe.add_if_new("e0"))
+        dedupe.shed(1.0)
+        self.assertEqual(len(dedupe), DedupeCache.MIN_SIZE)
+
+
+if __name__ == "__main__":
+    unittest.main()
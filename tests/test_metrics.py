@@ -0,0 +1,41 @@
+import unittest
+
+from cctv.domain.models import RequestUsage
+from cctv.domain.state import StateStore
+from cctv.server.metrics import MetricsExporter, render_openmetrics
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}}
+
+
+class MetricsTest(unittest.TestCase):
+    def test_render_openmetrics_counters_and_histogram(self) -> None:
+        store = StateStore(window_size=3)
+        store.apply_usage(RequestUsage("a", 1_000, "sonnet", 50, 5), 1, PRICING)
+        store.apply_usage(RequestUsage("b", 1_000, "sonnet", 2_000, 7), 1, PRICING)
+
+        body = render_openmetrics(store.publish()).decode("utf-8")
+
+        self.assertIn('cctv_input_tokens_total{model="sonnet"} 2050', body)
+        self.assertIn('cctv_requests_total{model="sonnet"} 2', body)
+        self.assertIn('cctv_request_input_tokens_bucket{model="sonnet",le="100"} 1', body)
+        self.assertIn('cctv_request_input_tokens_bucket{model="sonnet",le="+Inf"} 2', body)
+        self.assertTrue(body.endswith("# EOF\n"))
+
+    def test_exporter_renders_once_per_version(self) -> None:
+        store = StateStore(window_size=3)
+        exporter = MetricsExporter(store)
+
+        self.assertTrue(exporter.update())
+        body = exporter.body
+        self.assertFalse(exporter.update())
+        self.assertIs(exporter.body, body)
+
+        store.apply_usage(RequestUsage("a", 1_000, "sonnet", 50, 5), 1, PRICING)
+        self.assertFalse(exporter.update())
+        store.publish()
+        self.assertTrue(exporter.update())
+        self.assertIn(b"sonnet", exporter.body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from cctv.config import parse_args
+from cctv.ingest.locator import scan_usage_files
+from cctv.ingest.pipeline import UsagePipeline
+from cctv.paths import all_user_roots
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}}
+
+
+def _line(event_id: str, input_tokens: int) -> str:
+    return json.dumps({
+        "uuid": event_id,
+        "timestamp": "2026-01-01T00:00:00.000Z",
+        "message": {"model": "sonnet", "usage": {"input_tokens": input_tokens, "output_tokens": 1}},
+    }) + "\n"
+
+
+class MultiUserTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.home = Path(self._tmp.name)
+        for user in ("alice", "bob", "carol"):
+            project = self.home / user / ".claude" / "projects" / "p"
+            project.mkdir(parents=True)
+            (project / "s.jsonl").write_text(_line(f"{user}-1", 100))
+        (self.home / "dave").mkdir()
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_all_user_roots_and_sharded_scan(self) -> None:
+        roots = all_user_roots(str(self.home / "*" / ".claude"))
+        self.assertEqual([r.parent.name for r in roots], ["alice", "bob", "carol"])
+
+        sizes = scan_usage_files(roots)
+        self.assertEqual(len(sizes), 3)
+        self.assertTrue(all(size > 0 for size in sizes.values()))
+
+    def test_pipeline_partitions_totals_by_user(self) -> None:
+        config = parse_args(["--all-users", "--max-watched-roots", "1", "--bucket", "1", "--no-time-index"])
+        roots = all_user_roots(str(self.home / "*" / ".claude"))
+        pipeline = UsagePipeline(config, PRICING, roots)
+        self.assertIsNone(pipeline.watcher)
+        pipeline.start()
+        try:
+            started = pipeline._last_file_scan_ms
+            pipeline.tick(now=started)
+            with (self.home / "alice" / ".claude" / "projects" / "p" / "s.jsonl").open("a") as f:
+                f.write(_line("alice-2", 50))
+            # No watcher: the next size scan notices the append.
+            pipeline.tick(now=started + pipeline._file_scan_interval_ms)
+        finally:
+            pipeline.stop()
+
+        snap = pipeline.store.publish()
+        self.assertEqual(snap.totals_by_model["sonnet"].input_tokens, 350)
+        self.assertEqual(
+            {user: totals["sonnet"].input_tokens for user, totals in snap.totals_by_user.items()},
+            {"alice": 150, "bob": 100, "carol": 100},
+        )
+
+    def test_size_scan_does_not_reread_torn_files(self) -> None:
+        config = parse_args(["--all-users", "--max-watched-roots", "1", "--no-time-index"])
+        roots = all_user_roots(str(self.home / "*" / ".claude"))
+        torn = self.home / "bob" / ".claude" / "projects" / "p" / "s.jsonl"
+        with torn.open("a") as f:
+            f.write('{"uuid": "bob-2", "timest')
+        pipeline = UsagePipeline(config, PRICING, roots)
+        pipeline.start()
+        try:
+            now = pipeline._last_file_scan_ms
+            pipeline.tick(now=now)
+            with mock.patch.object(pipeline.tailer, "read_new_lines", wraps=pipeline.tailer.read_new_lines) as reads:
+                for _ in range(3):
+                    now += pipeline._file_scan_interval_ms
+                    pipeline.tick(now=now)
+            self.assertEqual(reads.call_count, 0)
+        finally:
+            pipeline.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,10 @@
+import json
 import unittest
+from pathlib import Path
 
 from cctv.ingest.parser import parse_usage_line
+from cctv.ingest.schema import SchemaParser
+from cctv.util.time import now_ms
 
 
 class ParserTest(unittest.TestCase):
@@ -38,6 +42,65 @@ class ParserTest(unittest.TestCase):
         self.assertEqual(usage.cache_read_input_tokens, 17872)
         self.assertEqual(usage.cache_creation_input_tokens, 0)
 
+    def test_parse_usage_line_missing_timestamp_uses_now(self) -> None:
+        before = now_ms()
+        usage = parse_usage_line('{"id":"x","model":"sonnet","input_tokens":1,"output_tokens":1}')
+        assert usage is not None
+        self.assertGreaterEqual(usage.timestamp_ms, before)
+        self.assertLessEqual(usage.timestamp_ms, now_ms())
+
+    def test_parse_usage_line_non_ascii_digits_in_timestamp_use_now(self) -> None:
+        before = now_ms()
+        line = '{"id":"x","timestamp":"2026-02-21T06:4\u00b2:42Z","model":"sonnet","input_tokens":1,"output_tokens":1}'
+        usage = parse_usage_line(line)
+        assert usage is not None
+        self.assertGreaterEqual(usage.timestamp_ms, before)
+        self.assertEqual(SchemaParser().parse_lines(Path("s.jsonl"), [line] * 6)[-1].event_id, usage.event_id)
+
+
+class ContentEventIdTest(unittest.TestCase):
+    BASE = {
+        "type": "assistant",
+        "sessionId": "s1",
+        "timestamp": "2026-02-21T06:49:42.972Z",
+        "message": {"model": "claude-sonnet-4-6", "usage": {"input_tokens": 12, "output_tokens": 3}},
+    }
+
+    def _id(self, **changes) -> str:
+        usage = parse_usage_line(json.dumps({**self.BASE, **changes}))
+        assert usage is not None
+        return usage.event_id
+
+    def test_payload_does_not_change_the_id(self) -> None:
+        event_id = self._id()
+        self.assertRegex(event_id, r"^h[0-9a-f]{16}$")
+        self.assertEqual(self._id(toolUseResult={"stdout": "x" * 200_000}), event_id)
+
+    def test_identifying_fields_change_the_id(self) -> None:
+        ids = {
+            self._id(),
+            self._id(sessionId="s2"),
+            self._id(timestamp="2026-02-21T06:49:42.973Z"),
+            # Same digits, split differently between the two counts.
+            self._id(message={"model": "claude-sonnet-4-6", "usage": {"input_tokens": 1, "output_tokens": 23}}),
+            self._id(message={"model": "claude-opus-4-6", "usage": {"input_tokens": 12, "output_tokens": 3}}),
+        }
+        self.assertEqual(len(ids), 5)
+
+    def test_no_collisions_across_many_requests(self) -> None:
+        ids = {
+            self._id(timestamp=f"2026-02-21T06:{i // 60000 % 60:02d}:{i // 1000 % 60:02d}.{i % 1000:03d}Z")
+            for i in range(20_000)
+        }
+        self.assertEqual(len(ids), 20_000)
+
+    def test_without_timestamp_hashes_the_line(self) -> None:
+        line = '{"model":"sonnet","input_tokens":1,"output_tokens":1,"content":"a"}'
+        first = parse_usage_line(line)
+        assert first is not None
+        self.assertEqual(parse_usage_line(line).event_id, first.event_id)
+        self.assertNotEqual(parse_usage_line(line.replace('"a"', '"b"')).event_id, first.event_id)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,128 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from cctv.config import parse_args
+from cctv.ingest.pipeline import BackfillProgress, UsagePipeline
+from cctv.util.time import now_ms
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}}
+
+
+def _line(event_id: str, input_tokens: int, timestamp: str = "2026-01-01T00:00:00.000Z") -> str:
+    return json.dumps({
+        "uuid": event_id,
+        "timestamp": timestamp,
+        "message": {"model": "sonnet", "usage": {"input_tokens": input_tokens, "output_tokens": 1}},
+    }) + "\n"
+
+
+class PipelineListenerTest(unittest.TestCase):
+    def test_listener_sees_new_usage_once_with_published_snapshot(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            session = root / "s.jsonl"
+            session.write_text(_line("a", 10) + _line("a", 10) + _line("b", 20))
+            pipeline = UsagePipeline(parse_args(["--no-time-index"]), PRICING, [root])
+            calls = []
+            pipeline.add_listener(lambda usages, snap: calls.append(([u.event_id for u in usages], snap)))
+            pipeline.reads.enqueue(session)
+
+            pipeline.tick()
+            pipeline.tick()
+
+        self.assertEqual(len(calls), 1)
+        ids, snap = calls[0]
+        self.assertEqual(ids, ["a", "b"])
+        self.assertIs(snap, pipeline.store.snapshot)
+        self.assertEqual(snap.totals_by_model["sonnet"].input_tokens, 30)
+
+    def test_watcher_changes_are_applied_on_the_tick(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            session = root / "s.jsonl"
+            session.write_text(_line("a", 10))
+            pipeline = UsagePipeline(parse_args(["--no-time-index"]), PRICING, [root])
+            watcher = threading.Thread(target=pipeline.on_file_changed, args=(session,))
+            watcher.start()
+            watcher.join()
+
+            self.assertEqual(pipeline.reads.pending, 0)
+            pipeline.tick()
+
+        self.assertTrue(pipeline.reads.is_live(session, now_ms()))
+        self.assertEqual(pipeline.store.snapshot.totals_by_model["sonnet"].input_tokens, 10)
+
+
+class BackfillTest(unittest.TestCase):
+    def test_newest_file_is_read_first_and_progress_completes(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            old, new = root / "old.jsonl", root / "new.jsonl"
+            old.write_text("".join(_line(f"o{i}", 1) for i in range(200)))
+            new.write_text("".join(_line(f"n{i}", 1) for i in range(200)))
+            os.utime(old, ns=(1_000_000_000, 1_000_000_000))
+            pipeline = UsagePipeline(
+                parse_args(["--no-time-index", "--read-budget-mb", "0.001"]), PRICING, [root]
+            )
+            pipeline.reads.slice_bytes = 4_096
+            seen: list[str] = []
+            pipeline.add_listener(lambda usages, _: seen.extend(u.event_id[0] for u in usages))
+            pipeline.start()
+            try:
+                self.assertEqual(pipeline.backfill.files_total, 2)
+                ticks = 0
+                while pipeline.backfill.active and ticks < 1_000:
+                    pipeline.tick()
+                    ticks += 1
+            finally:
+                pipeline.stop()
+
+        self.assertGreater(ticks, 2)
+        self.assertEqual(seen[0], "n")
+        self.assertEqual(seen.index("o"), 200)
+        progress = pipeline.backfill
+        self.assertEqual((progress.files_done, progress.bytes_done), (2, progress.bytes_total))
+        self.assertTrue(progress.describe().startswith("indexed 2 of 2 files / "))
+
+    def test_alert_baseline_is_trained_after_backfill(self) -> None:
+        now = 1_767_229_200_000  # 2026-01-01T01:00:00Z
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            old, new = root / "old.jsonl", root / "new.jsonl"
+            # One request a minute: 00:00-00:29 in the older file, 00:30-00:59 in the newer.
+            old.write_text("".join(_line(f"o{m}", 1_000, f"2026-01-01T00:{m:02d}:00.000Z") for m in range(30)))
+            new.write_text("".join(_line(f"n{m}", 1_000, f"2026-01-01T00:{m:02d}:00.000Z") for m in range(30, 60)))
+            os.utime(old, ns=(1_000_000_000, 1_000_000_000))
+            pipeline = UsagePipeline(parse_args(["--no-time-index"]), PRICING, [root])
+            pipeline.start()
+            try:
+                self.assertTrue(pipeline.alerts.backfilling)
+                ticks = 0
+                while pipeline.backfill.active and ticks < 100:
+                    pipeline.tick(now)
+                    ticks += 1
+            finally:
+                pipeline.stop()
+
+        spikes = pipeline.alerts.spikes
+        self.assertFalse(pipeline.alerts.backfilling)
+        self.assertEqual(spikes.minutes, 59)
+        self.assertGreater(spikes.mean, 900)
+
+    def test_growth_during_backfill_is_not_counted(self) -> None:
+        progress = BackfillProgress.of({Path("a.jsonl"): 100})
+
+        progress.advance(Path("a.jsonl"), 80, finished=False)
+        progress.advance(Path("a.jsonl"), 80, finished=True)
+        progress.advance(Path("b.jsonl"), 50, finished=True)
+
+        self.assertFalse(progress.active)
+        self.assertEqual((progress.files_done, progress.bytes_done), (1, 100))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from cctv.monitor.poller import ScandirPoller
+
+
+class ScandirPollerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.project = self.root / "projects" / "p"
+        self.project.mkdir(parents=True)
+        self.session = self.project / "s.jsonl"
+        self.session.write_text("{}\n")
+        (self.root / "todos").mkdir()
+        (self.root / "todos" / "t.json").write_text("[]")
+        self.changed: list[Path] = []
+        self.poller = ScandirPoller([self.root], self.changed.append, interval_s=1.0, max_interval_s=4.0)
+        # Set up the initial tree without the background thread; tests drive poll_once.
+        self.poller._add_tree(str(self.root), 0.0, notify=False)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _touch_dir(self, path: Path, bump: int) -> None:
+        # Coarse filesystem timestamps can hide a change made within the same tick.
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump))
+
+    def test_appends_new_files_and_dirs(self) -> None:
+        # Polls 4s or more apart find every directory due, whatever its backoff.
+        self.assertEqual(self.poller.poll_once(1.0), 0)
+
+        with self.session.open("a") as f:
+            f.write("{}\n")
+        (self.root / "todos" / "t.json").write_text("[1]")  # not a usage file
+        self.assertEqual(self.poller.poll_once(5.0), 1)
+        self.assertEqual(self.changed, [self.session])
+
+        new_project = self.root / "projects" / "q"
+        new_project.mkdir()
+        (new_project / "n.jsonl").write_text("{}\n")
+        self._touch_dir(self.root / "projects", 1_000)
+        self.changed.clear()
+        self.assertEqual(self.poller.poll_once(10.0), 1)
+        self.assertEqual(self.changed, [new_project / "n.jsonl"])
+
+        self.session.unlink()
+        self._touch_dir(self.project, 1_000)
+        self.changed.clear()
+        self.poller.poll_once(15.0)
+        self.assertEqual(self.changed, [self.session])
+
+    def test_idle_directories_back_off(self) -> None:
+        # Idle intervals grow 1s → 2s → 4s: polled at 1s and 3s, next due at 7s.
+        self.poller.poll_once(1.0)
+        self.poller.poll_once(3.0)
+        before = self.poller.stats_done
+        self.assertEqual(self.poller.poll_once(5.0), 0)
+        self.assertEqual(self.poller.stats_done, before)
+
+        with self.session.open("a") as f:
+            f.write("{}\n")
+        self.assertEqual(self.poller.poll_once(7.0), 1)
+        self.assertEqual(self.poller._dirs[str(self.project)].interval_s, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from cctv.util.profiling import PhaseTimer
+
+
+class PhaseTimerTest(unittest.TestCase):
+    def test_disabled_timer_records_nothing(self) -> None:
+        perf = PhaseTimer(enabled=False)
+        perf.begin_tick()
+        t = perf.start()
+        t = perf.lap("tail", t)
+        perf.stop("parse", t)
+
+        self.assertEqual(t, 0)
+        self.assertEqual(perf.ticks, 0)
+        self.assertEqual(perf.total_ns, {})
+
+    def test_enabled_timer_accumulates_phases(self) -> None:
+        perf = PhaseTimer(enabled=True)
+        for _ in range(2):
+            perf.begin_tick()
+            t = perf.start()
+            t = perf.lap("tail", t)
+            perf.stop("parse", t)
+
+        self.assertEqual(perf.ticks, 2)
+        self.assertEqual(set(perf.total_ns), {"tail", "parse"})
+        self.assertEqual(set(perf.previous_ns), {"tail", "parse"})
+        self.assertGreaterEqual(perf.total_ns["tail"], perf.last_ns["tail"])
+
+
+if __name__ == "__main__":
+    unittest.main()
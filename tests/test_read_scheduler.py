@@ -0,0 +1,87 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from cctv.ingest.read_scheduler import ReadScheduler
+from cctv.ingest.tailer import JsonlTailer
+
+
+class ReadSchedulerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _file(self, name: str, lines: int) -> Path:
+        path = self.root / name
+        path.write_text("".join(f'{{"n":{i}}}\n' for i in range(lines)), encoding="utf-8")
+        return path
+
+    def _tick(self, reads: ReadScheduler, tailer: JsonlTailer, now: int) -> list[Path]:
+        order = []
+        for path in reads.drain(tailer, now):
+            tailer.read_new_lines(path, reads.slice_bytes)
+            order.append(path)
+        return order
+
+    def test_live_files_are_read_before_backfill(self) -> None:
+        backlog = self._file("old.jsonl", 5_000)
+        live = self._file("live.jsonl", 3)
+        reads = ReadScheduler(byte_budget=1_000, slice_bytes=500, live_window_ms=10_000)
+        tailer = JsonlTailer()
+        reads.enqueue(backlog, now=0)
+        reads.mark_active(live, now=0)
+
+        order = self._tick(reads, tailer, now=0)
+
+        self.assertEqual(order[0], live)
+        self.assertIn(backlog, order)
+        self.assertEqual(reads.pending, 1)
+
+    def test_leftover_work_carries_over_until_done(self) -> None:
+        big = self._file("big.jsonl", 2_000)
+        reads = ReadScheduler(byte_budget=4_096, slice_bytes=1_024)
+        tailer = JsonlTailer()
+        reads.enqueue(big, now=0)
+
+        ticks = 0
+        while reads.pending:
+            self._tick(reads, tailer, now=0)
+            self.assertLessEqual(reads.last_tick_bytes, 4_096 + 1_024)
+            ticks += 1
+
+        self.assertGreater(ticks, 1)
+        self.assertEqual(tailer.offset(big), big.stat().st_size)
+
+    def test_backfill_files_share_budget_round_robin(self) -> None:
+        a = self._file("a.jsonl", 2_000)
+        b = self._file("b.jsonl", 2_000)
+        reads = ReadScheduler(byte_budget=8_192, slice_bytes=1_024)
+        tailer = JsonlTailer()
+        reads.enqueue(a, now=0)
+        reads.enqueue(b, now=0)
+
+        order = self._tick(reads, tailer, now=0)
+
+        self.assertEqual(order[:4], [a, b, a, b])
+
+    def test_lower_priority_backfill_is_read_first(self) -> None:
+        old = self._file("old.jsonl", 2_000)
+        new = self._file("new.jsonl", 2_000)
+        reads = ReadScheduler(byte_budget=4_096, slice_bytes=1_024)
+        tailer = JsonlTailer()
+        reads.enqueue(old, now=0, priority=-1)
+        reads.enqueue(new, now=0, priority=-2)
+
+        order = []
+        while reads.pending:
+            order.extend(self._tick(reads, tailer, now=0))
+
+        self.assertEqual(order[0], new)
+        self.assertEqual(order.index(old), order.count(new))
+
+
+if __name__ == "__main__":
+    unittest.main()
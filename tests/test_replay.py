@@ -0,0 +1,107 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from cctv.config import parse_args
+from cctv import replay
+from cctv.replay import ReplaySource, merged_usages, parse_speed
+from cctv.util import time as cctv_time
+from cctv.util.time import ScaledClock, now_ms, set_clock
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}}
+T0 = 1_767_225_600_000
+
+
+def _line(event_id: str, ts_ms: int) -> str:
+    return json.dumps({
+        "uuid": event_id,
+        "timestamp": ts_ms,
+        "message": {"model": "sonnet", "usage": {"input_tokens": 10, "output_tokens": 1}},
+    }) + "\n"
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        # Slightly out of order within a file, interleaved across files, one duplicate.
+        (self.root / "a.jsonl").write_text(
+            _line("a1", T0 + 1_000) + _line("a0", T0) + _line("a2", T0 + 5_000) + _line("b1", T0 + 2_000)
+        )
+        (self.root / "b.jsonl").write_text(_line("b1", T0 + 2_000) + _line("b2", T0 + 9_000) + _line("b3", T0 + 99_000))
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+        set_clock(None)
+
+    def test_merge_is_ordered_deduped_and_bounded_by_range(self) -> None:
+        ids = [u.event_id for u in merged_usages([self.root], T0, T0 + 10_000)]
+        self.assertEqual(ids, ["a0", "a1", "b1", "a2", "b2"])
+
+    def test_streams_open_only_when_the_merge_reaches_them(self) -> None:
+        for day in range(5):
+            (self.root / f"day{day}.jsonl").write_text(
+                "".join(_line(f"d{day}-{i}", T0 + (day + 1) * 86_400_000 + i) for i in range(10))
+            )
+        open_streams = 0
+        peak = 0
+        file_usages = replay._file_usages
+
+        def tracked(*args):
+            nonlocal open_streams, peak
+            open_streams += 1
+            peak = max(peak, open_streams)
+            yield from file_usages(*args)
+            open_streams -= 1
+
+        with mock.patch.object(replay, "_file_usages", tracked):
+            ids = [u.event_id for u in merged_usages([self.root], T0 + 86_400_000, T0 + 6 * 86_400_000)]
+
+        self.assertEqual(len(ids), 50)
+        self.assertEqual(peak, 1)
+
+    def test_events_beyond_the_reorder_depth_are_reported(self) -> None:
+        root = self.root / "late"
+        root.mkdir()
+        (root / "late.jsonl").write_text(
+            "".join(_line(f"l{i}", T0 + 20_000 + i) for i in range(replay._REORDER_DEPTH + 5))
+            + _line("early", T0 + 10_000)
+        )
+
+        with self.assertLogs("cctv.replay", level="WARNING") as logs:
+            ids = [u.event_id for u in merged_usages([root], T0, T0 + 60_000)]
+
+        self.assertIn("early", ids)
+        self.assertIn("1 replayed events were out of timestamp order", logs.output[-1])
+
+    def test_tick_applies_events_up_to_replay_time(self) -> None:
+        config = parse_args(["--refresh", "1", "--window", "30"])
+        source = ReplaySource(config, PRICING, [self.root], T0, T0 + 10_000, speed=2.0)
+        self.assertEqual(source.config.bucket_seconds, 2)
+
+        source.tick(now=T0 + 1_500)
+        self.assertEqual(source.replayed, 2)
+        source.tick(now=T0 + 10_000)
+        self.assertEqual(source.replayed, 5)
+        snap = source.store.snapshot
+        self.assertEqual(snap.totals_by_model["sonnet"].input_tokens, 50)
+        self.assertEqual(snap.buckets[-1].start_ms, T0 + 10_000)
+
+    def test_injected_clock(self) -> None:
+        clock = ScaledClock(T0, speed=60.0, end_ms=T0)
+        set_clock(clock)
+        self.assertEqual(now_ms(), T0)
+        self.assertTrue(clock.finished)
+        set_clock(None)
+        self.assertIsNone(cctv_time._clock)
+        self.assertGreater(now_ms(), T0 + 86_400_000 * 200)
+        self.assertEqual(parse_speed("60x"), 60.0)
+        for raw in ("0", "-2x", "inf", "nan", "1e400x", "fast"):
+            with self.assertRaises(ValueError):
+                parse_speed(raw)
+
+
+if __name__ == "__main__":
+    unittest.main()
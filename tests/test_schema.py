@@ -0,0 +1,88 @@
+import json
+import unittest
+from pathlib import Path
+
+from cctv.ingest.parser import parse_usage_line
+from cctv.ingest.schema import SchemaParser, detect_schema
+
+CLAUDE = {
+    "type": "assistant",
+    "uuid": "u1",
+    "timestamp": "2026-02-21T06:49:42.972Z",
+    "message": {"model": "claude-sonnet-4-6", "usage": {"input_tokens": 3, "output_tokens": 1}},
+}
+OPENAI = {"id": "o1", "created_at": 1_700_000_000, "model": "gpt", "prompt_tokens": 5, "completion_tokens": 2}
+FLAT = {"event_id": "f1", "timestamp_ms": 1_700_000_000_000, "model": "sonnet", "input_tokens": 10, "output_tokens": 3}
+
+
+def _line(rec: dict, **changes) -> str:
+    return json.dumps({**rec, **changes})
+
+
+class SchemaTest(unittest.TestCase):
+    def test_detects_known_layouts(self) -> None:
+        self.assertEqual(detect_schema(CLAUDE).name, "claude-session")
+        self.assertEqual(detect_schema(OPENAI).name, "openai")
+        self.assertEqual(detect_schema(FLAT).name, "flat")
+        self.assertIsNone(detect_schema({"type": "user", "message": {"content": "hi"}}))
+
+    def test_matches_generic_parser_on_mixed_file(self) -> None:
+        lines = [
+            '{"type":"user","message":{"role":"user","content":"hi"}}',
+            _line(CLAUDE),
+            _line(CLAUDE, uuid="u2", cache_hit=False),
+            "not json",
+            _line(CLAUDE, uuid="u3", message={"model": "claude-opus-4-6", "usage": {"input_tokens": 0, "output_tokens": 0}}),
+            _line(OPENAI),
+            _line(OPENAI, id="o2", prompt_tokens="bad"),
+            _line(FLAT),
+            _line(FLAT, event_id="", uuid="fallback"),
+            _line(FLAT, event_id=None, sessionId="s1"),
+            _line(FLAT, model=None),
+        ]
+        parser = SchemaParser()
+
+        got = parser.parse_lines(Path("mixed.jsonl"), lines)
+
+        self.assertEqual(got, [u for u in map(parse_usage_line, lines) if u is not None])
+        self.assertEqual(parser.schema_for(Path("mixed.jsonl")).name, "flat")
+        self.assertGreaterEqual(parser.redetections, 2)
+
+    def test_higher_priority_alias_overrides_cached_key(self) -> None:
+        lines = [
+            _line(CLAUDE, uuid="u1"),
+            _line(CLAUDE, uuid="u2"),
+            _line(CLAUDE, uuid="u3", request_id="req3"),
+            _line(CLAUDE, uuid="u4", timestamp_ms=1_767_225_600_000),
+            _line(CLAUDE, uuid="u5", model="claude-opus-4-6"),
+        ]
+        parser = SchemaParser()
+
+        got = parser.parse_lines(Path("aliases.jsonl"), lines)
+
+        self.assertEqual(got, [parse_usage_line(line) for line in lines])
+        self.assertEqual(got[2].event_id, "req3")
+
+    def test_nested_usage_overrides_flat_schema(self) -> None:
+        lines = [_line(FLAT, event_id=f"f{i}") for i in range(5)]
+        lines.append(_line(FLAT, event_id="mixed", message={"model": "sonnet", "usage": {"input_tokens": 999}}))
+        parser = SchemaParser()
+
+        got = parser.parse_lines(Path("flat.jsonl"), lines)
+
+        self.assertEqual(got, [parse_usage_line(line) for line in lines])
+        self.assertEqual(got[-1].input_tokens, 999)
+
+    def test_schema_is_kept_per_file(self) -> None:
+        parser = SchemaParser()
+        parser.parse_lines(Path("a.jsonl"), [_line(CLAUDE)])
+        parser.parse_lines(Path("b.jsonl"), [_line(OPENAI)])
+        parser.parse_lines(Path("a.jsonl"), [_line(CLAUDE, uuid="u9")])
+
+        self.assertEqual(parser.schema_for(Path("a.jsonl")).name, "claude-session")
+        self.assertEqual(parser.schema_for(Path("b.jsonl")).name, "openai")
+        self.assertEqual(parser.redetections, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
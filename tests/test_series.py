@@ -0,0 +1,82 @@
+import unittest
+from collections import deque
+
+from cctv.aggregate.series import SeriesIndex
+from cctv.domain.models import BucketPoint, RequestUsage
+from cctv.domain.state import StateStore
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}, "opus": {"input": 15.0, "output": 75.0}}
+MINUTE = 60_000
+T0 = 1_767_225_600_000  # 2026-01-01T00:00:00Z
+
+
+def _usage(event_id: str, ts_ms: int, model: str = "sonnet", input_tokens: int = 100) -> RequestUsage:
+    return RequestUsage(event_id, ts_ms, model, input_tokens, 10)
+
+
+class SeriesIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = SeriesIndex(MINUTE, 60 * MINUTE)
+        self.index.add(_usage("a", T0, "sonnet"), "web")
+        self.index.add(_usage("b", T0 + 1_000, "opus", 200), "web")
+        self.index.add(_usage("c", T0 + 2 * MINUTE, "opus", 400), "api")
+        self.index.add(_usage("d", T0 + 3 * MINUTE, "sonnet", 800), None)
+
+    def test_dimensions(self) -> None:
+        self.assertEqual(self.index.models(), ["opus", "sonnet"])
+        self.assertEqual(self.index.projects(), ["api", "web"])
+
+    def test_buckets_per_filter(self) -> None:
+        def inputs(model, project):
+            return [b.input_tokens for b in self.index.buckets(model, project, T0, 2 * MINUTE, 2)]
+
+        self.assertEqual(inputs(None, None), [300, 1_200])
+        self.assertEqual(inputs("opus", None), [200, 400])
+        self.assertEqual(inputs(None, "web"), [300, 0])
+        self.assertEqual(inputs("sonnet", "web"), [100, 0])
+        self.assertEqual(inputs("sonnet", "api"), [0, 0])
+
+    def test_prune_and_shed_drop_oldest(self) -> None:
+        self.index.prune(T0 + 62 * MINUTE)
+        self.assertEqual(self.index.models(), ["opus", "sonnet"])
+        self.assertEqual(self.index.projects(), ["api"])
+        # Usage from before the floor is ignored rather than resurrecting old buckets.
+        self.index.add(_usage("e", T0, "haiku"), None)
+        self.assertEqual(self.index.models(), ["opus", "sonnet"])
+
+        self.assertGreater(self.index.shed(0.5), 0)
+        self.assertEqual(self.index.models(), ["sonnet"])
+
+
+class FilteredBucketsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.store = StateStore(window_size=3)
+        self.store.replace_buckets(
+            deque([BucketPoint(start_ms=T0 + i * 1_000) for i in range(3)], maxlen=3)
+        )
+        self.store.apply_usage(_usage("a", T0 + 500, "sonnet"), 1, PRICING, "web")
+        self.store.apply_usage(_usage("b", T0 + 2_500, "opus", 200), 1, PRICING, "api")
+
+    def test_live_window_lines_up_with_buckets(self) -> None:
+        live = self.store.filtered_buckets("opus", None, None, T0 + 2_500)
+        self.assertEqual([b.start_ms for b in live], [b.start_ms for b in self.store.state.buckets])
+        self.assertEqual([b.input_tokens for b in live], [0, 0, 200])
+        self.assertEqual([b.input_tokens for b in self.store.filtered_buckets(None, "web", None, T0)], [100, 0, 0])
+
+    def test_time_range_uses_whole_minutes(self) -> None:
+        hour = self.store.filtered_buckets(None, None, 60 * MINUTE, T0 + 30 * MINUTE)
+        # 3-bucket window: an hour in 20-minute buckets, the last one holding now (T0 + 30m).
+        self.assertEqual(len(hour), 3)
+        self.assertEqual({b.start_ms % (20 * MINUTE) for b in hour}, {0})
+        self.assertEqual(sum(b.input_tokens for b in hour), 300)
+        self.assertEqual([b.input_tokens for b in hour], [0, 300, 0])
+
+    def test_bucket_width_change_resets_recent(self) -> None:
+        self.store.advance_time(T0 + 10_000, bucket_seconds=10)
+        self.assertEqual(self.store.recent.resolution_ms, 10_000)
+        self.assertEqual(self.store.recent.models(), [])
+        self.assertEqual(self.store.history.models(), ["opus", "sonnet"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import random
+import unittest
+
+from cctv.aggregate.totals import apply_usage_to_totals, merge_model_totals
+from cctv.domain.models import RequestUsage
+from cctv.util.sketch import QuantileSketch
+
+
+class QuantileSketchTest(unittest.TestCase):
+    def test_quantiles_within_relative_accuracy(self) -> None:
+        rng = random.Random(7)
+        values = [rng.randint(1, 200_000) for _ in range(5_000)]
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for v in values:
+            sketch.add(v)
+
+        ordered = sorted(values)
+        for q in (0.5, 0.95, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            est = sketch.quantile(q)
+            assert est is not None
+            self.assertLessEqual(abs(est - exact) / exact, 0.011)
+
+    def test_merge_matches_single_sketch(self) -> None:
+        values = list(range(0, 10_000, 7))
+        whole = QuantileSketch()
+        left = QuantileSketch()
+        right = QuantileSketch()
+        for i, v in enumerate(values):
+            whole.add(v)
+            (left if i % 2 else right).add(v)
+
+        left.merge(right)
+
+        self.assertEqual(left.count, whole.count)
+        self.assertEqual(left.zero_count, whole.zero_count)
+        self.assertEqual(left.bins, whole.bins)
+        self.assertEqual(left.quantile(0.95), whole.quantile(0.95))
+
+    def test_add_many_matches_add(self) -> None:
+        values = [0, 3, 17, 17, 900, 12_000] * 20
+        one = QuantileSketch()
+        for v in values:
+            one.add(v)
+        batch = QuantileSketch()
+        batch.add_many(values)
+
+        self.assertEqual(batch.bins, one.bins)
+        self.assertEqual(batch.zero_count, one.zero_count)
+        self.assertEqual(batch.count, one.count)
+
+    def test_merge_rejects_mismatched_accuracy(self) -> None:
+        with self.assertRaises(ValueError):
+            QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+    def test_empty_sketch_has_no_quantile(self) -> None:
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+    def test_model_totals_merge_sketches(self) -> None:
+        pricing = {"sonnet": {"input": 3.0, "output": 15.0}}
+        a: dict = {}
+        b: dict = {}
+        apply_usage_to_totals(a, RequestUsage("1", 1, "sonnet", 100, 10), pricing)
+        apply_usage_to_totals(b, RequestUsage("2", 2, "sonnet", 300, 30), pricing)
+
+        merge_model_totals(a, b)
+
+        self.assertEqual(a["sonnet"].input_tokens, 400)
+        self.assertEqual(a["sonnet"].input_sketch.count, 2)
+        self.assertAlmostEqual(a["sonnet"].input_sketch.quantile(1.0) or 0, 300, delta=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from cctv.snapshot import SnapshotError, SnapshotReader, build_snapshot, merge_snapshots
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}, "opus": {"input": 15.0, "output": 75.0}}
+T0 = 1_767_225_600_000  # 2026-01-01T00:00:00Z
+HOUR = 3_600_000
+
+
+def _line(event_id: str, ts_ms: int, model: str = "sonnet", input_tokens: int = 1_000) -> str:
+    return json.dumps({
+        "uuid": event_id,
+        "timestamp": ts_ms,
+        "message": {"model": model, "usage": {"input_tokens": input_tokens, "output_tokens": 100}},
+    }) + "\n"
+
+
+def _summary(path: Path) -> tuple:
+    snap = SnapshotReader(path).snapshot
+    return (
+        snap.events,
+        {m: (t.input_tokens, t.input_sketch.count, round(t.cost_usd, 6)) for m, t in snap.totals_by_model.items()},
+        {u: sorted(t) for u, t in snap.totals_by_user.items()},
+        {start: p.count for start, p in snap.buckets.items()},
+    )
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _snapshot(self, name: str, lines: list[str]) -> Path:
+        log = self.tmp / name / "projects" / "-src-app" / "s.jsonl"
+        log.parent.mkdir(parents=True)
+        log.write_text("".join(lines))
+        out = self.tmp / f"{name}.snap"
+        build_snapshot([(log, None)], out, PRICING, source=name)
+        return out
+
+    def test_round_trip(self) -> None:
+        path = self._snapshot("alice", [_line("a1", T0), _line("a2", T0 + HOUR, "opus"), _line("a1", T0)])
+        reader = SnapshotReader(path)
+
+        self.assertEqual(reader.snapshot.sources, ["alice"])
+        self.assertEqual(reader.snapshot.events, 2)
+        self.assertEqual(sorted(reader.snapshot.buckets), [T0, T0 + HOUR])
+        self.assertAlmostEqual(reader.snapshot.totals_by_model["opus"].cost_usd, 0.0225)
+        events = list(reader.events())
+        self.assertEqual(len(events), 2)
+        self.assertLess(events[0][0], events[1][0])
+
+    def test_merge_drops_shared_events_in_any_grouping(self) -> None:
+        a = self._snapshot("alice", [_line("a1", T0), _line("shared", T0 + 1, "opus", 5_000)])
+        b = self._snapshot("bob", [_line("b1", T0 + HOUR), _line("shared", T0 + 1, "opus", 5_000)])
+        c = self._snapshot("carol", [_line("c1", T0), _line("b1", T0 + HOUR)])
+
+        result = merge_snapshots([a, b, c], self.tmp / "abc.snap")
+        self.assertEqual(result.duplicates, 2)
+        self.assertEqual(result.snapshot.events, 4)
+        self.assertEqual(result.snapshot.totals_by_model["opus"].input_tokens, 5_000)
+        self.assertEqual(result.snapshot.totals_by_model["opus"].input_sketch.quantile(0.5), 5_000)
+
+        merge_snapshots([a, b], self.tmp / "ab.snap")
+        merge_snapshots([b, c], self.tmp / "bc.snap")
+        merge_snapshots([self.tmp / "ab.snap", c], self.tmp / "ab_c.snap")
+        merge_snapshots([a, self.tmp / "bc.snap", a], self.tmp / "a_bc.snap")
+        expected = _summary(self.tmp / "abc.snap")
+        self.assertEqual(_summary(self.tmp / "ab_c.snap"), expected)
+        self.assertEqual(_summary(self.tmp / "a_bc.snap"), expected)
+        self.assertEqual(expected[3], {T0: 3, T0 + HOUR: 1})
+
+    def test_skips_counts_a_snapshot_cannot_hold(self) -> None:
+        with self.assertLogs("cctv.snapshot", "WARNING") as logs:
+            path = self._snapshot(
+                "alice", [_line("a1", T0), _line("neg", T0, input_tokens=-5), _line("big", T0, input_tokens=2**40)]
+            )
+
+        self.assertIn("Skipped 2 events", logs.output[0])
+        self.assertEqual(_summary(path)[:2], (1, {"sonnet": (1_000, 1, 0.0045)}))
+
+    def test_rejects_other_files(self) -> None:
+        path = self.tmp / "notes.snap"
+        path.write_bytes(b"not a snapshot at all, just some text")
+        with self.assertRaises(SnapshotError):
+            SnapshotReader(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
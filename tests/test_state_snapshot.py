@@ -0,0 +1,50 @@
+import unittest
+from collections import deque
+
+from cctv.domain.models import BucketPoint, RequestUsage
+from cctv.domain.state import StateStore
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}}
+
+
+class StateSnapshotTest(unittest.TestCase):
+    def _store(self) -> StateStore:
+        store = StateStore(window_size=3)
+        store.replace_buckets(
+            deque([BucketPoint(start_ms=0), BucketPoint(start_ms=1000), BucketPoint(start_ms=2000)], maxlen=3)
+        )
+        return store
+
+    def test_publish_is_noop_without_changes(self) -> None:
+        store = self._store()
+        first = store.publish()
+        self.assertIs(store.publish(), first)
+
+    def test_snapshot_is_isolated_from_later_ingest(self) -> None:
+        store = self._store()
+        store.apply_usage(RequestUsage("a", 2_500, "sonnet", 10, 1), 1, PRICING)
+        snap = store.publish()
+
+        store.apply_usage(RequestUsage("b", 2_600, "sonnet", 20, 2), 1, PRICING)
+
+        self.assertEqual(snap.buckets[-1].input_tokens, 10)
+        self.assertEqual(snap.totals_by_model["sonnet"].input_tokens, 10)
+        self.assertEqual(snap.totals_by_model["sonnet"].input_sketch.count, 1)
+        newer = store.publish()
+        self.assertGreater(newer.version, snap.version)
+        self.assertEqual(newer.buckets[-1].input_tokens, 30)
+
+    def test_unchanged_buckets_are_shared_between_snapshots(self) -> None:
+        store = self._store()
+        store.apply_usage(RequestUsage("a", 500, "sonnet", 10, 1), 1, PRICING)
+        first = store.publish()
+
+        store.apply_usage(RequestUsage("b", 2_500, "sonnet", 10, 1), 1, PRICING)
+        second = store.publish()
+
+        self.assertIs(first.buckets[0], second.buckets[0])
+        self.assertIsNot(first.buckets[-1], second.buckets[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
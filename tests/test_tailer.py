@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from cctv.ingest.tailer import JsonlTailer
+
+
+class TailerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "s.jsonl"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _append(self, text: str) -> None:
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_partial_line_is_read_once_complete(self) -> None:
+        tailer = JsonlTailer()
+        self._append('{"a":1}\n{"b":')
+
+        self.assertEqual(tailer.read_new_lines(self.path), ['{"a":1}'])
+        self.assertEqual(tailer.read_new_lines(self.path), [])
+
+        self._append("2}\n")
+        self.assertEqual(tailer.read_new_lines(self.path), ['{"b":2}'])
+
+    def test_slices_never_split_lines(self) -> None:
+        tailer = JsonlTailer()
+        lines = [f'{{"n":{i},"pad":"{"x" * (i % 7)}"}}' for i in range(200)]
+        self._append("\n".join(lines) + "\n")
+
+        got: list[str] = []
+        reads = 0
+        while True:
+            chunk = tailer.read_new_lines(self.path, max_bytes=64)
+            reads += 1
+            got.extend(chunk)
+            if not tailer.has_backlog(self.path):
+                break
+
+        self.assertEqual(got, lines)
+        self.assertGreater(reads, 10)
+
+    def test_line_longer_than_slice_is_completed(self) -> None:
+        tailer = JsonlTailer()
+        long_line = '{"payload":"' + "y" * 1000 + '"}'
+        self._append(long_line + "\n" + '{"n":1}\n')
+
+        self.assertEqual(tailer.read_new_lines(self.path, max_bytes=16), [long_line])
+        self.assertEqual(tailer.read_new_lines(self.path, max_bytes=16), ['{"n":1}'])
+
+    def test_truncated_file_restarts_from_beginning(self) -> None:
+        tailer = JsonlTailer()
+        self._append('{"a":1}\n{"b":2}\n')
+        tailer.read_new_lines(self.path)
+
+        self.path.write_text('{"c":3}\n', encoding="utf-8")
+
+        self.assertEqual(tailer.read_new_lines(self.path), ['{"c":3}'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import random
+import unittest
+from datetime import datetime, timezone
+
+from cctv.util.time import parse_iso8601_ms
+
+
+def _reference_ms(s: str) -> int:
+    return int(datetime.fromisoformat(s.replace("Z", "+00:00")).timestamp() * 1000)
+
+
+class ParseIsoTest(unittest.TestCase):
+    def test_matches_fromisoformat_for_utc_timestamps(self) -> None:
+        rng = random.Random(3)
+        for _ in range(2_000):
+            ms = rng.randint(1_600_000_000_000, 1_900_000_000_000)
+            dt = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+            base = dt.strftime("%Y-%m-%dT%H:%M:%S")
+            for s in (f"{base}.{ms % 1000:03d}Z", f"{base}Z", f"{base}.{ms % 1000:03d}000+00:00"):
+                self.assertEqual(parse_iso8601_ms(s), _reference_ms(s), s)
+
+    def test_leap_day_and_prefix_cache(self) -> None:
+        self.assertEqual(parse_iso8601_ms("2024-02-29T23:59:59.999Z"), _reference_ms("2024-02-29T23:59:59.999Z"))
+        self.assertEqual(parse_iso8601_ms("2024-02-29T23:00:00Z"), _reference_ms("2024-02-29T23:00:00Z"))
+
+    def test_unsupported_shapes_fall_back(self) -> None:
+        for s in (
+            "2026-02-21T06:49:42",  # naive: local-time semantics stay with fromisoformat
+            "2026-02-21T06:49:42+09:00",
+            "2026-02-30T06:49:42Z",
+            "2026-02-21T06:61:42Z",
+            "2026-02-21T06:49:42.abcZ",
+            "2026-02-21T06:4\u00b2:42Z",  # non-ASCII digits pass str.isdigit() but not int()
+            "2026-02-21T06:49:42.1\u00b2Z",
+            "1700000000",
+            "",
+        ):
+            self.assertIsNone(parse_iso8601_ms(s), s)
+
+
+if __name__ == "__main__":
+    unittest.main()
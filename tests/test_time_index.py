@@ -0,0 +1,127 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from cctv.config import parse_args
+from cctv.ingest.pipeline import UsagePipeline
+from cctv.ingest.time_index import FileTimeIndex, TimeIndexStore
+from cctv.summary import parse_time_bound, summarize
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}}
+DAY_MS = 86_400_000
+T0 = 1_767_225_600_000  # 2026-01-01T00:00:00Z
+
+
+def _line(event_id: str, ts_ms: int, input_tokens: int = 10) -> str:
+    return json.dumps({
+        "uuid": event_id,
+        "timestamp": ts_ms,
+        "message": {"model": "sonnet", "usage": {"input_tokens": input_tokens, "output_tokens": 1}},
+    }) + "\n"
+
+
+class FileTimeIndexTest(unittest.TestCase):
+    def test_blocks_merge_and_ranges(self) -> None:
+        index = FileTimeIndex(inode=1)
+        self.assertTrue(index.add(0, 100, [T0, T0 + 5]))
+        self.assertTrue(index.add(100, 150, [T0 + 9]))
+        self.assertFalse(index.add(400, 500, [T0]))  # gap
+        self.assertFalse(index.add(0, 120, [T0]))  # already indexed
+        self.assertEqual(index.blocks, [[0, 150, T0, T0 + 9]])
+        self.assertEqual((index.min_ts, index.max_ts), (T0, T0 + 9))
+        self.assertEqual(index.ranges(T0 + 10, None), [])
+        self.assertEqual(index.ranges(None, T0 + 1), [(0, 150)])
+
+        self.assertTrue(index.add(120, 200, [T0 + 8, T0 + 20]))  # overlapping re-read
+        self.assertEqual((index.end, index.blocks), (200, [[0, 200, T0, T0 + 20]]))
+
+
+class SummaryIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self._tmp.name)
+        self.root = tmp / "logs"
+        self.root.mkdir()
+        self.old = self.root / "old.jsonl"
+        self.new = self.root / "new.jsonl"
+        self.old.write_text("".join(_line(f"o{i}", T0 + i * 1000) for i in range(50)))
+        self.new.write_text("".join(_line(f"n{i}", T0 + 3 * DAY_MS + i * 1000) for i in range(50)))
+        self.index_dir = tmp / "index"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_index_skips_files_outside_range(self) -> None:
+        since = T0 + 2 * DAY_MS
+        plain = summarize([self.root], PRICING, since, None)
+        first = summarize([self.root], PRICING, since, None, TimeIndexStore(self.index_dir))
+        second = summarize([self.root], PRICING, since, None, TimeIndexStore(self.index_dir))
+
+        self.assertEqual(plain.totals_by_model["sonnet"].input_tokens, 500)
+        self.assertEqual(first.totals_by_model["sonnet"].input_tokens, 500)
+        self.assertEqual(second.totals_by_model["sonnet"].input_tokens, 500)
+        self.assertEqual(first.files_skipped, 0)
+        self.assertEqual(second.files_skipped, 1)
+        self.assertEqual(second.bytes_read, self.new.stat().st_size)
+
+    def test_malformed_sidecars_count_as_missing(self) -> None:
+        store = TimeIndexStore(self.index_dir)
+        self.index_dir.mkdir()
+        sidecar = store._sidecar(self.old)
+        path = json.dumps(str(self.old))
+        for body in (
+            "[]",
+            f'{{"format": 1, "path": {path}}}',
+            f'{{"format": 1, "path": {path}, "inode": 1, "end": 10, "blocks": [["x"]]}}',
+        ):
+            sidecar.write_text(body, encoding="utf-8")
+
+            self.assertEqual(TimeIndexStore(self.index_dir).get(self.old).end, 0)
+            result = summarize([self.root], PRICING, None, None, TimeIndexStore(self.index_dir))
+            self.assertEqual(result.totals_by_model["sonnet"].input_tokens, 1_000)
+
+    def test_index_extends_as_file_grows_and_resets_when_replaced(self) -> None:
+        summarize([self.root], PRICING, None, None, TimeIndexStore(self.index_dir))
+        with self.old.open("a") as f:
+            f.write(_line("late", T0 + 5 * DAY_MS, input_tokens=7))
+
+        result = summarize([self.root], PRICING, T0 + 4 * DAY_MS, None, TimeIndexStore(self.index_dir))
+        self.assertEqual(result.totals_by_model["sonnet"].input_tokens, 7)
+        self.assertEqual(result.files_skipped, 1)
+        self.assertEqual(TimeIndexStore(self.index_dir).get(self.old).end, self.old.stat().st_size)
+
+        replacement = self.root / "tmp.jsonl"
+        replacement.write_text(_line("r", T0, input_tokens=3))
+        replacement.replace(self.old)
+        result = summarize([self.root], PRICING, None, T0 + DAY_MS, TimeIndexStore(self.index_dir))
+        self.assertEqual(result.totals_by_model["sonnet"].input_tokens, 3)
+
+    def test_pipeline_extends_a_reloaded_sidecar(self) -> None:
+        summarize([self.root], PRICING, None, None, TimeIndexStore(self.index_dir))
+        indexed = self.old.stat().st_size
+        with self.old.open("a") as f:
+            f.write(_line("late", T0 + 5 * DAY_MS, input_tokens=7))
+        config = parse_args(["--index-dir", str(self.index_dir)])
+        pipeline = UsagePipeline(config, PRICING, [self.root])
+        pipeline.reads.slice_bytes = indexed // 3  # slice boundaries miss the indexed end
+        pipeline.start()
+        try:
+            while pipeline.backfill.active:
+                pipeline.tick()
+        finally:
+            pipeline.stop()
+
+        index = TimeIndexStore(self.index_dir).get(self.old)
+        self.assertEqual(index.end, self.old.stat().st_size)
+        self.assertEqual(index.max_ts, T0 + 5 * DAY_MS)
+
+    def test_parse_time_bound(self) -> None:
+        self.assertEqual(parse_time_bound("2h", now=T0), T0 - 7_200_000)
+        self.assertEqual(parse_time_bound("2026-01-01T00:00:00Z"), T0)
+        with self.assertRaises(ValueError):
+            parse_time_bound("yesterday-ish")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import unittest
+
+from cctv.domain.models import RequestUsage
+from cctv.domain.state import StateStore
+from cctv.server.web import INDEX_HTML, SseBroadcaster, _make_handler
+
+PRICING = {"sonnet": {"input": 3.0, "output": 15.0}, "opus": {"input": 15.0, "output": 75.0}}
+
+
+async def _read_event(reader: asyncio.StreamReader) -> tuple[str, dict]:
+    fields = {}
+    while (line := await asyncio.wait_for(reader.readline(), 5)) != b"\n":
+        key, _, value = line.decode("utf-8").rstrip("\n").partition(": ")
+        fields[key] = value
+    return fields["event"], json.loads(fields["data"])
+
+
+class WebTest(unittest.TestCase):
+    def test_tabs_get_snapshot_then_shared_deltas(self) -> None:
+        async def scenario() -> None:
+            store = StateStore(window_size=3)
+            store.apply_usage(RequestUsage("a", 1_000, "sonnet", 50, 5), 1, PRICING)
+            store.apply_usage(RequestUsage("b", 1_000, "opus", 10, 1), 1, PRICING)
+            broadcaster = SseBroadcaster(store.publish(), bucket_seconds=1)
+            server = await asyncio.start_server(_make_handler(broadcaster), "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            tabs = []
+            async with server:
+                for _ in range(2):
+                    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                    writer.write(b"GET /events HTTP/1.1\r\nHost: x\r\n\r\n")
+                    while await reader.readline() != b"\r\n":
+                        pass
+                    tabs.append((reader, writer))
+                    event, msg = await _read_event(reader)
+                    self.assertEqual(event, "snapshot")
+                    self.assertEqual({t[0] for t in msg["totals"]}, {"sonnet", "opus"})
+                self.assertEqual(broadcaster.clients, 2)
+
+                store.apply_usage(RequestUsage("c", 1_000, "sonnet", 70, 5), 1, PRICING)
+                self.assertTrue(broadcaster.broadcast(store.publish()))
+                self.assertFalse(broadcaster.broadcast(store.snapshot))
+                for reader, writer in tabs:
+                    event, msg = await _read_event(reader)
+                    self.assertEqual(event, "delta")
+                    # Only the changed model's row is sent.
+                    self.assertEqual([t[:2] for t in msg["totals"]], [["sonnet", 120]])
+                    self.assertEqual(msg["buckets"][0][1:3], [130, 11])
+                    writer.close()
+                await asyncio.sleep(0.05)
+                self.assertEqual(broadcaster.clients, 0)
+
+        asyncio.run(scenario())
+
+    def test_page_inserts_log_values_as_text(self) -> None:
+        # Model names come from log files; markup in them must not reach the DOM as HTML.
+        self.assertNotIn(b"innerHTML", INDEX_HTML)
+        self.assertIn(b"textContent = cell", INDEX_HTML)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from textual.app import App, ComposeResult
+from textual.events import Resize
+from textual.geometry import Size
+
+from cctv.domain.models import BucketPoint
+from cctv.tui.widgets import HistogramWidget
+
+
+def _buckets(*inputs: int) -> list[BucketPoint]:
+    return [BucketPoint(start_ms=i * 1_000, input_tokens=n) for i, n in enumerate(inputs)]
+
+
+class _HistogramApp(App):
+    def compose(self) -> ComposeResult:
+        yield HistogramWidget("Input", id="hist")
+
+
+class HistogramWidgetTest(unittest.TestCase):
+    def _run(self, scenario) -> None:
+        async def run() -> None:
+            app = _HistogramApp()
+            async with app.run_test(size=(80, 20)) as pilot:
+                await scenario(app, app.query_one("#hist", HistogramWidget), pilot)
+
+        asyncio.run(run())
+
+    def test_unchanged_heights_refresh_nothing(self) -> None:
+        async def scenario(app, hist, pilot) -> None:
+            hist.set_data(_buckets(10, 20, 30), 100, "input")
+            await pilot.pause()
+            with mock.patch.object(hist, "refresh") as refresh:
+                hist.set_data(_buckets(10, 20, 30), 100, "input")
+                # Different tokens, same column heights.
+                hist.set_data(_buckets(10, 20, 31), 100, "input")
+            refresh.assert_not_called()
+
+        self._run(scenario)
+
+    def test_changed_bar_refreshes_only_changed_rows(self) -> None:
+        async def scenario(app, hist, pilot) -> None:
+            hist.set_data(_buckets(10, 20, 30), 100, "input")
+            await pilot.pause()
+            with mock.patch.object(hist, "refresh") as refresh:
+                hist.set_data(_buckets(10, 20, 90), 100, "input")
+            refresh.assert_called_once()
+            regions = refresh.call_args.args
+            self.assertTrue(regions)
+            self.assertLess(len(regions), hist.size.height)
+            self.assertTrue(all(region.height == 1 for region in regions))
+
+        self._run(scenario)
+
+    def test_resize_burst_renders_once(self) -> None:
+        async def scenario(app, hist, pilot) -> None:
+            hist.set_data(_buckets(10, 20, 30), 100, "input")
+            await pilot.pause()
+            with mock.patch.object(hist, "set_data", wraps=hist.set_data) as set_data:
+                for width in range(60, 80):
+                    size = Size(width, 19)
+                    hist.post_message(Resize(size, size))
+                await pilot.pause()
+                await pilot.pause()
+            self.assertEqual(set_data.call_count, 1)
+
+        self._run(scenario)
+
+    def test_theme_change_drops_cached_strips(self) -> None:
+        async def scenario(app, hist, pilot) -> None:
+            hist.set_data(_buckets(10, 20, 30), 100, "input")
+            await pilot.pause()
+            before = hist.render_line(0)
+            self.assertTrue(len(hist._strips))
+            app.theme = "textual-light" if app.theme != "textual-light" else "textual-dark"
+            await pilot.pause()
+            after = hist.render_line(0)
+            self.assertEqual(before.text, after.text)
+            self.assertNotEqual(list(before)[0].style, list(after)[0].style)
+
+        self._run(scenario)
+
+
+if __name__ == "__main__":
+    unittest.main()